@@ -1,9 +1,10 @@
-import time
-from urllib.parse import quote_plus
+from urllib.parse import quote_plus, urlparse
 
 from bs4 import BeautifulSoup
 
-import cloudscraper
+from core.ratelimit import set_rate_limit
+from core.sources.apkmirror import APKMIRROR_BURST
+from core.transport import get_session
 
 
 class APKMirror:
@@ -23,13 +24,11 @@ class APKMirror:
         self.base_url = "https://www.apkmirror.com"
         self.base_search = f"{self.base_url}/?post_type=app_release&searchtype=apk&s="
 
-        self.scraper = cloudscraper.create_scraper()
+        self.scraper = get_session("apkmirror", scraper=True)
+        set_rate_limit(urlparse(self.base_url).hostname, rate=1 / self.timeout,
+                       burst=APKMIRROR_BURST)
 
     def search(self, query):
-        print("[search] Sleeping...")
-
-        time.sleep(self.timeout)
-
         search_url = self.base_search + quote_plus(query)
         resp = self.scraper.get(search_url, headers=self.headers)
 
@@ -59,10 +58,6 @@ class APKMirror:
         return apps[: self.results]
 
     def get_app_details(self, app_link):
-        print("[get_app_details] Sleeping...")
-
-        time.sleep(self.timeout)
-
         resp = self.scraper.get(app_link, headers=self.headers)
 
         print(f"[get_app_details] Status: {resp.status_code}")
@@ -122,10 +117,6 @@ class APKMirror:
         }
 
     def get_download_link(self, app_download_link):
-        print("[get_download_link] Sleeping...")
-
-        time.sleep(self.timeout)
-
         resp = self.scraper.get(app_download_link, headers=self.headers)
 
         print(f"[get_download_link] Status: {resp.status_code}")
@@ -137,10 +128,6 @@ class APKMirror:
         )
 
     def get_direct_download_link(self, app_download_url):
-        print("[get_direct_download_link] Sleeping...")
-
-        time.sleep(self.timeout)
-
         resp = self.scraper.get(app_download_url, headers=self.headers)
 
         print(f"[get_direct_download_link] Status: {resp.status_code}")
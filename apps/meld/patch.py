@@ -1,6 +1,15 @@
 import os
 import re
 
+from core.smali_index import SmaliIndex
+
+# מחרוזות העוגן שנחפשות בעץ - נסרקות כולן במעבר אחד של SmaliIndex
+VISITOR_DATA_ANCHOR = 'VISITOR_DATA'
+SPOTIFY_ACCOUNTS_ANCHOR = '"https://accounts.spotify.com'
+USER_AGENT_ANCHOR = 'setUserAgentString'
+SPOTIFY_LOGIN_ANCHOR = '"SpotifyLogin: navigating to: "'
+SMALI_ANCHORS = [VISITOR_DATA_ANCHOR, SPOTIFY_ACCOUNTS_ANCHOR, USER_AGENT_ANCHOR, SPOTIFY_LOGIN_ANCHOR]
+
 # --- הגדרות ---
 # קוד ה-JS הגולמי להזרקה ב-WebView של יוטיוב מיוזיק
 JS_PAYLOAD = r'''javascript:(function(){function cleanPage(){const footer=document.querySelector('footer');if(footer)footer.remove();const langSelector=document.querySelector('[jscontroller="xiZRqc"]');if(langSelector)langSelector.remove();const guestModeDiv=document.querySelector('.RDsYTb');if(guestModeDiv)guestModeDiv.remove();document.querySelectorAll('ytmusic-player-page, ytmusic-player-bar[slot="player-bar"], #mini-guide, #guide, ytmusic-nav-bar .left-content, ytmusic-nav-bar .center-content').forEach(element=>{element.style.setProperty('display','none','important')});const navBarRight=document.querySelector('ytmusic-nav-bar .right-content');if(navBarRight){navBarRight.style.setProperty('margin-left','auto','important')}const popup=document.querySelector('tp-yt-iron-dropdown');if(popup&&popup.style.display!=='none'){const header=popup.querySelector('ytd-active-account-header-renderer');if(header)header.style.setProperty('display','none','important');popup.querySelectorAll('yt-multi-page-menu-section-renderer').forEach(section=>{if(!section.querySelector('a[href="/logout"]')){section.style.setProperty('display','none','important')}else{section.querySelectorAll('ytd-compact-link-renderer').forEach(item=>{if(!item.contains(section.querySelector('a[href="/logout"]'))){item.style.setProperty('display','none','important')}})}})}const immersiveBackground=document.querySelector('#background.immersive-background');if(immersiveBackground){immersiveBackground.style.setProperty('display','none','important')}const chipContainer=document.querySelector('ytmusic-chip-cloud-renderer');if(chipContainer){chipContainer.style.setProperty('display','none','important')}const allShelves=document.querySelectorAll('ytmusic-carousel-shelf-renderer');allShelves.forEach((shelf,index)=>{if(index===0){const carousel=shelf.querySelector('#ytmusic-carousel');if(carousel)carousel.style.setProperty('display','none','important');const header=shelf.querySelector('ytmusic-carousel-shelf-basic-header-renderer');if(header){const strapline=header.querySelector('.strapline');if(strapline)strapline.style.setProperty('display','none','important');const buttonGroup=header.querySelector('#button-group');if(buttonGroup)buttonGroup.style.setProperty('display','none','important')}const navButtons=shelf.querySelector('.button-group.style-scope.ytmusic-carousel-shelf-renderer');if(navButtons)navButtons.style.setProperty('display','none','important')}else{shelf.style.setProperty('display','none','important')}});const tastebuilder=document.querySelector('ytmusic-tastebuilder-shelf-renderer');if(tastebuilder){tastebuilder.style.setProperty('display','none','important')}const titleElement=document.querySelector('ytmusic-carousel-shelf-renderer yt-formatted-string.title');if(titleElement){const newText='אם זאת פעם ראשונה שאתם נכנסים, אתם יכולים לחזור כעת לאפליקציה (מומלץ לסגור לגמרי את האפליקציה ולפתוח מחדש, כדי שהיא תקלוט שנכנסתם), אם כבר הייתם מחוברים ואתם רוצים להחליף חשבון, צאו מהחשבון (לחיצה על העיגול) והתחילו מחדש את התהליך.';if(titleElement.textContent!==newText){titleElement.textContent=newText;titleElement.style.setProperty('direction','rtl','important');titleElement.style.setProperty('white-space','normal','important');titleElement.style.setProperty('text-overflow','clip','important');titleElement.style.setProperty('overflow','visible','important');titleElement.style.setProperty('height','auto','important');titleElement.style.setProperty('font-size','16px','important');titleElement.style.setProperty('font-weight','normal','important');titleElement.style.setProperty('line-height','1.5','important');titleElement.style.setProperty('color','white','important')}}}cleanPage();const observer=new MutationObserver(()=>{cleanPage()});observer.observe(document.body,{childList:true,subtree:true})})();'''
@@ -79,35 +88,39 @@ SPOTIFY_FILTER_SMALI = """
 """
 
 
-def patch(decompiled_dir: str) -> bool:
+def patch(decompiled_dir: str, ctx=None) -> bool:
     """
     Apply the 'MetroList Kosher' patch dynamically.
+
+    Args:
+        ctx: Optional PatchContext from core.patcher (shared SmaliIndex).
     """
     print("[*] Starting MetroList 'Kosher' patch...")
+    index = ctx.index if ctx is not None else SmaliIndex(decompiled_dir, SMALI_ANCHORS)
     
     # 1. חסימת תמונות קטנות (Thumbnails)
-    if not _patch_thumbnail(decompiled_dir):
+    if not _patch_thumbnail(index):
         print("[-] Warning: Failed to patch Thumbnail.smali. Continuing...")
     
     # 1.5. חסימת תמונות קטנות מספוטיפיי (SpotifyImage) - הוספנו כאן!
-    if not _patch_spotify_images(decompiled_dir):
+    if not _patch_spotify_images(index):
         print("[-] Warning: Failed to patch SpotifyImage.smali. Continuing...")
 
     
     # 2. הזרקת JS וחסימת תמונות ב-WebView של YouTube
-    yt_webview_client = _find_webview_client_target(decompiled_dir)
+    yt_webview_client = index.find_file_containing(VISITOR_DATA_ANCHOR)
     if yt_webview_client:
-        if not _patch_webview(yt_webview_client):
+        if not _patch_webview(yt_webview_client, index):
             print("[-] Warning: Failed to patch YouTube WebViewClient.")
     else:
         print("[-] Warning: YouTube WebViewClient not found.")
 
     # 3. חסימת תמונות ב-WebView של התחברות ספוטיפיי
-    if not _patch_spotify_ui_image_block(decompiled_dir):
+    if not _patch_spotify_ui_image_block(index):
         print("[-] Warning: Failed to block images in Spotify UI. Continuing...")
 
     # 4. הזרקת חומת האש (URL Whitelist) ל-WebViewClient של ספוטיפיי - כאן נעשה עצירה קשיחה!
-    if not _patch_spotify_login_filter(decompiled_dir):
+    if not _patch_spotify_login_filter(index):
         print("[-] CRITICAL: Spotify URL filter patch failed. Aborting build to maintain security!")
         return False # זה מה שיכשיל את הבילד ב-GitHub Actions
         
@@ -116,17 +129,18 @@ def patch(decompiled_dir: str) -> bool:
 
 # --- פונקציות עזר פנימיות ---
 
-def _patch_thumbnail(root_dir):
+def _patch_thumbnail(index):
     print("[*] Searching for Thumbnail.smali to block image URLs...")
-    for root, dirs, files in os.walk(root_dir):
-        if "Thumbnail.smali" in files and "metrolist" in root and "models" in root:
-            target_path = os.path.join(root, "Thumbnail.smali")
+    for target_path in index.files_named("Thumbnail.smali"):
+        root = os.path.dirname(target_path)
+        if "metrolist" in root and "models" in root:
             try:
                 with open(target_path, 'r', encoding='utf-8') as f: content = f.read()
                 pattern = r'(iput-object p2, p0, Lcom/metrolist/innertube/models/Thumbnail;->(?:a|url):Ljava/lang/String;)'
                 if re.search(pattern, content):
                     new_content = re.sub(pattern, r'const-string p2, ""\n    \1', content)
                     with open(target_path, 'w', encoding='utf-8') as f: f.write(new_content)
+                    index.update(target_path, new_content)
                     print("[+] Thumbnail.smali: URL loading blocked.")
                     return True
             except Exception as e:
@@ -134,28 +148,16 @@ def _patch_thumbnail(root_dir):
             return False
     return False
 
-def _find_webview_client_target(root_dir):
-    for root, dirs, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith(".smali"):
-                path = os.path.join(root, file)
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        if 'VISITOR_DATA' in f.read():
-                            return path
-                except: pass
-    return None
-
-def _patch_spotify_images(root_dir):
+def _patch_spotify_images(index):
     """
     חוסם טעינת תמונות של ספוטיפיי על ידי איפוס הכתובת במודל SpotifyImage.
     (מבוסס על קוד Smali אמיתי - שדה 'a' מייצג את ה-URL)
     """
     print("[*] Searching for SpotifyImage.smali to block Spotify thumbnails...")
     target_found = False
-    for root, dirs, files in os.walk(root_dir):
-        if "SpotifyImage.smali" in files and "spotify" in root and "models" in root:
-            target_path = os.path.join(root, "SpotifyImage.smali")
+    for target_path in index.files_named("SpotifyImage.smali"):
+        root = os.path.dirname(target_path)
+        if "spotify" in root and "models" in root:
             try:
                 with open(target_path, 'r', encoding='utf-8') as f: content = f.read()
                 
@@ -167,6 +169,7 @@ def _patch_spotify_images(root_dir):
                     # ומיד לאחר מכן מבצעים את פקודת ההשמה המקורית (\1).
                     new_content = re.sub(pattern, r'const-string \2, ""\n    \1', content)
                     with open(target_path, 'w', encoding='utf-8') as f: f.write(new_content)
+                    index.update(target_path, new_content)
                     print("[+] SpotifyImage.smali: Spotify Image URLs blocked successfully.")
                     target_found = True
                 else:
@@ -175,7 +178,7 @@ def _patch_spotify_images(root_dir):
                 print(f"[-] Error patching SpotifyImage.smali: {e}")
     return target_found
 
-def _patch_webview(file_path):
+def _patch_webview(file_path, index=None):
     print(f"[*] Patching YouTube WebViewClient file: {os.path.basename(file_path)}...")
     try:
         with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
@@ -204,26 +207,18 @@ def _patch_webview(file_path):
                 print("[+] Injected cleaning JavaScript into onPageFinished.")
             
             with open(file_path, 'w', encoding='utf-8') as f: f.write(content)
+            if index is not None:
+                index.update(file_path, content)
             return True
     except Exception as e:
         print(f"[-] Error in YouTube WebView patch: {e}")
     return False
 
-def _patch_spotify_ui_image_block(root_dir):
+def _patch_spotify_ui_image_block(index):
     print("[*] Searching for Spotify UI to block images...")
-    target_file = None
-    for root, dirs, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith(".smali"):
-                path = os.path.join(root, file)
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        if '"https://accounts.spotify.com' in content and 'setUserAgentString' in content:
-                            target_file = path
-                            break
-                except: pass
-        if target_file: break
+    with_agent = set(index.files_containing(USER_AGENT_ANCHOR))
+    candidates = [p for p in index.files_containing(SPOTIFY_ACCOUNTS_ANCHOR) if p in with_agent]
+    target_file = candidates[0] if candidates else None
             
     if not target_file:
         print("[-] Could not find Spotify UI definition file.")
@@ -245,6 +240,7 @@ def _patch_spotify_ui_image_block(root_dir):
             injection = IMAGE_BLOCK_SMALI.format(settings_reg=settings_reg, scratch_reg=scratch_reg)
             new_content = content.replace(full_line, full_line + "\n" + injection)
             with open(target_file, 'w', encoding='utf-8') as f: f.write(new_content)
+            index.update(target_file, new_content)
             print("[+] Image blocking injected into Spotify Login UI.")
             return True
         else:
@@ -252,20 +248,9 @@ def _patch_spotify_ui_image_block(root_dir):
             return True
     return False
 
-def _patch_spotify_login_filter(root_dir):
+def _patch_spotify_login_filter(index):
     print("[*] Searching for Spotify WebViewClient to inject URL filter...")
-    target_file = None
-    for root, dirs, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith(".smali"):
-                path = os.path.join(root, file)
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        if '"SpotifyLogin: navigating to: "' in f.read():
-                            target_file = path
-                            break
-                except: pass
-        if target_file: break
+    target_file = index.find_file_containing(SPOTIFY_LOGIN_ANCHOR)
     
     if not target_file:
         print("[-] Could not find Spotify WebViewClient file.")
@@ -286,6 +271,7 @@ def _patch_spotify_login_filter(root_dir):
             # הזרקה בדיוק לפני הבדיקה המקורית של ספוטיפיי
             new_content = content[:match.start(3)] + injection + content[match.start(3):]
             with open(target_file, 'w', encoding='utf-8') as f: f.write(new_content)
+            index.update(target_file, new_content)
             print(f"[+] Spotify URL whitelist filter injected (Using URL register: {url_reg}).")
             return True
         else:
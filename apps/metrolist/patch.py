@@ -2,6 +2,11 @@ import os
 import re
 import shutil
 
+from core.smali_index import SmaliIndex
+
+WEBVIEW_ANCHOR = 'javascript:Android.onRetrieveVisitorData'
+SMALI_ANCHORS = [WEBVIEW_ANCHOR]
+
 # --- הגדרות ---
 # קוד ה-Smali לחומת האש (URL Filter) + הודעת ה-Toast
 URL_FILTER_SMALI = """
@@ -163,18 +168,24 @@ def _patch_strings(decompiled_dir: str) -> bool:
         print(f"[-] Target string '{STRING_NAME_TO_REPLACE}' was not found in any strings.xml files.")
         return False
 
-def patch(decompiled_dir: str) -> bool:
+def patch(decompiled_dir: str, ctx=None) -> bool:
+    """
+    Args:
+        ctx: Optional PatchContext from core.patcher (shared SmaliIndex).
+    """
     print("[*] Starting MetroList 'Kosher' patch...")
     
+    # מזיז ספריות בין תיקיות smali - חייב לרוץ לפני שהאינדקס סורק את העץ
     _free_up_main_dex(decompiled_dir)
+    index = ctx.index if ctx is not None else SmaliIndex(decompiled_dir, SMALI_ANCHORS)
     
-    if not _patch_thumbnail(decompiled_dir):
+    if not _patch_thumbnail(index):
         print("[-] Warning: Failed to patch Thumbnail.smali. Continuing...")
         
     # הפעלת פאצ' המחרוזות
     _patch_strings(decompiled_dir)
     
-    webview_client_file = _find_webview_client_target(decompiled_dir)
+    webview_client_file = _find_webview_client_target(decompiled_dir, index)
     if webview_client_file:
         if not _inject_url_filter(webview_client_file):
             print("[-] CRITICAL: URL filter patch failed. Aborting build to maintain security!")
@@ -186,25 +197,26 @@ def patch(decompiled_dir: str) -> bool:
     print("[+] MetroList patch applied successfully.")
     return True
 
-def _patch_thumbnail(root_dir):
+def _patch_thumbnail(index):
     print("[*] Searching for Thumbnail.smali to block image URLs...")
-    for root, dirs, files in os.walk(root_dir):
-        if "Thumbnail.smali" in files and "metrolist" in root and "models" in root:
-            target_path = os.path.join(root, "Thumbnail.smali")
+    for target_path in index.files_named("Thumbnail.smali"):
+        root = os.path.dirname(target_path)
+        if "metrolist" in root and "models" in root:
             try:
                 with open(target_path, 'r', encoding='utf-8') as f: content = f.read()
                 pattern = r'(iput-object p2, p0, Lcom/metrolist/innertube/models/Thumbnail;->(?:a|url):Ljava/lang/String;)'
                 if re.search(pattern, content):
                     new_content = re.sub(pattern, r'const-string p2, ""\n    \1', content)
                     with open(target_path, 'w', encoding='utf-8') as f: f.write(new_content)
+                    index.update(target_path, new_content)
                     print("[+] Thumbnail.smali: URL loading blocked.")
                     return True
             except Exception as e:
                 print(f"[-] Error patching Thumbnail.smali: {e}")
     return False
 
-def _find_webview_client_target(root_dir):
-    anchor_string = 'javascript:Android.onRetrieveVisitorData'
+def _find_webview_client_target(root_dir, index):
+    anchor_string = WEBVIEW_ANCHOR
     known_relative_path = os.path.join("com", "metrolist", "music", "ui", "screens", "LoginScreenKt$LoginScreen$1$1$1.smali")
     
     print("[*] Trying fast-path: Checking known class for WebViewClient...")
@@ -221,20 +233,11 @@ def _find_webview_client_target(root_dir):
                 except Exception:
                     pass
 
-    print("[i] Known class not found or anchor missing. Falling back to full scan...")
-    for root, dirs, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith(".smali"):
-                path = os.path.join(root, file)
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        if anchor_string in f.read():
-                            print(f"[+] Found WebViewClient file via fallback scan: {file}")
-                            return path
-                except (IOError, UnicodeDecodeError):
-                    pass
-                    
-    return None
+    print("[i] Known class not found or anchor missing. Falling back to the smali index...")
+    path = index.find_file_containing(anchor_string)
+    if path:
+        print(f"[+] Found WebViewClient file via fallback scan: {os.path.basename(path)}")
+    return path
 
 def _inject_url_filter(file_path):
     print(f"[*] Injecting URL Filter & Toast into: {os.path.basename(file_path)}...")
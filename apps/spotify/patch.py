@@ -4,6 +4,11 @@ import shutil
 import xml.etree.ElementTree as ET
 
 from core.repository import resolve_repository
+from core.smali_index import SmaliIndex
+
+ALBUM_ART_ANCHOR = 'ALBUM_ART_URI'
+MEDIA_METADATA_ANCHOR = 'Landroid/support/v4/media/MediaMetadataCompat;'
+SMALI_ANCHORS = [ALBUM_ART_ANCHOR, MEDIA_METADATA_ANCHOR]
 
 def get_package_name(manifest_path: str) -> str:
     """קורא את ה-AndroidManifest.xml כדי לחלץ את שם החבילה של האפליקציה."""
@@ -56,8 +61,13 @@ def get_main_activity_smali_path(manifest_path: str) -> str:
         print(f"[-] Could not parse main activity from manifest: {e}")
     return None
 
-def patch(decompiled_dir: str) -> bool:
+def patch(decompiled_dir: str, ctx=None) -> bool:
+    """
+    Args:
+        ctx: Optional PatchContext from core.patcher (shared SmaliIndex).
+    """
     print(f"[*] Starting patch process in {decompiled_dir}...")
+    index = ctx.index if ctx is not None else SmaliIndex(decompiled_dir, SMALI_ANCHORS)
     
     current_script_dir = os.path.dirname(os.path.abspath(__file__))
     payload_dir = os.path.join(current_script_dir, "updater_payload")
@@ -85,34 +95,34 @@ def patch(decompiled_dir: str) -> bool:
     # =========================================================================
     print("[*] Applying Spotify-specific patches...")
     target_worker_file = "sharehousekeepingworker.smali"
-    for root, dirs, files in os.walk(decompiled_dir):
-        for filename in files:
-            if filename.lower() == target_worker_file:
-                try:
-                    os.remove(os.path.join(root, filename))
-                    print(f"[+] Deleted {filename}")
-                except Exception as e:
-                    print(f"[-] Failed to delete {filename}: {e}")
-
-        if "EsImage$ImageData.smali" in files:
-            file_path = os.path.join(root, "EsImage$ImageData.smali")
-            with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
-            new_content = re.sub(
-                r"(\.method public final getData\(\)L.*?;.*?)(\.line \d+.*?iget-object\s+[vp]\d+,\s+[vp]\d+,\s+Lcom\/spotify\/image\/esperanto\/proto\/EsImage\$ImageData;->.*?:L.*?;)(.*?.end method)",
-                r"\1\n    const/4 v0, 0x0\n    return-object v0\n\3", content, flags=re.DOTALL)
-            if new_content != content:
-                with open(file_path, 'w', encoding='utf-8') as f: f.write(new_content)
-                print("[+] Patched EsImage$ImageData")
-
-        if "VideoSurfaceView.smali" in files:
-            file_path = os.path.join(root, "VideoSurfaceView.smali")
-            with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
-            new_content = re.sub(
-                r"(\.method public getTextureView\(\)Landroid\/view\/TextureView;.*?)(\.line \d+.*?iget-object\s+[vp]\d+,\s+[vp]\d+,\s+Lcom\/spotify\/betamax\/player\/VideoSurfaceView;->.*?:Landroid\/view\/TextureView;)(.*?.end method)",
-                r"\1\n    const/4 v0, 0x0\n    return-object v0\n\3", content, flags=re.DOTALL)
-            if new_content != content:
-                with open(file_path, 'w', encoding='utf-8') as f: f.write(new_content)
-                print("[+] Patched VideoSurfaceView")
+    for path in list(index.files):
+        filename = os.path.basename(path)
+        if filename.lower() == target_worker_file:
+            try:
+                os.remove(path)
+                print(f"[+] Deleted {filename}")
+            except Exception as e:
+                print(f"[-] Failed to delete {filename}: {e}")
+
+    for file_path in index.files_named("EsImage$ImageData.smali"):
+        with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
+        new_content = re.sub(
+            r"(\.method public final getData\(\)L.*?;.*?)(\.line \d+.*?iget-object\s+[vp]\d+,\s+[vp]\d+,\s+Lcom\/spotify\/image\/esperanto\/proto\/EsImage\$ImageData;->.*?:L.*?;)(.*?.end method)",
+            r"\1\n    const/4 v0, 0x0\n    return-object v0\n\3", content, flags=re.DOTALL)
+        if new_content != content:
+            with open(file_path, 'w', encoding='utf-8') as f: f.write(new_content)
+            index.update(file_path, new_content)
+            print("[+] Patched EsImage$ImageData")
+
+    for file_path in index.files_named("VideoSurfaceView.smali"):
+        with open(file_path, 'r', encoding='utf-8') as f: content = f.read()
+        new_content = re.sub(
+            r"(\.method public getTextureView\(\)Landroid\/view\/TextureView;.*?)(\.line \d+.*?iget-object\s+[vp]\d+,\s+[vp]\d+,\s+Lcom\/spotify\/betamax\/player\/VideoSurfaceView;->.*?:Landroid\/view\/TextureView;)(.*?.end method)",
+            r"\1\n    const/4 v0, 0x0\n    return-object v0\n\3", content, flags=re.DOTALL)
+        if new_content != content:
+            with open(file_path, 'w', encoding='utf-8') as f: f.write(new_content)
+            index.update(file_path, new_content)
+            print("[+] Patched VideoSurfaceView")
 
     # =========================================================================
     # חלק 1.5: ביטול תמונת האלבום בנגן ההתראות (MediaMetadataCompat) - חובה
@@ -134,22 +144,19 @@ def patch(decompiled_dir: str) -> bool:
     target_path = None
     target_content = None
 
-    # שלב 1: איתור הקובץ הבונה
-    for root, dirs, files in os.walk(decompiled_dir):
-        for file in files:
-            if not file.endswith('.smali'):
-                continue
-            path = os.path.join(root, file)
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            except Exception:
-                continue
-            if builder_re.search(content) and 'ALBUM_ART_URI' in content:
-                target_path = path
-                target_content = content
-                break
-        if target_path:
+    # שלב 1: איתור הקובץ הבונה - רק בקבצים שמכילים את שני העוגנים לפי האינדקס
+    candidates = set(index.files_containing(ALBUM_ART_ANCHOR))
+    for path in index.files_containing(MEDIA_METADATA_ANCHOR):
+        if path not in candidates:
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception:
+            continue
+        if builder_re.search(content):
+            target_path = path
+            target_content = content
             break
 
     if not target_path:
@@ -184,6 +191,7 @@ def patch(decompiled_dir: str) -> bool:
 
     with open(target_path, 'w', encoding='utf-8') as f:
         f.write(new_content)
+    index.update(target_path, new_content)
     print(f"[+] Notification album art disabled successfully in {target_path}")
 
     # =========================================================================
@@ -299,51 +307,50 @@ def patch(decompiled_dir: str) -> bool:
     main_activity_patched = False
     target_filename = os.path.basename(target_activity_smali)
 
-    for root, _, files in os.walk(decompiled_dir):
-        if target_filename in files:
-            full_path = os.path.join(root, target_filename)
-            if target_activity_smali.replace('/', os.sep) not in full_path:
-                continue
+    for full_path in index.files_named(target_filename):
+        if target_activity_smali.replace('/', os.sep) not in full_path:
+            continue
 
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    main_smali_content = f.read()
+        try:
+            with open(full_path, 'r', encoding='utf-8') as f:
+                main_smali_content = f.read()
 
-                if "Lstoreautoupdater/Updater;->check" in main_smali_content:
-                    print("[i] Updater call already exists in MainActivity.")
-                    main_activity_patched = True
-                else:
-                    method_pattern = re.compile(r"(\.method.*?onCreate\(Landroid/os/Bundle;\)V)(.*?)(\.end method)", re.DOTALL)
-                    match = method_pattern.search(main_smali_content)
+            if "Lstoreautoupdater/Updater;->check" in main_smali_content:
+                print("[i] Updater call already exists in MainActivity.")
+                main_activity_patched = True
+            else:
+                method_pattern = re.compile(r"(\.method.*?onCreate\(Landroid/os/Bundle;\)V)(.*?)(\.end method)", re.DOTALL)
+                match = method_pattern.search(main_smali_content)
                     
-                    if match:
-                        method_body = match.group(2)
-                        last_return_idx = method_body.rfind("return-void")
+                if match:
+                    method_body = match.group(2)
+                    last_return_idx = method_body.rfind("return-void")
                         
-                        if last_return_idx != -1:
-                            updater_call = (
-                                "\n\n    # --- START INJECTION (Universal Updater) ---\n"
-                                "    move-object v0, p0\n"
-                                "    invoke-static {v0}, Lstoreautoupdater/Updater;->check(Landroid/content/Context;)V\n"
-                                "    # --- END INJECTION ---\n\n    "
-                            )
+                    if last_return_idx != -1:
+                        updater_call = (
+                            "\n\n    # --- START INJECTION (Universal Updater) ---\n"
+                            "    move-object v0, p0\n"
+                            "    invoke-static {v0}, Lstoreautoupdater/Updater;->check(Landroid/content/Context;)V\n"
+                            "    # --- END INJECTION ---\n\n    "
+                        )
                             
-                            new_method_body = method_body[:last_return_idx] + updater_call + method_body[last_return_idx:]
-                            new_full_method = match.group(1) + new_method_body + match.group(3)
-                            main_smali_content = main_smali_content.replace(match.group(0), new_full_method, 1)
+                        new_method_body = method_body[:last_return_idx] + updater_call + method_body[last_return_idx:]
+                        new_full_method = match.group(1) + new_method_body + match.group(3)
+                        main_smali_content = main_smali_content.replace(match.group(0), new_full_method, 1)
 
-                            with open(full_path, 'w', encoding='utf-8') as f:
-                                f.write(main_smali_content)
+                        with open(full_path, 'w', encoding='utf-8') as f:
+                            f.write(main_smali_content)
+                        index.update(full_path, main_smali_content)
                                 
-                            main_activity_patched = True
-                            print(f"[+] Updater call injected successfully into {target_activity_smali}")
-                        else:
-                            print(f"[-] Could not find 'return-void' in {target_filename} onCreate().")
+                        main_activity_patched = True
+                        print(f"[+] Updater call injected successfully into {target_activity_smali}")
                     else:
-                        print(f"[-] Could not find onCreate() in {target_filename}.")
-            except Exception as e:
-                print(f"[-] Failed to process {target_filename}: {e}")
-            break
+                        print(f"[-] Could not find 'return-void' in {target_filename} onCreate().")
+                else:
+                    print(f"[-] Could not find onCreate() in {target_filename}.")
+        except Exception as e:
+            print(f"[-] Failed to process {target_filename}: {e}")
+        break
             
     if not main_activity_patched:
         print(f"[-] Error: Failed to patch {target_activity_smali}.")
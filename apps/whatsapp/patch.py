@@ -4,58 +4,145 @@ import zipfile
 from cryptography.hazmat.primitives.serialization import pkcs7
 from cryptography.hazmat.primitives import serialization
 import xml.etree.ElementTree as ET
-import difflib
-import socket
+
+from core.diff_recorder import DiffRecorder
+from core.parallel_rewrite import RewriteRule, rewrite_files
+from core.patch_rules import PatchRule, compile_rules
+from core.smali import SmaliClass
+from core.tracing import traced
+from core.smali_index import SmaliIndex
+
+# מחרוזות העוגן של כל הפאצ'ים - נענות במעבר יחיד על עץ ה-smali
+SMALI_ANCHORS = [
+    'contactPhotosBitmapManager/getphotofast/',
+    "NewsletterLinkLauncher/type not handled",
+    "Tried to set badge for invalid tab id",
+    "Please set reporter for SecurePendingIntent library",
+    "Lcom/whatsapp/status/playback/StatusPlaybackActivity;",
+    "ExpressionsKeyboardOpener = ",
+    "SecureFileBuilder",
+    '"INVOKE_RETURN"',
+    "Landroid/content/pm/PackageManager;->getPackageInfo(Ljava/lang/String;I)",
+    "channel",
+    '"@newsletter"',
+    "provider.media",
+]
+_index = None
 
 # --- מערכת ההשוואה (DIFF) לדיבוג ---
-GLOBAL_DIFF_TEXT = ""
+# ההשוואות נכתבות מיד לקובץ דחוס (core.diff_recorder) במקום להצטבר בזיכרון
+_diffs = None
 
 def _save_and_accumulate_diff(filepath, old_content, new_content):
-    """שומר את הקובץ ומוסיף את ההשוואה לזיכרון במקום להדפיס"""
-    global GLOBAL_DIFF_TEXT
+    """שומר את הקובץ ורושם את ההשוואה לקובץ ה-diff"""
     if old_content != new_content:
-        diff = difflib.unified_diff(
-            old_content.splitlines(),
-            new_content.splitlines(),
-            fromfile=f"a/{os.path.basename(filepath)}",
-            tofile=f"b/{os.path.basename(filepath)}",
-            lineterm=''
-        )
-        # מוסיפים את ההשוואה למשתנה הגלובלי
-        GLOBAL_DIFF_TEXT += f"\n\n{'='*50}\n--- CHANGES IN {os.path.basename(filepath)} ---\n{'='*50}\n"
-        GLOBAL_DIFF_TEXT += "\n".join(diff)
+        if _diffs is not None:
+            _diffs.record(filepath, old_content, new_content)
         
         # שומרים את הקובץ
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(new_content)
-
-def _upload_diffs_at_the_end():
-    """מעלה את הכל לשרת אנונימי ומדפיס לינק"""
-    global GLOBAL_DIFF_TEXT
-    if not GLOBAL_DIFF_TEXT.strip():
-        print("    [-] No diffs were recorded.")
-        return
-    
-    try:
-        print("\n[*] Uploading diffs to Termbin (Pastebin)...")
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.settimeout(10)
-        s.connect(("termbin.com", 9999))
-        s.sendall(GLOBAL_DIFF_TEXT.encode("utf-8"))
-        url = s.recv(1024).decode("utf-8").strip()
-        s.close()
-        
-        print(f"\n========================================================")
-        print(f"[!] DIFF READY TO VIEW! CLICK HERE: {url}")
-        print(f"========================================================\n")
-    except Exception as e:
-        print(f"[-] Failed to upload diff: {e}")
+        if _index is not None:
+            _index.update(filepath, new_content)
 # -------------------------------------
 
-
-def patch(decompiled_dir: str) -> bool: 
+# --- כללי פאצ' הצהרתיים (core.patch_rules) - מקומפלים פעם אחת ורצים במעבר יחיד ---
+_DECLARATION = r"(\s+(?:\.locals|\.registers) \d+)"
+
+
+def _neutralize_invoke_return(match):
+    """משאיר רק את שורת ה-registers ו-return-void בתוך המתודה"""
+    signature, body, end_method = match.group(1), match.group(2), match.group(3)
+    registers_line = "    .registers 1"
+    for line in body.splitlines():
+        clean = line.strip()
+        if clean.startswith(".registers") or clean.startswith(".locals"):
+            registers_line = "    " + clean
+            break
+    return f"{signature}\n{registers_line}\n    # Neutralized INVOKE_RETURN crash\n    return-void\n{end_method}"
+
+
+PATCH_RULES = compile_rules([
+    # 1. חסימת תמונות פרופיל
+    PatchRule(
+        name="photos-bitmap",
+        anchor="contactPhotosBitmapManager/getphotofast/",
+        pattern=r"(\.method public final \w+\(Landroid\/content\/Context;L[^;]+;Ljava\/lang\/String;FIJZZ\)Landroid\/graphics\/Bitmap;)" + _DECLARATION,
+        replacement=r"\1\2\n    const/4 v0, 0x0\n    return-object v0",
+        expect=(0, None),
+    ),
+    PatchRule(
+        name="photos-stream",
+        anchor="contactPhotosBitmapManager/getphotofast/",
+        pattern=r"(\.method public final \w+\(L[^;]+;Z\)Ljava\/io\/InputStream;)" + _DECLARATION,
+        replacement=r"\1\2\n    const/4 v0, 0x0\n    return-object v0",
+        expect=(0, None),
+    ),
+    # 2. נטרול ניוזלטר
+    PatchRule(
+        name="newsletter-entry",
+        anchor="NewsletterLinkLauncher/type not handled",
+        pattern=r"(\.method public final \w+\(Landroid\/content\/Context;Landroid\/net\/Uri;\)V)" + _DECLARATION,
+        replacement=r"\1\2\n    return-void",
+        expect=(0, None),
+    ),
+    PatchRule(
+        name="newsletter-main",
+        anchor="NewsletterLinkLauncher/type not handled",
+        pattern=r"(\.method public final \w+\(Landroid\/content\/Context;Landroid\/net\/Uri;L[^;]+;Ljava\/lang\/Integer;Ljava\/lang\/Long;Ljava\/lang\/String;IJ\)V)" + _DECLARATION,
+        replacement=r"\1\2\n    return-void",
+        expect=(0, None),
+    ),
+    # 4. תיקון SecurePendingIntent (אופציונלי)
+    PatchRule(
+        name="spi-reporter",
+        anchor="Please set reporter for SecurePendingIntent library",
+        pattern=r"(if-nez [vp]\d+, (:cond_\w+))(\s*(?:\.line \d+\s*)*)(const-string [vp]\d+, \"Please set reporter)",
+        replacement=r"goto \2\3\4",
+        expect=(0, None),
+    ),
+    # עקיפת בדיקת ה-null של Kotlin (רק המתודה עם INVOKE_RETURN)
+    PatchRule(
+        name="kotlin-invoke-return",
+        anchor='"INVOKE_RETURN"',
+        method=r"\.method public static \w+\(Ljava/lang/Object;\)V",
+        pattern=r"\A(\.method[^\n]*)(.*?)(\.end method)\Z",
+        flags=re.DOTALL,
+        replacement=_neutralize_invoke_return,
+        limit=1,
+    ),
+])
+_report = None
+
+
+@traced("patch_rules")
+def _apply_patch_rules(root_dir):
+    """מריץ את כל הכללים (תמונות, ניוזלטר, SPI, INVOKE_RETURN) במעבר אחד; הפאצ'ים רק קוראים את הדוח"""
+    global _report
+    print("\n[0] Declarative patch rules (one pass: photos, newsletter, spi-reporter, kotlin-invoke-return)...")
+    _report = PATCH_RULES.apply(_get_index(root_dir), diffs=_diffs, root_dir=root_dir)
+    return _report
+
+
+def patch(decompiled_dir: str, ctx=None) -> bool: 
+    global _index, _diffs, _report
     print(f"[*] Starting WhatsApp Kosher patch (Smart Line-by-Line Execution)...") 
-     
+    _index = ctx.index if ctx is not None else SmaliIndex(decompiled_dir, SMALI_ANCHORS)
+    _diffs = ctx.diffs if ctx is not None else None
+    _report = None
+    if _diffs is None:
+        # הרצה עצמאית - רושמים את ההשוואות לקובץ משלנו
+        diff_path = os.path.join(os.path.dirname(os.path.abspath(decompiled_dir)), "whatsapp.diff.gz")
+        with DiffRecorder(diff_path, root_dir=decompiled_dir) as recorder:
+            _diffs = recorder
+            return _run_patches(decompiled_dir)
+    return _run_patches(decompiled_dir)
+
+
+def _run_patches(decompiled_dir: str) -> bool:
+    # 0. כל הכללים ההצהרתיים במעבר אחד, לפני שאר הפאצ'ים
+    _apply_patch_rules(decompiled_dir)
+
     # 1. חסימות תוכן רגילות 
     photos = _patch_profile_photos(decompiled_dir) 
     newsletter = _patch_newsletter_launcher(decompiled_dir) 
@@ -83,8 +170,6 @@ def patch(decompiled_dir: str) -> bool:
     
     results = [photos, newsletter, tabs, links_nuke, spi, browser, ai_kill, status_nuke, status_redirect, gifs_tab, mime_crash, sig_bypass, kotlin_fix, nuke_conv, media_provider] 
      
-    _upload_diffs_at_the_end()
-
     if all(results): 
         print("\n[SUCCESS] All patches applied successfully!") 
         return True 
@@ -96,77 +181,31 @@ def patch(decompiled_dir: str) -> bool:
 # --------------------------------------------------------- 
 # 1. חסימת תמונות פרופיל 
 # --------------------------------------------------------- 
+@traced()
 def _patch_profile_photos(root_dir): 
-    anchor = 'contactPhotosBitmapManager/getphotofast/' 
-    print(f"\n[1] Scanning for Photo Manager ({anchor})...") 
-     
-    target_file = _find_file_by_string(root_dir, anchor) 
-    if not target_file: 
-        print("    [-] File not found.") 
-        return False 
- 
-    try: 
-        with open(target_file, 'r', encoding='utf-8') as f: content = f.read() 
-        original_content = content 
-         
-        declaration_pattern = r"(\s+(?:\.locals|\.registers) \d+)" 
- 
-        bitmap_regex = r"(\.method public final \w+\(Landroid\/content\/Context;L[^;]+;Ljava\/lang\/String;FIJZZ\)Landroid\/graphics\/Bitmap;)" + declaration_pattern 
-        content = re.sub(bitmap_regex, r"\1\2\n    const/4 v0, 0x0\n    return-object v0", content) 
- 
-        stream_regex = r"(\.method public final \w+\(L[^;]+;Z\)Ljava\/io\/InputStream;)" + declaration_pattern 
-        content = re.sub(stream_regex, r"\1\2\n    const/4 v0, 0x0\n    return-object v0", content) 
-         
-        if content != original_content: 
-            print("    [+] Photo loaders blocked successfully.") 
-            _save_and_accumulate_diff(target_file, original_content, content)
-            return True 
-        else: 
-            print("    [-] Photo loader signatures not found.") 
-            return False 
-    except Exception as e: 
-        print(f"    [-] Error: {e}") 
-        return False 
+    print("\n[1] Photo loaders (rules: photos-bitmap, photos-stream)...") 
+    if _report.count("photos-bitmap", "photos-stream"): 
+        print("    [+] Photo loaders blocked successfully.") 
+        return True 
+    print("    [-] Photo loader signatures not found.") 
+    return False 
  
 # --------------------------------------------------------- 
 # 2. נטרול ניוזלטר 
 # --------------------------------------------------------- 
+@traced()
 def _patch_newsletter_launcher(root_dir): 
-    anchor = "NewsletterLinkLauncher/type not handled" 
-    print(f"\n[2] Scanning for Newsletter Launcher ({anchor})...") 
-     
-    target_file = _find_file_by_string(root_dir, anchor) 
-    if not target_file: 
-        print("    [-] File not found.") 
-        return False 
- 
-    try: 
-        with open(target_file, 'r', encoding='utf-8') as f: content = f.read() 
-        original_content = content 
-         
-        injection = "\n    return-void" 
-        declaration_pattern = r"(\s+(?:\.locals|\.registers) \d+)" 
-         
-        entry_regex = r"(\.method public final \w+\(Landroid\/content\/Context;Landroid\/net\/Uri;\)V)" + declaration_pattern 
-        content = re.sub(entry_regex, r"\1\2" + injection, content) 
- 
-        main_regex = r"(\.method public final \w+\(Landroid\/content\/Context;Landroid\/net\/Uri;L[^;]+;Ljava\/lang\/Integer;Ljava\/lang\/Long;Ljava\/lang\/String;IJ\)V)" + declaration_pattern 
-        content = re.sub(main_regex, r"\1\2" + injection, content) 
- 
-        if content != original_content: 
-            print("    [+] Newsletter launcher methods killed.") 
-            _save_and_accumulate_diff(target_file, original_content, content)
-            return True 
-        else: 
-            print("    [-] Newsletter launcher signatures not found.") 
-            return False 
-    except Exception as e: 
-        print(f"    [-] Error: {e}") 
-        return False 
+    print("\n[2] Newsletter Launcher (rules: newsletter-entry, newsletter-main)...") 
+    if _report.count("newsletter-entry", "newsletter-main"): 
+        print("    [+] Newsletter launcher methods killed.") 
+        return True 
+    print("    [-] Newsletter launcher signatures not found.") 
+    return False 
  
 # --------------------------------------------------------- 
 # 3. הסרת טאב העדכונים (UI + Badges) - FIXED PYTHON REGEX
 # --------------------------------------------------------- 
+@traced()
 def _patch_home_tabs(root_dir): 
     import re
     anchor = "Tried to set badge for invalid tab id" 
@@ -211,35 +250,20 @@ def _patch_home_tabs(root_dir):
 # --------------------------------------------------------- 
 # 4. תיקון SecurePendingIntent 
 # --------------------------------------------------------- 
+@traced()
 def _patch_secure_pending_intent(root_dir): 
-    anchor = "Please set reporter for SecurePendingIntent library" 
-    print(f"\n[4] Scanning for SecurePendingIntent ({anchor})...") 
-     
-    target_file = _find_file_by_string(root_dir, anchor) 
-    if not target_file: 
-        print("    [i] File not found (optional, skipping).") 
-        return True  
- 
-    try: 
-        with open(target_file, 'r', encoding='utf-8') as f: content = f.read() 
-        original_content = content
-        pattern = re.compile(r"(if-nez [vp]\d+, (:cond_\w+))(\s*(?:\.line \d+\s*)*)(const-string [vp]\d+, \"Please set reporter)") 
-        new_content, num_subs = pattern.subn(r"goto \2\3\4", content) 
-         
-        if num_subs > 0: 
-            _save_and_accumulate_diff(target_file, original_content, new_content)
-            print(f"    [SUCCESS] Bypassed {num_subs} SecurePendingIntent checks.") 
-            return True 
-        else: 
-            print("    [-] Check not found or already bypassed.") 
-            return True 
-    except Exception as e: 
-        print(f"    [-] Error: {e}") 
-        return False 
+    print("\n[4] SecurePendingIntent (rule: spi-reporter, optional)...") 
+    num_subs = _report.count("spi-reporter") 
+    if num_subs > 0: 
+        print(f"    [SUCCESS] Bypassed {num_subs} SecurePendingIntent checks.") 
+    else: 
+        print("    [-] Check not found or already bypassed.") 
+    return True 
  
 # --------------------------------------------------------- 
 # 5. חסימת דפדפן פנימי 
 # --------------------------------------------------------- 
+@traced()
 def _patch_force_external_browser(root_dir): 
     target_filename = "WaInAppBrowsingActivity.smali" 
     print(f"\n[5] Hijacking Internal Browser ({target_filename})...") 
@@ -253,16 +277,14 @@ def _patch_force_external_browser(root_dir):
         with open(target_file, 'r', encoding='utf-8') as f: content = f.read() 
         original_content = content
  
-        super_class_match = re.search(r"^\.super\s+(L[^;]+;)", content, re.MULTILINE) 
-        if not super_class_match: return False 
-        parent_class = super_class_match.group(1) 
+        smali_class = SmaliClass(content, target_file) 
+        parent_class = smali_class.super_class 
+        if not parent_class: return False 
  
-        method_pattern = re.compile(r"(\.method public onCreate\(Landroid\/os\/Bundle;\)V)(.*?)(\.end method)", re.DOTALL) 
-        match = method_pattern.search(content) 
-        if not match: return False 
+        on_create = smali_class.method("onCreate(Landroid/os/Bundle;)V") 
+        if not on_create: return False 
  
-        original_body = match.group(2) 
-        new_body = f""" 
+        new_body = f"""
     .locals 4 
     invoke-super {{p0, p1}}, {parent_class}->onCreate(Landroid/os/Bundle;)V 
     invoke-virtual {{p0}}, Landroid/app/Activity;->getIntent()Landroid/content/Intent; 
@@ -295,7 +317,7 @@ def _patch_force_external_browser(root_dir):
     invoke-virtual {{p0}}, Landroid/app/Activity;->finish()V 
     return-void 
 """ 
-        new_content = content.replace(original_body, new_body) 
+        new_content = smali_class.splice(on_create.header_end, on_create.body_end, new_body) 
         _save_and_accumulate_diff(target_file, original_content, new_content)
         print(f"    [+] Browser hijacked successfully!") 
         return True 
@@ -306,6 +328,7 @@ def _patch_force_external_browser(root_dir):
 # --------------------------------------------------------- 
 # 6. הריגת נגן הסטטוסים 
 # --------------------------------------------------------- 
+@traced()
 def _patch_nuke_status_activity(root_dir): 
     target_filename = "StatusPlaybackActivity.smali" 
     print(f"\n[6] Nuking Status Playback Activity ({target_filename})...") 
@@ -352,6 +375,7 @@ def _patch_nuke_status_activity(root_dir):
 # --------------------------------------------------------- 
 # 7. הטיית הפניות לסטטוס 
 # --------------------------------------------------------- 
+@traced()
 def _patch_redirect_status_intents(root_dir): 
     target_status_class = "Lcom/whatsapp/status/playback/StatusPlaybackActivity;" 
     redirect_class = "Lcom/whatsapp/HomeActivity;"  
@@ -369,18 +393,9 @@ def _patch_redirect_status_intents(root_dir):
  
     print(f"    [i] Redirecting to: {final_redirect}") 
      
-    patched_count = 0 
-    for root, dirs, files in os.walk(root_dir): 
-        for file in files: 
-            if file.endswith(".smali") and file != "StatusPlaybackActivity.smali": 
-                path = os.path.join(root, file) 
-                try: 
-                    with open(path, 'r', encoding='utf-8') as f: content = f.read() 
-                    if target_status_class in content: 
-                        new_content = content.replace(target_status_class, final_redirect) 
-                        _save_and_accumulate_diff(path, content, new_content)
-                        patched_count += 1 
-                except: continue 
+    paths = [p for p in _smali_files_containing(root_dir, target_status_class) 
+             if os.path.basename(p) != "StatusPlaybackActivity.smali"] 
+    patched_count = len(_rewrite_all(paths, [RewriteRule(target_status_class, final_redirect)])) 
  
     print(f"    [+] Redirected {patched_count} references.") 
     return True 
@@ -388,6 +403,7 @@ def _patch_redirect_status_intents(root_dir):
 # --------------------------------------------------------- 
 # 8. אלגוריתם חכם ומוחלט לחסימת הגיפים (מבוסס חקר קוד) 
 # --------------------------------------------------------- 
+@traced()
 def _patch_gifs_tab(root_dir): 
     anchor = "ExpressionsKeyboardOpener = " 
     print(f"\n[8] Executing Surgical GIF Removal...") 
@@ -509,6 +525,7 @@ def _patch_gifs_tab(root_dir):
 # ---------------------------------------------------------
 # 10. Companion Mode Redirect (Bypass EULA)
 # ---------------------------------------------------------
+@traced()
 def _patch_companion_mode_redirect(decompiled_dir: str) -> bool:
     print("\n[*] Injecting Companion Mode Redirect (Bypassing EULA)...")
     
@@ -516,24 +533,22 @@ def _patch_companion_mode_redirect(decompiled_dir: str) -> bool:
     target = '"com.whatsapp.companionmode.registration.ui.RegisterAsCompanionActivity"'
     patched_count = 0
 
-    for root, dirs, files in os.walk(decompiled_dir):
-        for file in files:
-            if not file.endswith(".smali"): continue
-            path = os.path.join(root, file)
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+    for path in _smali_files_containing(decompiled_dir, anchor):
+        file = os.path.basename(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
 
-                if anchor in content:
-                    new_content = content.replace(anchor, target)
-                    _save_and_accumulate_diff(path, content, new_content)
-                    
-                    # סופרים כמה החלפות בוצעו בקובץ הנוכחי
-                    occurrences = content.count(anchor)
-                    patched_count += occurrences
-                    print(f"    [+] Redirected {occurrences} EULA calls to Companion Mode in: {file}")
-            except Exception as e:
-                print(f"    [-] Error processing {file}: {e}")
+            if anchor in content:
+                new_content = content.replace(anchor, target)
+                _save_and_accumulate_diff(path, content, new_content)
+                
+                # סופרים כמה החלפות בוצעו בקובץ הנוכחי
+                occurrences = content.count(anchor)
+                patched_count += occurrences
+                print(f"    [+] Redirected {occurrences} EULA calls to Companion Mode in: {file}")
+        except Exception as e:
+            print(f"    [-] Error processing {file}: {e}")
 
     if patched_count > 0:
         print(f"    [+] Total EULA redirects applied: {patched_count}")
@@ -545,6 +560,7 @@ def _patch_companion_mode_redirect(decompiled_dir: str) -> bool:
 # --------------------------------------------------------- 
 # 9. מעקף חכם לקריסת MimeType של מערכת ההפעלה 
 # --------------------------------------------------------- 
+@traced()
 def _patch_mime_type_crash(root_dir): 
     anchor_string = "SecureFileBuilder" 
     print(f"\n[9] Scanning for SecureFile OS Crash Trigger ({anchor_string})...") 
@@ -588,68 +604,16 @@ def extract_original_signature(apk_path: str) -> str:
 
 # --- מודולי הפאצ' ---
 
+@traced()
 def _patch_kotlin_null_check(decompiled_dir: str) -> bool:
-    print("\n[*] Applying Kotlin Null-Check Bypass (INVOKE_RETURN only)...")
-    anchor_string = '"INVOKE_RETURN"'
-    
-    for root, _, files in os.walk(decompiled_dir):
-        for file in files:
-            if not file.endswith(".smali"):
-                continue
-            
-            file_path = os.path.join(root, file)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                original_content = content
-
-                if anchor_string not in content:
-                    continue
-                    
-                print(f"    [+] Found Kotlin Intrinsics class: {os.path.relpath(file_path, decompiled_dir)}")
-                
-                method_pattern = re.compile(
-                    r"(\.method public static \w+\(Ljava/lang/Object;\)V)(.*?)(\.end method)", 
-                    re.DOTALL
-                )
-                
-                new_content = content
-                patched = False
-                
-                for match in method_pattern.finditer(content):
-                    full_method = match.group(0)
-                    signature = match.group(1)
-                    body = match.group(2)
-                    end_method = match.group(3)
-                    
-                    if anchor_string in body:
-                        registers_line = "    .registers 1"
-                        for line in body.splitlines():
-                            clean = line.strip()
-                            if clean.startswith(".registers") or clean.startswith(".locals"):
-                                registers_line = "    " + clean
-                                break
-                        
-                        new_method = f"{signature}\n{registers_line}\n    # Neutralized INVOKE_RETURN crash\n    return-void\n{end_method}"
-                        
-                        new_content = new_content.replace(full_method, new_method)
-                        patched = True
-                        break
-                
-                if patched:
-                    _save_and_accumulate_diff(file_path, original_content, new_content)
-                    print("    [+] Successfully neutralized the specific INVOKE_RETURN method.")
-                    return True
-                else:
-                    print("    [-] Found anchor string but could not isolate the specific method properly.")
-                    
-            except Exception as e:
-                print(f"    [-] Error processing file: {e}")
-                continue
-
+    print("\n[*] Applying Kotlin Null-Check Bypass (INVOKE_RETURN only, rule: kotlin-invoke-return)...")
+    if _report.ok("kotlin-invoke-return"):
+        print("    [+] Successfully neutralized the specific INVOKE_RETURN method.")
+        return True
     print("    [-] CRITICAL: Could not find or patch the INVOKE_RETURN method.")
     return False
 
+@traced()
 def _patch_signature_bypass(decompiled_dir: str) -> bool:
     print("\n[*] Injecting Advanced Static Signature Bypass...")
     
@@ -662,7 +626,8 @@ def _patch_signature_bypass(decompiled_dir: str) -> bool:
         print(f"    [-] Could not read manifest: {e}")
         return False
 
-    original_apk = "latest.apk"
+    # המקור נמצא לצד תיקיית הפירוק (גם בריצה מקבילית עם תיקיית עבודה פרטית)
+    original_apk = os.path.join(os.path.dirname(os.path.abspath(decompiled_dir)), "latest.apk")
     if not os.path.exists(original_apk):
         print(f"    [-] {original_apk} not found. Cannot extract signature.")
         return False
@@ -676,27 +641,14 @@ def _patch_signature_bypass(decompiled_dir: str) -> bool:
 
     print("    [*] Redirecting getPackageInfo calls to SigBypass...")
     pattern = re.compile(r"invoke-virtual (\{[^}]+\}), Landroid/content/pm/PackageManager;->getPackageInfo\(Ljava/lang/String;I\)Landroid/content/pm/PackageInfo;")
-    patched_count = 0
-    
-    for root_path, _, files in os.walk(decompiled_dir):
-        for file in files:
-            if file.endswith("SigBypass.smali"): continue 
-            if file.endswith(".smali"):
-                full_path = os.path.join(root_path, file)
-                try:
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    original_content = content
-                    new_content, subs = pattern.subn(
-                        r"invoke-static \1, Lcom/whatsapp/kosher/SigBypass;->getPackageInfo(Landroid/content/pm/PackageManager;Ljava/lang/String;I)Landroid/content/pm/PackageInfo;",
-                        content
-                    )
-                    if subs > 0:
-                        _save_and_accumulate_diff(full_path, original_content, new_content)
-                        patched_count += subs
-                except Exception:
-                    continue
-                    
+    paths = [p for p in _smali_files_containing(decompiled_dir, "Landroid/content/pm/PackageManager;->getPackageInfo(Ljava/lang/String;I)")
+             if not p.endswith("SigBypass.smali")]
+    rule = RewriteRule(
+        pattern,
+        r"invoke-static \1, Lcom/whatsapp/kosher/SigBypass;->getPackageInfo(Landroid/content/pm/PackageManager;Ljava/lang/String;I)Landroid/content/pm/PackageInfo;",
+    )
+    patched_count = sum(result.count for result in _rewrite_all(paths, [rule]))
+            
     print(f"    [+] Successfully redirected {patched_count} calls.")
 
     smali_dir = os.path.join(decompiled_dir, "smali_classes2", "com", "whatsapp", "kosher")
@@ -788,6 +740,7 @@ def _patch_signature_bypass(decompiled_dir: str) -> bool:
 # --------------------------------------------------------- 
 # 11. חסימת ערוצים דרך קישורים (Deep Links)
 # --------------------------------------------------------- 
+@traced()
 def _patch_channel_links(root_dir):
     print(f"\n[10] Nuking Channel Deep Links & Routing...")
     
@@ -807,38 +760,21 @@ def _patch_channel_links(root_dir):
         print("    [+] AndroidManifest.xml channel intents disabled.")
 
     # 2. לעוור את מנתחי הקישורים (כמו LX/6WK ואחרים)
-    patched_files = 0
-    
     replacements = {
         "whatsapp.com/channel": "whatsapp.com/block_c",
         "wa.me/channel": "wa.me/block_c",
         "whatsapp://channel": "whatsapp://block_c"
     }
 
-    for root_path, dirs, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith('.smali'):
-                path = os.path.join(root_path, file)
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    if "channel" in content:
-                        original_content = content
-                        for old_str, new_str in replacements.items():
-                            content = content.replace(old_str, new_str)
-                            
-                        if original_content != content:
-                            _save_and_accumulate_diff(path, original_content, content)
-                            patched_files += 1
-                except Exception:
-                    pass
-                    
+    rules = [RewriteRule(old_str, new_str) for old_str, new_str in replacements.items()]
+    patched_files = len(_rewrite_all(_smali_files_containing(root_dir, "channel"), rules))
+            
     print(f"    [+] Channel deep links neutralized in {patched_files} Smali files.")
     return True
 # --------------------------------------------------------- 
 # 12. הריגת הערוץ בתוך מסך השיחה והשחתת מזהי JID
 # --------------------------------------------------------- 
+@traced()
 def _patch_nuke_newsletter_conversation(root_dir):
     import os, re
     print(f"\n[11] Nuking Newsletter inside Conversation Activity...")
@@ -891,21 +827,11 @@ def _patch_nuke_newsletter_conversation(root_dir):
             print("    [-] onCreate not found.")
             
         # השחתת מנוע זיהוי הערוצים של וואטסאפ ביתר הקבצים
-        patched_jids = 0
-        for root_path, _, files in os.walk(root_dir):
-            for file in files:
-                if file.endswith('.smali'):
-                    path = os.path.join(root_path, file)
-                    try:
-                        with open(path, 'r', encoding='utf-8') as f2:
-                            smali_code = f2.read()
-                        if '"@newsletter"' in smali_code:
-                            new_smali = smali_code.replace('"@newsletter"', '"@block_nlr"')
-                            _save_and_accumulate_diff(path, smali_code, new_smali)
-                            patched_jids += 1
-                    except: 
-                        pass
-        
+        patched_jids = len(_rewrite_all(
+            _smali_files_containing(root_dir, '"@newsletter"'),
+            [RewriteRule('"@newsletter"', '"@block_nlr"')],
+        ))
+
         if content != original_content:
             _save_and_accumulate_diff(target_file, original_content, content)
             
@@ -919,6 +845,7 @@ def _patch_nuke_newsletter_conversation(root_dir):
 # --------------------------------------------------------- 
 # 13
 # ---------------------------------------------------------        
+@traced()
 def _patch_kill_meta_ai_fab_smali(root_dir):
     import os, re
     print("\n[*] Nuking Meta AI FABs via Smali ID-Nullification trick...")
@@ -926,26 +853,25 @@ def _patch_kill_meta_ai_fab_smali(root_dir):
     targets = ['0x7f0b12f5', '0x7f0b12f6', '0x7f0b12e8']
     patched_files = 0
     
-    for root_path, _, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith('.smali'):
-                path = os.path.join(root_path, file)
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    original_content = content
-                    for target in targets:
-                        pattern = r'(const\s+[vp]\d+,\s*)' + target
-                        content = re.sub(pattern, r'\g<1>0x0 # KOSHER_FAB_KILL', content)
-                        
-                    if content != original_content:
-                        _save_and_accumulate_diff(path, original_content, content)
-                        patched_files += 1
-                        print(f"    [+] Nullified FAB IDs in: {file}")
-                except Exception as e:
-                    pass
-                    
+    fab_files = sorted({p for t in targets for p in _smali_files_containing(root_dir, t)})
+    for path in fab_files:
+        file = os.path.basename(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            
+            original_content = content
+            for target in targets:
+                pattern = r'(const\s+[vp]\d+,\s*)' + target
+                content = re.sub(pattern, r'\g<1>0x0 # KOSHER_FAB_KILL', content)
+                
+            if content != original_content:
+                _save_and_accumulate_diff(path, original_content, content)
+                patched_files += 1
+                print(f"    [+] Nullified FAB IDs in: {file}")
+        except Exception as e:
+            pass
+            
     if patched_files > 0:
         print(f"    [SUCCESS] Meta AI FABs neutralized in {patched_files} smali files.")
         return True
@@ -955,6 +881,7 @@ def _patch_kill_meta_ai_fab_smali(root_dir):
 # --------------------------------------------------------- 
 # 14. הריגת הגישה ל-Meta AI בתוך מסך השיחה (שיטת ה-Return Void)
 # --------------------------------------------------------- 
+@traced()
 def _patch_kill_meta_ai_conversation(root_dir):
     import os, re
     print(f"\n[14] Nuking Meta AI inside Conversation Activity (Safe Injection)...")
@@ -968,20 +895,15 @@ def _patch_kill_meta_ai_conversation(root_dir):
             content = f.read()
         original_content = content
 
-        start_str = ".method public onCreate(Landroid/os/Bundle;)V"
-        start_idx = content.find(start_str)
-        if start_idx == -1: return False
-            
-        end_str = ".end method"
-        end_idx = content.find(end_str, start_idx)
-        on_create_body = content[start_idx:end_idx]
+        smali_class = SmaliClass(content, target_file)
+        on_create = smali_class.method("onCreate(Landroid/os/Bundle;)V")
+        if not on_create: return False
         
         # אנחנו מחפשים את כמות האוגרים המעודכנת (כי הפונקציה הקודמת כבר הגדילה אותם ב-3)
-        pattern = re.compile(r"(?:\.locals|\.registers) (\d+)")
-        match = pattern.search(on_create_body)
-        if not match: return False
+        registers = on_create.registers()
+        if not registers: return False
             
-        locals_count = int(match.group(1))
+        locals_count = registers[1]
         
         # אנחנו משתמשים בדיוק באותם 3 אוגרים חדשים שנוצרו כדי לשמור על יעילות זיכרון
         if locals_count >= 3:
@@ -991,7 +913,7 @@ def _patch_kill_meta_ai_conversation(root_dir):
         else:
             v0, v1, v2 = "v0", "v1", "v2" 
         
-        last_return_idx = on_create_body.rfind("return-void")
+        last_return_idx = on_create.rfind("return-void")
         if last_return_idx == -1: return False
 
         injection = f"""
@@ -1016,8 +938,7 @@ def _patch_kill_meta_ai_conversation(root_dir):
     :cond_meta_safe
     # --- END KOSHER META AI KILLER ---"""
 
-        new_on_create_body = on_create_body[:last_return_idx] + injection.strip() + "\n    " + on_create_body[last_return_idx:]
-        new_content = content[:start_idx] + new_on_create_body + content[end_idx:]
+        new_content = smali_class.insert(last_return_idx, injection.strip() + "\n    ")
 
         if original_content != new_content:
             _save_and_accumulate_diff(target_file, original_content, new_content)
@@ -1033,9 +954,9 @@ def _patch_kill_meta_ai_conversation(root_dir):
 # 15. תיקון ספק מדיה (Media Provider) לתיקון פתיחת PDF
 # מתקן את ההדבקה הדינמית של SigBypass
 # --------------------------------------------------------- 
+@traced()
 def _patch_file_provider_media(root_dir, suffix="kosher"):
     print(f"\n[15] Fixing Media FileProvider for Cloned Package...")
-    patched_files = 0
     
     # מתקנים אך ורק את המחרוזות שהוכחנו ידנית שעובדות עבור PDF
     replacements = {
@@ -1043,45 +964,36 @@ def _patch_file_provider_media(root_dir, suffix="kosher"):
         '"com.whatsapp.provider.media': f'"com.whatsapp.{suffix}.provider.media'
     }
     
-    for root_path, _, files in os.walk(root_dir):
-        for file in files:
-            if file.endswith('.smali'):
-                path = os.path.join(root_path, file)
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    original_content = content
-                    for old_str, new_str in replacements.items():
-                        if old_str in content:
-                            content = content.replace(old_str, new_str)
-                            
-                    if original_content != content:
-                        _save_and_accumulate_diff(path, original_content, content)
-                        patched_files += 1
-                except Exception:
-                    pass
-                    
+    rules = [RewriteRule(old_str, new_str) for old_str, new_str in replacements.items()]
+    patched_files = len(_rewrite_all(_smali_files_containing(root_dir, "provider.media"), rules))
+            
     print(f"    [+] Fixed provider.media strings in {patched_files} Smali files.")
     return True
 # --------------------------------------------------------- 
 # פונקציות עזר 
 # --------------------------------------------------------- 
+def _get_index(root_dir):
+    global _index
+    if _index is None or _index.root_dir != root_dir:
+        _index = SmaliIndex(root_dir, SMALI_ANCHORS)
+    return _index
+
+def _smali_files_containing(root_dir, search_string):
+    return _get_index(root_dir).files_containing(search_string)
+
+def _rewrite_all(paths, rules):
+    """מריץ את ההחלפות על כל הקבצים במקביל (core.parallel_rewrite) ורושם את ההשוואות"""
+    root_dir = _index.root_dir if _index is not None else None
+    results = rewrite_files(paths, rules, with_diff=_diffs is not None, root_dir=root_dir)
+    for result in results:
+        if _diffs is not None:
+            _diffs.add(result.path, result.diff)
+        if _index is not None:
+            _index.update(result.path)
+    return results
+
 def _find_file_by_string(root_dir, search_string): 
-    for root, dirs, files in os.walk(root_dir): 
-        for file in files: 
-            if file.endswith(".smali"): 
-                path = os.path.join(root, file) 
-                try: 
-                    with open(path, 'r', encoding='utf-8') as f: 
-                        if search_string in f.read(): 
-                            return path 
-                except: 
-                    continue 
-    return None 
+    return _get_index(root_dir).find_file_containing(search_string)
  
 def _find_file_recursive(root_dir, filename): 
-    for root, dirs, files in os.walk(root_dir): 
-        if filename in files: 
-            return os.path.join(root, filename) 
-    return None
+    return _get_index(root_dir).find_file(filename)
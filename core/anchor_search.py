@@ -0,0 +1,153 @@
+"""
+Multi-pattern literal search for patch anchors.
+
+`AnchorMatcher` compiles every anchor into one automaton and reports every
+hit (including overlapping ones) in a single pass over the input. Input is
+bytes-like: `bytes`, `bytearray`, `memoryview` or an `mmap`, so smali trees
+are scanned without decoding whole files to `str`.
+
+Uses pyahocorasick when it is installed. Otherwise falls back to one
+compiled regex of the anchors (longest first, inside a lookahead so matches
+may overlap); anchors that are prefixes of a longer hit are reported from a
+precomputed prefix table.
+
+Input longer than CHUNK_SIZE is scanned in chunks that overlap by the longest
+anchor, so the automaton (which needs `str`) never decodes a whole mapped
+file at once. Each chunk reports only the hits starting in its own range.
+"""
+
+import contextlib
+import mmap
+import os
+import re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Files at least this large are memory-mapped instead of read.
+MMAP_THRESHOLD = 256 * 1024
+
+# Bytes handed to the matcher per step (plus the longest anchor as overlap).
+CHUNK_SIZE = 1024 * 1024
+
+
+@contextlib.contextmanager
+def open_bytes(path: str):
+    """Yield the contents of `path` as bytes, or as a read-only mmap for large files."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _to_bytes(anchor: str | bytes) -> bytes:
+    return anchor if isinstance(anchor, bytes) else anchor.encode("utf-8")
+
+
+class AnchorMatcher:
+    """All anchors compiled into one matcher; anchors are reported as given (str or bytes)."""
+
+    def __init__(self, anchors, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._anchors: dict[bytes, str | bytes] = {}
+        for anchor in anchors:
+            key = _to_bytes(anchor)
+            if key:
+                self._anchors.setdefault(key, anchor)
+        self.anchors = list(self._anchors.values())
+        self._overlap = max((len(key) for key in self._anchors), default=1) - 1
+
+        self._automaton = None
+        self._regex = None
+        if not self._anchors:
+            return
+        if ahocorasick is not None:
+            # The PyPI build matches str; latin-1 maps bytes 1:1 onto code points.
+            self._automaton = ahocorasick.Automaton()
+            for key, anchor in self._anchors.items():
+                self._automaton.add_word(key.decode("latin-1"), (len(key), anchor))
+            self._automaton.make_automaton()
+        else:
+            keys = sorted(self._anchors, key=len, reverse=True)
+            self._regex = re.compile(b"(?=(" + b"|".join(re.escape(k) for k in keys) + b"))")
+            self._prefixes = {
+                key: [self._anchors[other] for other in keys if other != key and key.startswith(other)]
+                for key in keys
+            }
+
+    def _finditer_chunk(self, chunk):
+        if self._automaton is not None:
+            text = bytes(chunk).decode("latin-1")
+            for end, (length, anchor) in self._automaton.iter(text):
+                yield end - length + 1, anchor
+        else:
+            for match in self._regex.finditer(chunk):
+                key = match.group(1)
+                offset = match.start()
+                yield offset, self._anchors[key]
+                for shorter in self._prefixes[key]:
+                    yield offset, shorter
+
+    def finditer(self, data):
+        """Yield (offset, anchor) for every occurrence of every anchor in `data`."""
+        if not self._anchors:
+            return
+        size = len(data)
+        if size <= self.chunk_size:
+            yield from self._finditer_chunk(data)
+            return
+        for start in range(0, size, self.chunk_size):
+            # A hit starting in [start, start + chunk_size) ends inside the overlap,
+            # and belongs to this chunk only.
+            chunk = data[start:start + self.chunk_size + self._overlap]
+            for offset, anchor in self._finditer_chunk(chunk):
+                if offset < self.chunk_size:
+                    yield start + offset, anchor
+
+    def search(self, data) -> dict:
+        """Return {anchor: [offsets]} for the anchors found in `data`."""
+        hits: dict = {}
+        for offset, anchor in self.finditer(data):
+            hits.setdefault(anchor, []).append(offset)
+        for offsets in hits.values():
+            offsets.sort()
+        return hits
+
+    def search_file(self, path: str) -> dict:
+        """`search` over a file, memory-mapping large ones. Unreadable files have no hits."""
+        try:
+            with open_bytes(path) as data:
+                return self.search(data)
+        except OSError:
+            return {}
+
+    def scan(self, paths) -> dict:
+        """
+        Stream every file in `paths` through the matcher once.
+
+        Returns:
+            {anchor: {path: [offsets]}} for every anchor with at least one hit.
+        """
+        results: dict = {}
+        for path in paths:
+            for anchor, offsets in self.search_file(path).items():
+                results.setdefault(anchor, {})[path] = offsets
+        return results
+
+
+def iter_smali_files(root_dir: str):
+    for root, _, files in os.walk(root_dir):
+        for name in files:
+            if name.endswith(".smali"):
+                yield os.path.join(root, name)
+
+
+def scan_tree(root_dir: str, anchors) -> dict:
+    """Scan every .smali file under `root_dir` for `anchors` in one pass (see AnchorMatcher.scan)."""
+    return AnchorMatcher(anchors).scan(iter_smali_files(root_dir))
@@ -6,6 +6,11 @@ import tempfile
 import urllib.request
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.archive import KIND_INVALID, classify_package
+from core.tracing import run_subprocess
+
 def get_apkeditor(jar_path):
     """מוריד את הגרסה העדכנית של APKEditor מגיטהאב כדי למזג אפליקציות מפוצלות"""
     if os.path.exists(jar_path):
@@ -44,12 +49,12 @@ def main():
     # יצירת תיקייה זמנית לחילוץ חלקי האפליקציה (Splits)
     with tempfile.TemporaryDirectory() as tmpdir:
         print(f"[*] [APKEditor Merger] Extracting split APKs from {os.path.basename(xapk_path)}...")
+        package = classify_package(xapk_path)
+        if package.kind == KIND_INVALID or not package.splits:
+            print("[-] [APKEditor Merger] No APK files found inside XAPK.")
+            sys.exit(1)
         with zipfile.ZipFile(xapk_path, 'r') as z:
-            apk_files = [f for f in z.namelist() if f.endswith('.apk')]
-            if not apk_files:
-                print("[-] [APKEditor Merger] No APK files found inside XAPK.")
-                sys.exit(1)
-            for item in apk_files:
+            for item in package.splits:
                 z.extract(item, tmpdir)
 
         print("[*] [APKEditor Merger] Merging split APKs to a single fat APK...")
@@ -58,7 +63,7 @@ def main():
         cmd =["java", "-jar", editor_jar, "m", "-i", tmpdir, "-o", output_apk]
         
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            run_subprocess(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
             print(f"[+] [APKEditor Merger] Successfully merged into {os.path.basename(output_apk)}")
         except subprocess.CalledProcessError as e:
             print(f"[-] [APKEditor Merger] Merge failed:\n{e.output.decode(errors='ignore')}")
@@ -0,0 +1,129 @@
+"""
+Lightweight package sniffing straight from the ZIP central directory.
+
+`classify_package` reads only the End-Of-Central-Directory record and the
+central directory itself, so it costs one small read even for bundles with
+tens of thousands of entries (no ZipInfo objects, no namelist()).
+"""
+
+import os
+import struct
+from typing import NamedTuple
+
+
+KIND_APK = "apk"
+KIND_XAPK = "xapk"
+KIND_APKS = "apks"
+KIND_INVALID = "invalid"
+
+_EOCD_SIG = b"PK\x05\x06"
+_EOCD_SIZE = 22
+_MAX_COMMENT = 0xFFFF
+_ZIP64_LOCATOR_SIG = b"PK\x06\x07"
+_ZIP64_LOCATOR_SIZE = 20
+_ZIP64_EOCD_SIG = b"PK\x06\x06"
+_ZIP64_EOCD_SIZE = 56
+_CD_ENTRY_SIG = b"PK\x01\x02"
+_CD_ENTRY_SIZE = 46
+_UTF8_FLAG = 0x800
+
+
+class PackageInfo(NamedTuple):
+    kind: str
+    splits: tuple[str, ...] = ()
+
+
+_INVALID = PackageInfo(KIND_INVALID)
+
+
+def _read_central_directory(f, file_size: int) -> bytes | None:
+    """Locate the EOCD record (ZIP64 aware) and return the raw central directory."""
+    tail_size = min(file_size, _EOCD_SIZE + _MAX_COMMENT)
+    f.seek(file_size - tail_size)
+    tail = f.read(tail_size)
+
+    # The real record's comment runs exactly to the end of the file; a lookalike
+    # signature inside the comment does not.
+    eocd_at = tail.rfind(_EOCD_SIG, 0, len(tail) - _EOCD_SIZE + 4)
+    while eocd_at >= 0:
+        (comment_len,) = struct.unpack_from("<H", tail, eocd_at + 20)
+        if eocd_at + _EOCD_SIZE + comment_len == len(tail):
+            break
+        eocd_at = tail.rfind(_EOCD_SIG, 0, eocd_at)
+    if eocd_at < 0:
+        return None
+    eocd_pos = file_size - tail_size + eocd_at
+    (cd_size,) = struct.unpack_from("<I", tail, eocd_at + 12)
+    cd_end = eocd_pos
+
+    # Writers add the ZIP64 records whenever any field overflows (e.g. > 65535 entries).
+    locator_at = eocd_at - _ZIP64_LOCATOR_SIZE
+    if locator_at >= 0 and tail[locator_at:locator_at + 4] == _ZIP64_LOCATOR_SIG:
+        (zip64_eocd_offset,) = struct.unpack_from("<Q", tail, locator_at + 8)
+        f.seek(zip64_eocd_offset)
+        record = f.read(_ZIP64_EOCD_SIZE)
+        if len(record) < _ZIP64_EOCD_SIZE or record[:4] != _ZIP64_EOCD_SIG:
+            return None
+        (cd_size,) = struct.unpack_from("<Q", record, 40)
+        cd_end = zip64_eocd_offset
+
+    # Measured back from the end record, which tolerates data prepended to the archive.
+    cd_start = cd_end - cd_size
+    if cd_start < 0:
+        return None
+    f.seek(cd_start)
+    central_directory = f.read(cd_size)
+    if len(central_directory) != cd_size:
+        return None
+    return central_directory
+
+
+def classify_package(path: str) -> PackageInfo:
+    """
+    Classify a downloaded package in a single pass over its central directory.
+
+    Returns:
+        PackageInfo(kind, splits) where kind is "apk" (has AndroidManifest.xml),
+        "xapk" (manifest.json + split APKs), "apks" (split APKs only) or
+        "invalid", and splits lists the embedded .apk entry names.
+    """
+    try:
+        file_size = os.path.getsize(path)
+        if file_size < _EOCD_SIZE:
+            return _INVALID
+        with open(path, "rb") as f:
+            central_directory = _read_central_directory(f, file_size)
+    except OSError:
+        return _INVALID
+    if central_directory is None:
+        return _INVALID
+
+    has_android_manifest = False
+    has_xapk_manifest = False
+    splits = []
+    pos = 0
+    end = len(central_directory)
+    while pos + _CD_ENTRY_SIZE <= end:
+        if central_directory[pos:pos + 4] != _CD_ENTRY_SIG:
+            return _INVALID
+        flags = struct.unpack_from("<H", central_directory, pos + 8)[0]
+        name_len, extra_len, comment_len = struct.unpack_from("<HHH", central_directory, pos + 28)
+        name_start = pos + _CD_ENTRY_SIZE
+        name = central_directory[name_start:name_start + name_len]
+
+        if name == b"AndroidManifest.xml":
+            has_android_manifest = True
+        elif name == b"manifest.json":
+            has_xapk_manifest = True
+        elif name[-4:].lower() == b".apk":
+            splits.append(name.decode("utf-8" if flags & _UTF8_FLAG else "cp437"))
+
+        pos = name_start + name_len + extra_len + comment_len
+
+    if pos != end:
+        return _INVALID
+    if has_android_manifest:
+        return PackageInfo(KIND_APK, tuple(splits))
+    if splits:
+        return PackageInfo(KIND_XAPK if has_xapk_manifest else KIND_APKS, tuple(splits))
+    return _INVALID
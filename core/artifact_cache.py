@@ -0,0 +1,173 @@
+"""
+Content-addressed cache for downloaded packages.
+
+Objects are stored by SHA-256 under `<root>/objects/`, and a small JSON index
+maps `package|version|source` to an object. The cache is bounded in size and
+evicts least-recently-used entries first.
+
+The cache is opt-in: set APP_STORE_CACHE_DIR (or pass --cache-dir to run.py).
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+CACHE_DIR_ENV = "APP_STORE_CACHE_DIR"
+CACHE_MAX_MB_ENV = "APP_STORE_CACHE_MAX_MB"
+DEFAULT_MAX_MB = 4096
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: str) -> str:
+    """Return the hex SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """SHA-256 keyed package store with a package/version/source index and LRU eviction."""
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.json")
+        self.lock_path = os.path.join(root, "index.lock")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+    @staticmethod
+    def _key(package: str, version: str, source: str) -> str:
+        return f"{package}|{version}|{source}"
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # Parallel workers (run.py --jobs) share one cache directory.
+        with open(self.lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index: dict):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def lookup(self, package: str, version: str, source: str) -> str | None:
+        """Return the cached object path for this release, or None."""
+        key = self._key(package, version, source)
+        with self._locked():
+            index = self._read_index()
+            entry = index.get(key)
+            if not entry:
+                return None
+            path = self._object_path(entry["sha256"])
+            if not os.path.exists(path) or os.path.getsize(path) != entry["size"]:
+                del index[key]
+                self._write_index(index)
+                return None
+            entry["last_used"] = time.time()
+            self._write_index(index)
+            return path
+
+    def fetch(self, package: str, version: str, source: str, dest: str) -> str | None:
+        """Copy the cached package for this release to `dest`. Returns its SHA-256 on a hit."""
+        path = self.lookup(package, version, source)
+        if not path:
+            return None
+        dest_dir = os.path.dirname(dest)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+        tmp_path = f"{dest}.cache-tmp"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, dest)
+        return os.path.basename(path)
+
+    def store(self, path: str, package: str, version: str, source: str,
+              sha256: str | None = None) -> str:
+        """
+        Add a package to the cache and index it under package/version/source.
+
+        Returns:
+            The SHA-256 of the stored object.
+        """
+        sha256 = sha256 or sha256_file(path)
+        object_path = self._object_path(sha256)
+        size = os.path.getsize(path)
+
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            tmp_path = f"{object_path}.{os.getpid()}.tmp"
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, object_path)
+
+        with self._locked():
+            index = self._read_index()
+            index[self._key(package, version, source)] = {
+                "sha256": sha256,
+                "size": size,
+                "package": package,
+                "version": version,
+                "source": source,
+                "last_used": time.time(),
+            }
+            self._evict(index)
+            self._write_index(index)
+        return sha256
+
+    def _evict(self, index: dict):
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        # One object may be indexed under several keys; it is as recent as its newest key.
+        objects = {}
+        sizes = {}
+        for entry in index.values():
+            objects[entry["sha256"]] = max(objects.get(entry["sha256"], 0), entry["last_used"])
+            sizes[entry["sha256"]] = entry["size"]
+
+        total = sum(sizes.values())
+        for sha, _ in sorted(objects.items(), key=lambda item: item[1]):
+            # Never evict the most recent object, even if it alone exceeds the limit.
+            if total <= self.max_bytes or len(objects) <= 1:
+                break
+            for key in [k for k, e in index.items() if e["sha256"] == sha]:
+                del index[key]
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._object_path(sha))
+            total -= sizes[sha]
+            del objects[sha]
+
+
+def get_cache() -> ArtifactCache | None:
+    """Return the configured artifact cache, or None when caching is disabled."""
+    root = os.getenv(CACHE_DIR_ENV, "").strip()
+    if not root:
+        return None
+    max_mb = int(os.getenv(CACHE_MAX_MB_ENV, "") or DEFAULT_MAX_MB)
+    return ArtifactCache(os.path.join(root, "artifacts"), max_bytes=max_mb * 1024 * 1024)
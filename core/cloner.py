@@ -8,6 +8,8 @@ import os
 import re
 import xml.etree.ElementTree as ET
 
+from core.patch_session import PatchSession
+
 
 ANDROID_NS = "http://schemas.android.com/apk/res/android"
 
@@ -22,9 +24,9 @@ def _resolve_component_name(name: str, package_name: str) -> str:
     return name
 
 
-def _update_manifest(decompiled_dir: str, old_pkg: str, new_pkg: str) -> bool:
+def _update_manifest(session: PatchSession, decompiled_dir: str, old_pkg: str, new_pkg: str) -> bool:
     manifest_path = os.path.join(decompiled_dir, "AndroidManifest.xml")
-    if not os.path.exists(manifest_path):
+    if not session.exists(manifest_path):
         print("[-] [Cloner] AndroidManifest.xml not found.")
         return False
 
@@ -35,7 +37,7 @@ def _update_manifest(decompiled_dir: str, old_pkg: str, new_pkg: str) -> bool:
     ET.register_namespace("android", ANDROID_NS)
 
     try:
-        tree = ET.parse(manifest_path)
+        tree = session.parse_xml(manifest_path)
         root = tree.getroot()
     except ET.ParseError as exc:
         print(f"[-] [Cloner] Failed to parse AndroidManifest.xml: {exc}")
@@ -86,41 +88,37 @@ def _update_manifest(decompiled_dir: str, old_pkg: str, new_pkg: str) -> bool:
 
     root.set("package", new_pkg)
 
-    tree.write(manifest_path, encoding="utf-8", xml_declaration=True)
+    session.write_xml(manifest_path, tree)
     print("    [+] [Cloner] AndroidManifest.xml updated.")
     return True
 
 
-def _update_apktool_yml(decompiled_dir: str, new_pkg: str):
+def _update_apktool_yml(session: PatchSession, decompiled_dir: str, new_pkg: str):
     apktool_yml_path = os.path.join(decompiled_dir, "apktool.yml")
-    if not os.path.exists(apktool_yml_path):
+    if not session.exists(apktool_yml_path):
         return
 
-    with open(apktool_yml_path, "r", encoding="utf-8") as file:
-        content = file.read()
+    content = session.read(apktool_yml_path)
 
     if "renameManifestPackage:" in content:
         content = re.sub(r"renameManifestPackage:.*", f"renameManifestPackage: {new_pkg}", content)
     else:
         content += f"\nrenameManifestPackage: {new_pkg}\n"
 
-    with open(apktool_yml_path, "w", encoding="utf-8") as file:
-        file.write(content)
-
+    session.write(apktool_yml_path, content)
     print("    [+] [Cloner] apktool.yml updated.")
 
 
-def _update_app_name_suffix(decompiled_dir: str, suffix: str):
+def _update_app_name_suffix(session: PatchSession, decompiled_dir: str, suffix: str):
     if not suffix:
         return
 
     strings_path = os.path.join(decompiled_dir, "res", "values", "strings.xml")
-    if not os.path.exists(strings_path):
+    if not session.exists(strings_path):
         return
 
     try:
-        with open(strings_path, "r", encoding="utf-8") as file:
-            content = file.read()
+        content = session.read(strings_path)
     except Exception as exc:
         print(f"    [-] [Cloner] Failed to read strings.xml: {exc}")
         return
@@ -134,14 +132,16 @@ def _update_app_name_suffix(decompiled_dir: str, suffix: str):
     if updated == content:
         return
 
-    with open(strings_path, "w", encoding="utf-8") as file:
-        file.write(updated)
+    session.write(strings_path, updated)
     print(f"    [+] [Cloner] App name suffix applied: {suffix!r}")
 
 
-def run_clone(decompiled_dir: str, clone_config: dict) -> bool:
+def run_clone(decompiled_dir: str, clone_config: dict, session: PatchSession | None = None) -> bool:
     """
     Apply package clone transformations.
+
+    Changes go through `session` when given (flushed by the caller);
+    otherwise they are written before returning.
     """
     old_pkg = (clone_config.get("old_pkg") or "").strip()
     new_pkg = (clone_config.get("new_pkg") or "").strip()
@@ -153,11 +153,16 @@ def run_clone(decompiled_dir: str, clone_config: dict) -> bool:
 
     print(f"[*] [Cloner] Cloning package: {old_pkg} -> {new_pkg}")
 
-    if not _update_manifest(decompiled_dir, old_pkg, new_pkg):
+    own_session = session is None
+    session = session or PatchSession(decompiled_dir)
+
+    if not _update_manifest(session, decompiled_dir, old_pkg, new_pkg):
         return False
 
-    _update_apktool_yml(decompiled_dir, new_pkg)
-    _update_app_name_suffix(decompiled_dir, app_name_suffix)
+    _update_apktool_yml(session, decompiled_dir, new_pkg)
+    _update_app_name_suffix(session, decompiled_dir, app_name_suffix)
 
+    if own_session:
+        session.flush()
     print("    [+] [Cloner] Clone stage completed.")
     return True
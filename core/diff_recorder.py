@@ -0,0 +1,134 @@
+"""
+Stream per-file patch diffs into a compressed on-disk artifact.
+
+Each recorded diff is written immediately as its own gzip member, so the
+artifact is a valid .gz (`zcat app.diff.gz` prints every diff in order) and
+nothing accumulates in memory. A JSON index next to it
+(`app.diff.gz.index.json`) maps every file to the offset and length of its
+members, so one file's changes can be read back without inflating the rest
+(`read_diff`).
+
+The artifact is capped at APP_STORE_DIFF_MAX_MB (default 64) of compressed
+output; diffs past the cap are counted in the index but not stored.
+"""
+
+import difflib
+import gzip
+import json
+import os
+
+
+DIFF_MAX_MB_ENV = "APP_STORE_DIFF_MAX_MB"
+DEFAULT_MAX_MB = 64
+
+
+def _default_max_bytes() -> int:
+    try:
+        return max(0, int(os.getenv(DIFF_MAX_MB_ENV, DEFAULT_MAX_MB))) * 1024 * 1024
+    except ValueError:
+        return DEFAULT_MAX_MB * 1024 * 1024
+
+
+def index_path(path: str) -> str:
+    return f"{path}.index.json"
+
+
+class DiffRecorder:
+    """Appends unified diffs to `path` as they are produced; call close() to write the index."""
+
+    def __init__(self, path: str, root_dir: str | None = None, max_bytes: int | None = None):
+        self.path = path
+        self.root_dir = root_dir
+        self.max_bytes = _default_max_bytes() if max_bytes is None else max_bytes
+        self.files: dict[str, list[dict]] = {}
+        self.dropped = 0
+        self._written = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._out = open(path, "wb")
+
+    def _name(self, filepath: str) -> str:
+        if self.root_dir:
+            name = os.path.relpath(filepath, self.root_dir)
+            if not name.startswith(".."):
+                return name.replace(os.sep, "/")
+        return os.path.basename(filepath)
+
+    def record(self, filepath: str, old_content: str, new_content: str) -> bool:
+        """Diff `old_content` against `new_content` and store it under `filepath`."""
+        if old_content == new_content:
+            return False
+        name = self._name(filepath)
+        diff = "\n".join(difflib.unified_diff(
+            old_content.splitlines(),
+            new_content.splitlines(),
+            fromfile=f"a/{name}",
+            tofile=f"b/{name}",
+            lineterm="",
+        ))
+        return self.add(filepath, diff)
+
+    def add(self, filepath: str, diff: str) -> bool:
+        """Store an already computed unified diff. Returns False if empty or over the size cap."""
+        if not diff.strip() or self._out.closed:
+            return False
+        member = gzip.compress((diff.rstrip("\n") + "\n").encode("utf-8"), compresslevel=6)
+        if self._written + len(member) > self.max_bytes:
+            self.dropped += 1
+            return False
+
+        lines = diff.splitlines()
+        self.files.setdefault(self._name(filepath), []).append({
+            "offset": self._written,
+            "length": len(member),
+            "added": sum(1 for line in lines if line.startswith("+") and not line.startswith("+++")),
+            "removed": sum(1 for line in lines if line.startswith("-") and not line.startswith("---")),
+        })
+        self._out.write(member)
+        self._written += len(member)
+        return True
+
+    def close(self):
+        """Finish the artifact and write its index (atomically)."""
+        if self._out.closed:
+            return
+        self._out.close()
+        index = {
+            "artifact": os.path.basename(self.path),
+            "bytes": self._written,
+            "truncated": self.dropped > 0,
+            "dropped": self.dropped,
+            "files": self.files,
+        }
+        tmp_path = f"{index_path(self.path)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, index_path(self.path))
+
+        changes = sum(len(entries) for entries in self.files.values())
+        print(f"[+] [DiffRecorder] {changes} diffs over {len(self.files)} files -> {self.path}")
+        if self.dropped:
+            print(f"[!] [DiffRecorder] Size cap reached; {self.dropped} diffs were not stored.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_index(path: str) -> dict:
+    with open(index_path(path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_diff(path: str, name: str) -> str | None:
+    """Return every stored diff for file `name` (as recorded), or None if it has none."""
+    entries = read_index(path).get("files", {}).get(name)
+    if not entries:
+        return None
+    chunks = []
+    with open(path, "rb") as f:
+        for entry in entries:
+            f.seek(entry["offset"])
+            chunks.append(gzip.decompress(f.read(entry["length"])).decode("utf-8"))
+    return "".join(chunks)
@@ -3,17 +3,27 @@ Generic APK downloader, config-driven.
 Supports multiple sources and normalizes the final artifact to APK.
 """
 
+import hashlib
+import json
 import os
 import re
 import shutil
 import subprocess
 import sys
-import zipfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
 import requests
 
-from core.sources import create_source
+from core.archive import KIND_APK, KIND_APKS, KIND_XAPK, classify_package
+from core.artifact_cache import get_cache, sha256_file
+from core.instrumentation import stage
+from core.tracing import run_subprocess
+from core.source_health import get_source_health
+from core.sources import as_async, create_source, source_candidates
+from core.sources.apkeep import UNKNOWN_VERSION
+from core.transport import get_session
 from core.utils import get_local_version
 
 
@@ -28,6 +38,16 @@ DEFAULT_HEADERS = {
     )
 }
 
+# Attempts per download; later attempts resume from the partial file when possible.
+MAX_DOWNLOAD_ATTEMPTS = 3
+
+# Defaults for app.json `download_segments` / `download_chunk_size`.
+DEFAULT_SEGMENTS = 4
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Files smaller than this are always fetched over a single connection.
+MIN_SEGMENTED_SIZE = 8 * 1024 * 1024
+
 
 def _extract_filename_from_response(response: requests.Response) -> str | None:
     content_disposition = response.headers.get("Content-Disposition", "")
@@ -57,29 +77,316 @@ def _detect_extension(response: requests.Response, filename: str | None) -> str:
     return ".bin"
 
 
-def _is_valid_apk(path: str) -> bool:
-    if not os.path.exists(path) or os.path.getsize(path) == 0:
-        return False
+def _part_paths(output_filename: str) -> tuple[str, str]:
+    part_path = f"{output_filename}.part"
+    return part_path, f"{part_path}.json"
+
+
+def _load_part_state(output_filename: str, url: str) -> dict | None:
+    """
+    Return the saved state of a partial download of `url`, or None when there is
+    nothing safe to resume (no part file, different URL or no validator).
+    """
+    part_path, meta_path = _part_paths(output_filename)
+    if not os.path.exists(part_path) or not os.path.exists(meta_path):
+        return None
 
     try:
-        with zipfile.ZipFile(path, "r") as apk_zip:
-            return "AndroidManifest.xml" in apk_zip.namelist()
-    except zipfile.BadZipFile:
-        return False
+        with open(meta_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
 
+    if state.get("url") != url or not (state.get("etag") or state.get("last_modified")):
+        return None
+    return state
 
-def _is_xapk(path: str) -> bool:
-    if not os.path.exists(path) or os.path.getsize(path) == 0:
+
+def _save_part_state(output_filename: str, state: dict):
+    _, meta_path = _part_paths(output_filename)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+
+def _clear_part(output_filename: str):
+    for path in _part_paths(output_filename):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _new_part_state(response, url: str) -> dict:
+    etag = response.headers.get("ETag") or ""
+    content_length = response.headers.get("Content-Length")
+    return {
+        "url": url,
+        # Weak validators cannot be used with If-Range.
+        "etag": "" if etag.startswith("W/") else etag,
+        "last_modified": response.headers.get("Last-Modified") or "",
+        "total": int(content_length) if content_length and content_length.isdigit() else None,
+        "extension": _detect_extension(response, _extract_filename_from_response(response)),
+    }
+
+
+def _new_hashers(algorithms: tuple[str, ...]) -> dict:
+    return {name: hashlib.new(name) for name in algorithms}
+
+
+def _hash_file(path: str, algorithms: tuple[str, ...], limit: int | None = None) -> dict:
+    """Hash the first `limit` bytes of `path` (the whole file by default)."""
+    hashers = _new_hashers(algorithms)
+    remaining = os.path.getsize(path) if limit is None else limit
+    with open(path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(DEFAULT_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            for hasher in hashers.values():
+                hasher.update(chunk)
+            remaining -= len(chunk)
+    return hashers
+
+
+def _parse_digest(digest: str | None) -> tuple[str, str] | None:
+    """Split a source-provided "algo:hex" digest; None if missing or unsupported."""
+    if not digest or ":" not in digest:
+        return None
+    algorithm, value = digest.split(":", 1)
+    algorithm = algorithm.strip().lower()
+    if algorithm not in hashlib.algorithms_available or not value.strip():
+        return None
+    return algorithm, value.strip().lower()
+
+
+class _RestartDownload(Exception):
+    """The partial file no longer matches the server copy and was discarded."""
+
+
+def _validator(state: dict) -> str:
+    return state.get("etag") or state.get("last_modified") or ""
+
+
+def _plan_segments(total: int, segments: int) -> list[list[int]]:
+    """Split [0, total) into `segments` byte ranges as [start, end, written] triples."""
+    size = -(-total // segments)
+    return [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+
+
+def _can_segment(response, state: dict, segments: int) -> bool:
+    return (
+        segments > 1
+        and (response.headers.get("Accept-Ranges") or "").lower() == "bytes"
+        and bool(state.get("total"))
+        and state["total"] >= MIN_SEGMENTED_SIZE
+        and bool(_validator(state))
+    )
+
+
+def _is_complete(part_path: str, state: dict | None) -> bool:
+    if not state or not os.path.exists(part_path):
         return False
+    if state.get("segments"):
+        if any(written != end - start + 1 for start, end, written in state["segments"]):
+            return False
+    total = state.get("total")
+    return total is None or os.path.getsize(part_path) == total
+
+
+def _download_segments(downloader, url: str, headers: dict, output_filename: str, state: dict,
+                       chunk_size: int, first_response=None):
+    """
+    Fetch every unfinished segment concurrently with its own Range request and
+    write it at its offset in the preallocated part file. `first_response`, if
+    given, is an already-open full-body response reused for the first segment.
+    """
+    part_path, _ = _part_paths(output_filename)
+    segment_url = getattr(first_response, "url", None) or url
+
+    def fetch(segment: list[int], response=None):
+        start, end, written = segment
+        if response is None:
+            request_headers = dict(headers or {})
+            request_headers["Range"] = f"bytes={start + written}-{end}"
+            request_headers["If-Range"] = _validator(state)
+            response = downloader.get(segment_url, stream=True, headers=request_headers, allow_redirects=True)
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code != 206 or not content_range.startswith(f"bytes {start + written}-"):
+                response.close()
+                raise _RestartDownload()
+
+        remaining = end - start + 1 - segment[2]
+        try:
+            with open(part_path, "r+b") as f:
+                f.seek(start + segment[2])
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if not chunk:
+                        continue
+                    # The reused full-body response runs past the first segment.
+                    chunk = chunk[:remaining]
+                    f.write(chunk)
+                    segment[2] += len(chunk)
+                    remaining -= len(chunk)
+                    if remaining <= 0:
+                        break
+        finally:
+            response.close()
 
+    pending = [seg for seg in state["segments"] if seg[2] < seg[1] - seg[0] + 1]
     try:
-        with zipfile.ZipFile(path, "r") as package_zip:
-            names = set(package_zip.namelist())
-            has_manifest = "manifest.json" in names
-            has_any_apk = any(name.lower().endswith(".apk") for name in names)
-            return has_manifest and has_any_apk
-    except zipfile.BadZipFile:
-        return False
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            futures = []
+            for segment in pending:
+                reuse = first_response if first_response is not None and segment[0] == 0 else None
+                futures.append(pool.submit(fetch, segment, reuse))
+            for future in futures:
+                future.result()
+    finally:
+        if first_response is not None and not any(seg[0] == 0 for seg in pending):
+            first_response.close()
+        _save_part_state(output_filename, state)
+
+
+def _stream_single(downloader, url: str, headers: dict, output_filename: str, state: dict | None,
+                   segments: int, chunk_size: int, app_name: str,
+                   algorithms: tuple[str, ...] = ("sha256",)) -> tuple[dict, dict | None]:
+    """
+    One request for the package: resumes the part file when `state` allows it,
+    otherwise starts over (switching to segmented mode if the server allows it).
+
+    Returns:
+        (part state describing what is now on disk, hashers fed with every byte
+        of the part file, or None when the body was not streamed in order)
+    """
+    part_path, _ = _part_paths(output_filename)
+    offset = os.path.getsize(part_path) if state else 0
+
+    request_headers = dict(headers or {})
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+        request_headers["If-Range"] = _validator(state)
+        print(f"[*] [{app_name}] Resuming download at byte {offset}...")
+
+    response = downloader.get(url, stream=True, headers=request_headers, allow_redirects=True)
+    try:
+        if offset and response.status_code == 206:
+            if not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"):
+                print(f"[!] [{app_name}] Server answered a different range; restarting download.")
+                raise _RestartDownload()
+            mode = "ab"
+            hashers = _hash_file(part_path, algorithms, limit=offset)
+        elif offset and response.status_code == 416 and state.get("total") == offset:
+            # The previous attempt already received every byte.
+            return state, None
+        elif response.status_code == 200:
+            if offset:
+                print(f"[i] [{app_name}] Server does not support resuming; restarting download.")
+            content_type = (response.headers.get("Content-Type") or "").lower()
+            if content_type.startswith("text/html"):
+                raise DownloadError(f"[{app_name}] Received HTML instead of package binary.")
+            state = _new_part_state(response, url)
+
+            if _can_segment(response, state, segments):
+                state["segments"] = _plan_segments(state["total"], segments)
+                with open(part_path, "wb") as f:
+                    f.truncate(state["total"])
+                _save_part_state(output_filename, state)
+                print(f"[*] [{app_name}] Downloading in {len(state['segments'])} parallel segments...")
+                _download_segments(downloader, url, headers, output_filename, state, chunk_size,
+                                   first_response=response)
+                return state, None
+
+            _save_part_state(output_filename, state)
+            mode = "wb"
+            hashers = _new_hashers(algorithms)
+        else:
+            detail = f"HTTP {response.status_code}"
+            if response.status_code == 403:
+                detail += " (possible blocking or scraper detection)"
+            _clear_part(output_filename)
+            raise DownloadError(f"[{app_name}] Download failed: {detail}")
+
+        # Hash while writing so large packages are not read back a second time.
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    for hasher in hashers.values():
+                        hasher.update(chunk)
+        return state, hashers
+    finally:
+        response.close()
+
+
+def _fetch_package(downloader, url: str, headers: dict, output_filename: str, app_name: str,
+                   segments: int = DEFAULT_SEGMENTS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   expected_digest: str | None = None) -> tuple[str, dict]:
+    """
+    Download `url` into `<output>.part`, resuming an earlier partial download with
+    HTTP Range requests when the server supports them. Large files served with
+    `Accept-Ranges: bytes` are split into `segments` concurrent byte ranges.
+
+    Args:
+        expected_digest: Optional source-provided checksum ("sha256:<hex>" or
+            "md5:<hex>"); the download is rejected if it does not match.
+
+    Returns:
+        (path of the completed download named `<output>.download<ext>`,
+         {algorithm: hex digest} of its content, always including sha256)
+    """
+    part_path, _ = _part_paths(output_filename)
+    expected = _parse_digest(expected_digest)
+    algorithms = ("sha256",)
+    if expected and expected[0] != "sha256":
+        algorithms += (expected[0],)
+
+    for attempt in range(1, MAX_DOWNLOAD_ATTEMPTS + 1):
+        state = _load_part_state(output_filename, url)
+        hashers = None
+        try:
+            if state and state.get("segments"):
+                print(f"[*] [{app_name}] Resuming segmented download...")
+                _download_segments(downloader, url, headers, output_filename, state, chunk_size)
+            else:
+                state, hashers = _stream_single(downloader, url, headers, output_filename, state,
+                                                segments, chunk_size, app_name, algorithms)
+        except _RestartDownload:
+            _clear_part(output_filename)
+            state = None
+        except requests.exceptions.RequestException as e:
+            if attempt == MAX_DOWNLOAD_ATTEMPTS:
+                raise DownloadError(f"[{app_name}] Download interrupted: {e}") from e
+            print(f"[!] [{app_name}] Download interrupted ({e}); retrying ({attempt}/{MAX_DOWNLOAD_ATTEMPTS})...")
+            continue
+
+        if _is_complete(part_path, state):
+            # Segmented downloads arrive out of order, so they are hashed in one final pass.
+            if hashers is None:
+                hashers = _hash_file(part_path, algorithms)
+            digests = {name: hasher.hexdigest() for name, hasher in hashers.items()}
+
+            if expected and digests[expected[0]] != expected[1]:
+                _clear_part(output_filename)
+                raise DownloadError(
+                    f"[{app_name}] Checksum mismatch: expected {expected[0]}:{expected[1]}, "
+                    f"got {expected[0]}:{digests[expected[0]]}"
+                )
+
+            temp_download = f"{output_filename}.download{state['extension']}"
+            os.replace(part_path, temp_download)
+            _clear_part(output_filename)
+            return temp_download, digests
+
+        if attempt < MAX_DOWNLOAD_ATTEMPTS:
+            print(f"[!] [{app_name}] Download incomplete; retrying ({attempt}/{MAX_DOWNLOAD_ATTEMPTS})...")
+
+    raise DownloadError(f"[{app_name}] Download incomplete after {MAX_DOWNLOAD_ATTEMPTS} attempts.")
+
+
+def _is_valid_apk(path: str) -> bool:
+    return classify_package(path).kind == KIND_APK
+
+
+def _is_xapk(path: str) -> bool:
+    return classify_package(path).kind == KIND_XAPK
 
 
 def _convert_xapk_to_apk(xapk_path: str) -> str:
@@ -87,7 +394,7 @@ def _convert_xapk_to_apk(xapk_path: str) -> str:
     command = [sys.executable, converter_script, xapk_path]
 
     try:
-        subprocess.run(command, check=True, capture_output=True, text=True)
+        run_subprocess(command, check=True, capture_output=True, text=True)
     except subprocess.CalledProcessError as e:
         stderr = (e.stderr or "").strip()
         stdout = (e.stdout or "").strip()
@@ -101,78 +408,292 @@ def _convert_xapk_to_apk(xapk_path: str) -> str:
     return converted_apk
 
 
-def _normalize_downloaded_file(download_path: str, output_filename: str):
+def _normalize_downloaded_file(download_path: str, output_filename: str) -> bool:
+    """Move the download to `output_filename` as an APK. Returns True if it was converted."""
     output_dir = os.path.dirname(output_filename)
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
 
-    if _is_valid_apk(download_path):
+    kind = classify_package(download_path).kind
+    if kind == KIND_APK:
         shutil.move(download_path, output_filename)
-        return
+        return False
 
-    if _is_xapk(download_path):
+    # APKS bundles (split APKs without an XAPK manifest) merge the same way.
+    if kind in (KIND_XAPK, KIND_APKS):
         converted_apk = _convert_xapk_to_apk(os.path.abspath(download_path))
         shutil.move(converted_apk, output_filename)
         if os.path.exists(download_path):
             os.remove(download_path)
-        return
+        return True
 
     raise RuntimeError("Downloaded file is neither a valid APK nor a convertible XAPK.")
 
 
-def download_app(app_config: dict, output_filename: str = "latest.apk") -> tuple:
-    """
-    Check configured source for updates and download if a newer version exists.
+def _apply_version_overrides(app_config: dict, remote_version: str, title: str) -> tuple[str, str]:
+    """Apply app.json version_overrides / hotfixes to a freshly resolved remote version."""
+    # --- מנגנון הוטפיקס וזיוף גרסאות ---
+    version_overrides = app_config.get("version_overrides", {})
+    hotfixes = app_config.get("hotfixes", {})
 
-    Args:
-        app_config: Parsed app.json dict.
-        output_filename: Where to save the downloaded APK.
+    override_ver = version_overrides.get(remote_version)
+    if override_ver:
+        remote_version = str(override_ver)
+        title = f"{title} (Version Override: {override_ver})"
+    else:
+        suffix = hotfixes.get(remote_version)
+        if suffix:
+            remote_version = f"{remote_version}{suffix}"
+            title = f"{title} (Hotfix {suffix})"
+    return remote_version, title
 
-    Returns:
-        (update_needed: bool, new_version: str | None)
-    """
-    version_file = app_config["version_file"]
-    app_name = app_config["name"]
-    source_name = app_config.get("source", "apkmirror")
 
-    # 1. Initialize source from registry.
+def _build_source(app_config: dict, source_name: str, check_only: bool = False) -> tuple:
+    app_name = app_config["name"]
     try:
         source_name, source, lookup_value = create_source(source_name, app_config)
     except Exception as e:
         raise DownloadError(f"[{app_name}] Source configuration error: {e}") from e
-
+    if check_only:
+        # Sources that would download a build to learn its version skip that.
+        source.check_only = True
     print(f"[*] [{app_name}] Using source: {source_name}")
+    return source_name, source, lookup_value
 
-    # 2. Get local version.
-    local_version = get_local_version(version_file)
-    print(f"[*] [{app_name}] Local version: {local_version}")
 
-    # 3. Check for updates.
-    try:
-        remote_version, release_url, title = source.get_latest_version(lookup_value)
-    except Exception as e:
-        raise DownloadError(f"[{app_name}] Search failed: {e}") from e
+def _query_result(app_config: dict, health, source_name: str, source, started: float,
+                  result: tuple | None = None, error: Exception | None = None) -> dict:
+    """Turn one source's answer (or exception) into a resolved release, recording the outcome in `health`."""
+    app_name = app_config["name"]
+    latency = time.perf_counter() - started
+
+    if error is not None:
+        if health:
+            health.record(source_name, False, latency, error)
+        raise DownloadError(f"[{app_name}] Search failed: {error}") from error
 
+    remote_version, release_url, title = result
     if not remote_version:
+        if health:
+            health.record(source_name, False, latency, "NoResults")
         raise DownloadError(f"[{app_name}] No results found on {source_name}.")
+    if health:
+        health.record(source_name, True, latency)
+
+    return {
+        "source_name": source_name,
+        "source": source,
+        "remote_version": remote_version,
+        "release_url": release_url,
+        "title": title,
+    }
+
+
+def _query_source(app_config: dict, source_name: str, health, check_only: bool = False) -> dict:
+    """Build one source and ask it for the latest release."""
+    source_name, source, lookup_value = _build_source(app_config, source_name, check_only)
+    started = time.perf_counter()
+    try:
+        result = source.get_latest_version(lookup_value)
+    except Exception as e:
+        return _query_result(app_config, health, source_name, source, started, error=e)
+    return _query_result(app_config, health, source_name, source, started, result)
 
-    # --- מנגנון הוטפיקס וזיוף גרסאות ---
-    version_overrides = app_config.get("version_overrides", {})
-    hotfixes = app_config.get("hotfixes", {})
 
-    override_ver = version_overrides.get(remote_version)
-    if override_ver:
-        remote_version = str(override_ver)
-        title = f"{title} (Version Override: {override_ver})"
-    else:
-        suffix = hotfixes.get(remote_version)
-        if suffix:
-            remote_version = f"{remote_version}{suffix}"
-            title = f"{title} (Hotfix {suffix})"
-    # -----------------------------------
+async def _aquery_source(app_config: dict, source_name: str, health) -> dict:
+    """_query_source(check_only=True) on the event loop; blocking adapters run on a worker thread."""
+    source_name, source, lookup_value = _build_source(app_config, source_name, check_only=True)
+    started = time.perf_counter()
+    try:
+        result = await as_async(source).aget_latest_version(lookup_value)
+    except Exception as e:
+        return _query_result(app_config, health, source_name, source, started, error=e)
+    return _query_result(app_config, health, source_name, source, started, result)
+
+
+def _begin_resolve(app_config: dict, exclude) -> tuple:
+    """Steps 1-2: the candidate sources (healthiest first) and the local version."""
+    app_name = app_config["name"]
+    health = get_source_health()
+
+    # 1. Pick the candidate sources from the registry.
+    candidates = [name for name in source_candidates(app_config, health) if name not in exclude]
+    if not candidates:
+        raise DownloadError(f"[{app_name}] No sources left to try.")
+    if len(candidates) > 1:
+        print(f"[*] [{app_name}] Source order: {', '.join(candidates)}")
+
+    # 2. Get local version.
+    local_version = get_local_version(app_config["version_file"])
+    print(f"[*] [{app_name}] Local version: {local_version}")
+    return health, candidates, local_version
+
+
+def _source_failed(error: DownloadError, candidates: list[str], index: int):
+    if index == len(candidates) - 1:
+        raise error
+    print(f"[!] {error} Trying {candidates[index + 1]}...")
+
+
+def _finish_resolve(app_config: dict, resolved: dict, local_version: str | None) -> dict:
+    app_name = app_config["name"]
+    remote_version, title = _apply_version_overrides(app_config, resolved["remote_version"], resolved["title"])
 
     print(f"[*] [{app_name}] Latest release: {title}")
     print(f"[*] [{app_name}] Remote version: {remote_version}")
+
+    resolved.update(local_version=local_version, remote_version=remote_version, title=title)
+    return resolved
+
+
+def _resolve_remote_version(app_config: dict, exclude: set | frozenset = frozenset(),
+                            check_only: bool = False) -> dict:
+    """
+    Steps 1-3 of the pipeline: pick the source, read the local version and
+    query the remote one. Shared by download_app and check_for_update.
+
+    The app's acceptable sources (except `exclude`) are tried healthiest
+    first; the first one that answers wins. "fallbacks" lists the ones after it.
+    With `check_only`, sources must not download anything to answer.
+    """
+    health, candidates, local_version = _begin_resolve(app_config, exclude)
+
+    # 3. Check for updates, falling through to the next source on failure.
+    for index, source_name in enumerate(candidates):
+        try:
+            resolved = _query_source(app_config, source_name, health, check_only)
+        except DownloadError as e:
+            _source_failed(e, candidates, index)
+            continue
+        resolved["fallbacks"] = candidates[index + 1:]
+        return _finish_resolve(app_config, resolved, local_version)
+
+
+async def _aresolve_remote_version(app_config: dict) -> dict:
+    """_resolve_remote_version on the event loop."""
+    health, candidates, local_version = _begin_resolve(app_config, frozenset())
+
+    for index, source_name in enumerate(candidates):
+        try:
+            resolved = await _aquery_source(app_config, source_name, health)
+        except DownloadError as e:
+            _source_failed(e, candidates, index)
+            continue
+        resolved["fallbacks"] = candidates[index + 1:]
+        return _finish_resolve(app_config, resolved, local_version)
+
+
+def _check_result(resolved: dict) -> dict:
+    update_needed = resolved["remote_version"] != resolved["local_version"]
+    if resolved["remote_version"] == UNKNOWN_VERSION:
+        # Undecided, not "no update": the full download run has to find out.
+        print(f"[!] [{resolved['source_name']}] Remote version unknown without a download.")
+        update_needed = None
+    return {
+        "source": resolved["source_name"],
+        "local_version": resolved["local_version"],
+        "remote_version": resolved["remote_version"],
+        "update_needed": update_needed,
+    }
+
+
+def check_for_update(app_config: dict) -> dict:
+    """
+    Run only the version check for an app. Nothing is downloaded.
+
+    Args:
+        app_config: Parsed app.json dict.
+
+    Returns:
+        dict with source, local_version, remote_version and update_needed.
+        A source that cannot tell the version without a download reports
+        remote_version "unknown" and update_needed None.
+
+    Raises:
+        DownloadError: if the source cannot be built or queried.
+    """
+    return _check_result(_resolve_remote_version(app_config, check_only=True))
+
+
+async def async_check_for_update(app_config: dict) -> dict:
+    """
+    check_for_update for use on an event loop.
+
+    Async-native sources (see core.sources.AsyncSource) query without a
+    thread; the others run on the default executor.
+    """
+    return _check_result(await _aresolve_remote_version(app_config))
+
+
+def _artifact_meta_path(output_filename: str) -> str:
+    return f"{output_filename}.meta.json"
+
+
+def _write_artifact_meta(output_filename: str, meta: dict):
+    with open(_artifact_meta_path(output_filename), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def read_artifact_meta(output_filename: str = "latest.apk") -> dict | None:
+    """
+    Read the integrity metadata download_app recorded next to the APK.
+
+    Returns:
+        dict with version, source, sha256, size and (when the source published
+        one) verified_digest, or None if no metadata was recorded.
+    """
+    try:
+        with open(_artifact_meta_path(output_filename), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def download_app(app_config: dict, output_filename: str = "latest.apk") -> tuple:
+    """
+    Check configured source for updates and download if a newer version exists.
+
+    When the download from the chosen source fails and the app accepts other
+    sources, the check is repeated against the remaining ones.
+
+    Args:
+        app_config: Parsed app.json dict.
+        output_filename: Where to save the downloaded APK.
+
+    Returns:
+        (update_needed: bool, new_version: str | None)
+    """
+    app_name = app_config["name"]
+    health = get_source_health()
+    tried = set()
+
+    while True:
+        with stage("check"):
+            resolved = _resolve_remote_version(app_config, exclude=tried)
+        try:
+            result = _download_release(app_config, resolved, output_filename)
+        except DownloadError as e:
+            if health:
+                health.record(resolved["source_name"], False, error=e)
+            if not resolved["fallbacks"]:
+                raise
+            tried.add(resolved["source_name"])
+            print(f"[!] {e} Trying {resolved['fallbacks'][0]}...")
+            continue
+        if health and result[0]:
+            health.record(resolved["source_name"], True)
+        return result
+
+
+def _download_release(app_config: dict, resolved: dict, output_filename: str) -> tuple:
+    """Steps 4-6: compare versions and fetch the release `_resolve_remote_version` found."""
+    app_name = app_config["name"]
+    source_name = resolved["source_name"]
+    source = resolved["source"]
+    local_version = resolved["local_version"]
+    remote_version = resolved["remote_version"]
+    release_url = resolved["release_url"]
+
     # 4. Compare versions.
     if remote_version == local_version:
         print(f"[i] [{app_name}] Versions match. No update needed.")
@@ -180,7 +701,18 @@ def download_app(app_config: dict, output_filename: str = "latest.apk") -> tuple
 
     print(f"[!] [{app_name}] Update detected! ({local_version} -> {remote_version})")
 
-    # 5. Resolve final download link and download package.
+    # 5. Reuse a previously downloaded copy of this exact release when caching is enabled.
+    cache = get_cache()
+    cache_key = (app_config.get("package_name") or app_name, remote_version, source_name)
+    meta = {"version": remote_version, "source": source_name}
+    cached_sha256 = cache.fetch(*cache_key, output_filename) if cache else None
+    if cached_sha256:
+        print(f"[+] [{app_name}] Using cached package for {remote_version}: {output_filename}")
+        meta.update(sha256=cached_sha256, size=os.path.getsize(output_filename))
+        _write_artifact_meta(output_filename, meta)
+        return True, remote_version
+
+    # 6. Resolve final download link and download package.
     try:
         direct_link = source.get_download_url(release_url)
         if not direct_link:
@@ -188,33 +720,43 @@ def download_app(app_config: dict, output_filename: str = "latest.apk") -> tuple
 
         print(f"[*] [{app_name}] Downloading from {source_name} to {output_filename}...")
         headers = getattr(source, "headers", DEFAULT_HEADERS)
-        downloader = getattr(source, "scraper", requests)
-        response = downloader.get(direct_link, stream=True, headers=headers, allow_redirects=True)
-        try:
-            if response.status_code != 200:
-                detail = f"HTTP {response.status_code}"
-                if response.status_code == 403:
-                    detail += " (possible blocking or scraper detection)"
-                raise DownloadError(f"[{app_name}] Download failed: {detail}")
-
-            content_type = (response.headers.get("Content-Type") or "").lower()
-            if content_type.startswith("text/html"):
-                raise DownloadError(f"[{app_name}] Received HTML instead of package binary.")
-
-            response_filename = _extract_filename_from_response(response)
-            extension = _detect_extension(response, response_filename)
-            temp_download = f"{output_filename}.download{extension}"
-
-            with open(temp_download, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-        finally:
-            response.close()
-
-        _normalize_downloaded_file(temp_download, output_filename)
-        if not _is_valid_apk(output_filename):
-            raise DownloadError(f"[{app_name}] Final output is not a valid APK: {output_filename}")
+        downloader = getattr(source, "scraper", None) or get_session("download")
+        get_expected_digest = getattr(source, "get_expected_digest", None)
+        expected_digest = get_expected_digest(direct_link) if get_expected_digest else None
+        with stage("fetch"):
+            temp_download, digests = _fetch_package(
+                downloader,
+                direct_link,
+                headers,
+                output_filename,
+                app_name,
+                segments=int(app_config.get("download_segments", DEFAULT_SEGMENTS)),
+                chunk_size=int(app_config.get("download_chunk_size", DEFAULT_CHUNK_SIZE)),
+                expected_digest=expected_digest,
+            )
+        if expected_digest:
+            print(f"[+] [{app_name}] Checksum verified against {source_name}: {expected_digest}")
+            meta["verified_digest"] = expected_digest
+
+        with stage("normalize"):
+            converted = _normalize_downloaded_file(temp_download, output_filename)
+            if not _is_valid_apk(output_filename):
+                raise DownloadError(f"[{app_name}] Final output is not a valid APK: {output_filename}")
+
+        # A plain APK is moved as-is, so its streamed digest still applies.
+        if converted:
+            meta["download_sha256"] = digests["sha256"]
+            meta["sha256"] = sha256_file(output_filename)
+        else:
+            meta["sha256"] = digests["sha256"]
+        meta["size"] = os.path.getsize(output_filename)
+        _write_artifact_meta(output_filename, meta)
+
+        if cache:
+            try:
+                cache.store(output_filename, *cache_key, sha256=meta["sha256"])
+            except OSError as e:
+                print(f"[!] [{app_name}] Could not add package to the artifact cache: {e}")
 
         print(f"[+] [{app_name}] Download complete: {output_filename}")
         # Note: Version is updated by the orchestrator (run.py or CI) only on success.
@@ -2,10 +2,13 @@
 import os
 import re
 
-def apply_hotfix_if_needed(decompiled_dir: str, config: dict):
+from core.patch_session import PatchSession
+
+def apply_hotfix_if_needed(decompiled_dir: str, config: dict, session: PatchSession | None = None):
     """
     Checks if the current version has a hotfix suffix, or a full version/code override defined in app.json.
     If so, it applies the modifications to both apktool.yml and AndroidManifest.xml.
+    Changes go through `session` when given; otherwise they are written before returning.
     """
     hotfixes = config.get("hotfixes", {})
     version_overrides = config.get("version_overrides", {})
@@ -14,11 +17,13 @@ def apply_hotfix_if_needed(decompiled_dir: str, config: dict):
     if not hotfixes and not version_overrides and not version_code_overrides:
         return
 
+    own_session = session is None
+    session = session or PatchSession(decompiled_dir)
+
     # 1. Edit apktool.yml
     apktool_yml_path = os.path.join(decompiled_dir, "apktool.yml")
-    if os.path.exists(apktool_yml_path):
-        with open(apktool_yml_path, "r", encoding="utf-8") as f:
-            content = f.read()
+    if session.exists(apktool_yml_path):
+        content = session.read(apktool_yml_path)
 
         pattern_yml_name = re.compile(r"(versionName:\s*)(['\"]?)([^'\">\r\n]+)\2")
         match_yml = pattern_yml_name.search(content)
@@ -48,14 +53,12 @@ def apply_hotfix_if_needed(decompiled_dir: str, config: dict):
                     content = pattern_yml_code.sub(rf"\g<1>\g<2>{new_version_code}\g<2>", content, count=1)
                     print(f"[+] [Version Patch] apktool.yml versionCode patched: {original_code} -> {new_version_code}")
 
-        with open(apktool_yml_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        session.write(apktool_yml_path, content)
 
     # 2. Edit AndroidManifest.xml
     manifest_path = os.path.join(decompiled_dir, "AndroidManifest.xml")
-    if os.path.exists(manifest_path):
-        with open(manifest_path, "r", encoding="utf-8") as f:
-            content = f.read()
+    if session.exists(manifest_path):
+        content = session.read(manifest_path)
 
         pattern_manifest_name = re.compile(r'(android:versionName=")([^"]+)(")')
         match_manifest = pattern_manifest_name.search(content)
@@ -84,5 +87,7 @@ def apply_hotfix_if_needed(decompiled_dir: str, config: dict):
                     content = pattern_manifest_code.sub(rf"\g<1>{new_version_code}\g<3>", content, count=1)
                     print(f"    [+] [Version Patch] AndroidManifest.xml versionCode patched: {original_code} -> {new_version_code}")
 
-        with open(manifest_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        session.write(manifest_path, content)
+
+    if own_session:
+        session.flush()
@@ -0,0 +1,164 @@
+"""
+Disk-backed cache for scraped discovery pages.
+
+Sources opt in per request with `cached_get(session, url, policy, ...)`.
+A stored response is served locally while it is fresher than its policy's
+TTL; after that it is revalidated with If-None-Match / If-Modified-Since when
+the server sent validators, and refetched otherwise.
+
+Only use it for pages that identify a release (search results, app and
+release pages, metadata APIs), never for pages that hand out download tokens.
+
+The cache lives in `$APP_STORE_CACHE_DIR/http/responses.sqlite` and is a
+pass-through when no cache dir is configured or APP_STORE_HTTP_CACHE=0.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from core.artifact_cache import CACHE_DIR_ENV
+
+
+HTTP_CACHE_ENV = "APP_STORE_HTTP_CACHE"
+
+# Seconds a response is served without contacting the server, per source/page kind.
+POLICIES = {
+    "apkmirror.search": 15 * 60,
+    # Release pages describe one fixed upstream version.
+    "apkmirror.release": 7 * 24 * 3600,
+    "apkcombo.page": 30 * 60,
+    "uptodown.page": 30 * 60,
+    "custom_fallback.page": 30 * 60,
+    "custom_fallback.api": 15 * 60,
+    # Always revalidated: a 304 costs no GitHub rate limit, a stale release does.
+    "github.api": 0,
+}
+DEFAULT_TTL = 15 * 60
+
+# Rows untouched for this long are dropped.
+MAX_AGE = 14 * 24 * 3600
+
+# Body-related headers no longer describe the decoded body we store.
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+
+
+class HttpCache:
+    """sqlite store of GET responses keyed by their full URL."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                       url TEXT PRIMARY KEY,
+                       final_url TEXT NOT NULL,
+                       status INTEGER NOT NULL,
+                       headers TEXT NOT NULL,
+                       encoding TEXT,
+                       body BLOB NOT NULL,
+                       stored_at REAL NOT NULL
+                   )"""
+            )
+            db.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - MAX_AGE,))
+
+    def _connect(self) -> sqlite3.Connection:
+        # A short-lived connection per call keeps this safe across threads and forks.
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def load(self, url: str) -> tuple[requests.Response, float] | None:
+        """Return (cached response, age in seconds) for `url`, or None."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT final_url, status, headers, encoding, body, stored_at FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        final_url, status, headers, encoding, body, stored_at = row
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response.encoding = encoding
+        response._content = body
+        # Callers look at .url to detect redirects (e.g. Uptodown search -> app page).
+        response.url = final_url
+        response.from_cache = True
+        return response, time.time() - stored_at
+
+    def store(self, url: str, response: requests.Response):
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, response.url or url, response.status_code, json.dumps(headers), response.encoding,
+                 response.content, time.time()),
+            )
+
+    def touch(self, url: str):
+        with self._connect() as db:
+            db.execute("UPDATE responses SET stored_at = ? WHERE url = ?", (time.time(), url))
+
+
+_caches: dict[str, HttpCache] = {}
+
+
+def get_http_cache() -> HttpCache | None:
+    """Return the configured HTTP cache, or None when caching is disabled."""
+    root = os.getenv(CACHE_DIR_ENV, "").strip()
+    if not root or os.getenv(HTTP_CACHE_ENV, "1").strip() == "0":
+        return None
+    path = os.path.join(root, "http", "responses.sqlite")
+    if path not in _caches:
+        _caches[path] = HttpCache(path)
+    return _caches[path]
+
+
+def cached_get(session, url: str, policy: str, ttl: float | None = None, **kwargs):
+    """
+    `session.get(url, **kwargs)` served from the HTTP cache when possible.
+
+    Args:
+        session: Session (or scraper) that performs real requests.
+        policy: Key into POLICIES selecting the freshness TTL.
+        ttl: Explicit TTL in seconds, overriding the policy.
+
+    Returns:
+        A requests.Response; cached ones have `from_cache = True`.
+    """
+    cache = get_http_cache()
+    if cache is None or kwargs.get("stream"):
+        return session.get(url, **kwargs)
+
+    params = kwargs.pop("params", None)
+    if params:
+        url = requests.Request("GET", url, params=params).prepare().url
+    ttl = POLICIES.get(policy, DEFAULT_TTL) if ttl is None else ttl
+
+    cached = cache.load(url)
+    if cached:
+        response, age = cached
+        if age < ttl:
+            return response
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        if validators:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **validators}
+
+    fresh = session.get(url, **kwargs)
+    if cached and fresh.status_code == 304:
+        cache.touch(url)
+        return cached[0]
+    if fresh.status_code == 200:
+        cache.store(url, fresh)
+    return fresh
@@ -0,0 +1,202 @@
+"""
+Per-stage resource accounting for the pipeline.
+
+Wrap a stage in `stage(name)` (or decorate a function with `timed(name)`)
+and, while a `run_report(...)` is open, its wall time, CPU time, peak RSS,
+I/O and network bytes are added to that run's report:
+
+    with run_report(app_id, "apps/bit/run_report.json", step="all"):
+        with stage("download"):
+            ...
+
+Stages nest; a stage opened inside "download" is recorded as
+"download/fetch". When no run is open, `stage` only costs a few clock reads.
+Every stage is also a core.tracing span when tracing is enabled.
+
+What each field measures:
+    wall_s / cpu_s        perf_counter / process_time of this process
+    child_cpu_s           CPU of child processes that finished in the stage
+                          (apk-mitm, java)
+    peak_rss_mb           process high-water mark at the end of the stage
+                          (ru_maxrss: it never goes down within a process)
+    read_bytes /
+    write_bytes           bytes through read()/write() syscalls (/proc/self/io
+                          rchar/wchar, Linux only; includes sockets)
+    net_bytes             HTTP body bytes received through core.transport sessions
+
+One report file holds one entry per `--step` invocation, so the separate
+download and patch steps of a CI run end up side by side.
+"""
+
+import contextlib
+import datetime
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+from core import tracing
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+_lock = threading.Lock()
+_net_bytes = 0
+_current = None
+_stack = threading.local()
+
+
+def add_net_bytes(count: int):
+    """Account `count` bytes received from the network (called by core.transport)."""
+    global _net_bytes
+    with _lock:
+        _net_bytes += count
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _child_cpu() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _io_bytes() -> tuple[int, int] | None:
+    try:
+        with open("/proc/self/io", "r", encoding="ascii") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _sample() -> dict:
+    return {
+        "wall": time.perf_counter(),
+        "cpu": time.process_time(),
+        "child_cpu": _child_cpu(),
+        "io": _io_bytes(),
+        "net": _net_bytes,
+    }
+
+
+def _measure(start: dict, end: dict) -> dict:
+    record = {
+        "wall_s": round(end["wall"] - start["wall"], 3),
+        "cpu_s": round(end["cpu"] - start["cpu"], 3),
+        "child_cpu_s": round(end["child_cpu"] - start["child_cpu"], 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "net_bytes": end["net"] - start["net"],
+    }
+    if start["io"] and end["io"]:
+        record["read_bytes"] = end["io"][0] - start["io"][0]
+        record["write_bytes"] = end["io"][1] - start["io"][1]
+    return record
+
+
+class RunReport:
+    """The stages recorded for one app during one pipeline invocation."""
+
+    def __init__(self, app_id: str, path: str, step: str = "all"):
+        self.app_id = app_id
+        self.path = path
+        self.step = step
+        self.started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.stages: list[dict] = []
+        self.total: dict = {}
+
+    def write(self):
+        """Merge this run into the report file (one entry per step), atomically."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+            if report.get("app_id") != self.app_id:
+                report = {}
+        except (OSError, ValueError):
+            report = {}
+        report["app_id"] = self.app_id
+        report.setdefault("steps", {})[self.step] = {
+            "started": self.started,
+            "run_id": os.getenv("GITHUB_RUN_ID"),
+            "total": self.total,
+            "stages": self.stages,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def current_report() -> RunReport | None:
+    return _current
+
+
+@contextlib.contextmanager
+def run_report(app_id: str, path: str, step: str = "all"):
+    """Record every stage opened until exit and write the report to `path`."""
+    global _current
+    previous, _current = _current, RunReport(app_id, path, step)
+    report = _current
+    start = _sample()
+    try:
+        yield report
+    finally:
+        report.total = _measure(start, _sample())
+        _current = previous
+        try:
+            report.write()
+            print(f"[i] [{app_id}] Stage report written to {path} ({report.total['wall_s']}s total)")
+        except OSError as e:
+            print(f"[!] [{app_id}] Could not write stage report: {e}")
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """
+    Measure the enclosed block as stage `name` of the open run (if any).
+
+    Yields the stage record; callers may add fields to it (e.g. "ok").
+    """
+    names = getattr(_stack, "names", None)
+    if names is None:
+        names = _stack.names = []
+    names.append(name)
+    record = {"stage": "/".join(names)}
+    start = _sample()
+    try:
+        with tracing.span(name, "stage"):
+            yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        names.pop()
+        record.update(_measure(start, _sample()))
+        report = _current
+        if report is not None:
+            with _lock:
+                report.stages.append(record)
+
+
+def timed(name: str):
+    """Decorator form of `stage(name)`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
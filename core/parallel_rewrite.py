@@ -0,0 +1,129 @@
+"""
+Apply a compiled rewrite to many smali files across a process pool.
+
+Whole-tree passes (redirect every reference to a class, swap every
+getPackageInfo call, ...) are CPU bound regex work over thousands of files.
+`rewrite_files` shards the file list over worker processes; each worker
+reads, rewrites and saves its files and sends back only per-file
+substitution counts and unified diffs.
+
+Small batches run inline, where a pool would cost more than it saves.
+
+Tunables (environment):
+    APP_STORE_PATCH_WORKERS     worker processes (default: CPU count)
+"""
+
+import difflib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+
+WORKERS_ENV = "APP_STORE_PATCH_WORKERS"
+
+# Below this many files the rewrite runs in the calling process.
+MIN_PARALLEL_FILES = 256
+
+# Shards per worker; more shards even out uneven file sizes.
+SHARDS_PER_WORKER = 4
+
+
+class RewriteRule(NamedTuple):
+    """`pattern` (compiled regex, or a literal string) replaced by `replacement` (re.sub syntax for regexes)."""
+    pattern: re.Pattern | str
+    replacement: str
+
+
+class FileRewrite(NamedTuple):
+    path: str
+    count: int
+    diff: str
+
+
+def default_workers() -> int:
+    try:
+        return max(1, int(os.getenv(WORKERS_ENV, "")))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def _apply(rules, content: str) -> tuple[str, int]:
+    total = 0
+    for rule in rules:
+        if isinstance(rule.pattern, str):
+            count = content.count(rule.pattern)
+            if count:
+                content = content.replace(rule.pattern, rule.replacement)
+        else:
+            content, count = rule.pattern.subn(rule.replacement, content)
+        total += count
+    return content, total
+
+
+def _diff_name(path: str, root_dir: str | None) -> str:
+    # Same naming as core.diff_recorder: relative to the tree, "/"-separated.
+    if root_dir:
+        name = os.path.relpath(path, root_dir)
+        if not name.startswith(".."):
+            return name.replace(os.sep, "/")
+    return os.path.basename(path)
+
+
+def _unified_diff(path: str, old: str, new: str, root_dir: str | None = None) -> str:
+    name = _diff_name(path, root_dir)
+    return "\n".join(difflib.unified_diff(
+        old.splitlines(), new.splitlines(), fromfile=f"a/{name}", tofile=f"b/{name}", lineterm=""
+    ))
+
+
+def _rewrite_shard(paths: list[str], rules, with_diff: bool, root_dir: str | None = None) -> list[FileRewrite]:
+    results = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        new_content, count = _apply(rules, content)
+        if not count or new_content == content:
+            continue
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(new_content)
+        diff = _unified_diff(path, content, new_content, root_dir) if with_diff else ""
+        results.append(FileRewrite(path, count, diff))
+    return results
+
+
+def rewrite_files(paths, rules, workers: int | None = None, with_diff: bool = True,
+                  root_dir: str | None = None) -> list[FileRewrite]:
+    """
+    Apply `rules` in order to every file in `paths`, saving the files that change.
+
+    Args:
+        paths: Files to rewrite (usually SmaliIndex.files_containing(anchor)).
+        rules: RewriteRule list; must be picklable (compiled patterns are).
+        workers: Worker processes; defaults to APP_STORE_PATCH_WORKERS or the CPU count.
+        with_diff: Also return a unified diff per changed file.
+        root_dir: Name files in the diffs relative to this directory (the
+            decompiled tree), as DiffRecorder does; basenames otherwise.
+
+    Returns:
+        One FileRewrite per changed file, in `paths` order.
+    """
+    paths = list(paths)
+    rules = [rule if isinstance(rule, RewriteRule) else RewriteRule(*rule) for rule in rules]
+    workers = workers or default_workers()
+    if workers <= 1 or len(paths) < MIN_PARALLEL_FILES:
+        return _rewrite_shard(paths, rules, with_diff, root_dir)
+
+    shard_count = min(len(paths), workers * SHARDS_PER_WORKER)
+    shards = [paths[i::shard_count] for i in range(shard_count)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard_results in pool.map(_rewrite_shard, shards, [rules] * shard_count,
+                                      [with_diff] * shard_count, [root_dir] * shard_count):
+            results.extend(shard_results)
+    order = {path: i for i, path in enumerate(paths)}
+    results.sort(key=lambda result: order[result.path])
+    return results
@@ -0,0 +1,102 @@
+"""
+HTML parsing for the scraping sources.
+
+`make_soup(markup)` builds a BeautifulSoup tree with the fastest installed
+tree builder: lxml (C) when available, the pure-Python "html.parser"
+otherwise (APP_STORE_HTML_PARSER forces one). Pass `parse_only=SoupStrainer(...)`
+to build only the elements a scraper reads instead of the whole page.
+
+`first_attr(markup, tag, attr, attrs)` is for pages where one attribute is
+all that is needed (a download button's href): it feeds the page to a
+streaming tokenizer in chunks, builds no tree and stops at the first
+matching element.
+
+    soup = make_soup(resp.text, parse_only=SoupStrainer("div", class_="appRow"))
+    href = first_attr(resp.text, "a", "href", {"class": "downloadButton"})
+"""
+
+import os
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+except ImportError:
+    lxml = None
+
+
+HTML_PARSER_ENV = "APP_STORE_HTML_PARSER"
+
+# Characters handed to the streaming tokenizer per step.
+FEED_CHUNK = 64 * 1024
+
+# Attributes holding space-separated tokens, matched per token like bs4 does.
+_TOKEN_ATTRS = {"class", "rel"}
+
+
+def parser_name() -> str:
+    """The BeautifulSoup tree builder make_soup uses."""
+    forced = os.getenv(HTML_PARSER_ENV, "").strip()
+    if forced:
+        return forced
+    return "lxml" if lxml is not None else "html.parser"
+
+
+def make_soup(markup: str | bytes, parse_only: SoupStrainer | None = None) -> BeautifulSoup:
+    """BeautifulSoup of `markup` with the fastest available parser, optionally limited to `parse_only`."""
+    return BeautifulSoup(markup, parser_name(), parse_only=parse_only)
+
+
+def _matches(expected, value: str | None, tokens: bool) -> bool:
+    if callable(expected):
+        return bool(expected(value))
+    if expected is True:
+        return value is not None
+    if value is None:
+        return False
+    candidates = value.split() if tokens else [value]
+    wanted = expected if isinstance(expected, (list, tuple, set)) else [expected]
+    return any(item in candidates for item in wanted)
+
+
+class _FirstMatch(HTMLParser):
+    def __init__(self, tag: str | None, attr: str, attrs: dict):
+        super().__init__(convert_charrefs=True)
+        self.tag = tag
+        self.attr = attr
+        self.filters = attrs
+        self.found = False
+        self.value = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.found or (self.tag and tag != self.tag):
+            return
+        values = dict(attrs)
+        for name, expected in self.filters.items():
+            if not _matches(expected, values.get(name), name in _TOKEN_ATTRS):
+                return
+        if self.attr in values:
+            self.found = True
+            self.value = values[self.attr]
+
+    handle_startendtag = handle_starttag
+
+
+def first_attr(markup: str | bytes, tag: str | None, attr: str, attrs: dict | None = None) -> str | None:
+    """
+    Value of `attr` on the first `<tag>` (any tag for None) whose attributes match `attrs`.
+
+    `attrs` values may be a string (for class/rel: one of the tokens), a list
+    of accepted values, True (attribute present) or a callable taking the
+    value (None when absent), as in BeautifulSoup's find().
+    """
+    if isinstance(markup, bytes):
+        markup = markup.decode("utf-8", errors="replace")
+    parser = _FirstMatch(tag, attr, attrs or {})
+    for start in range(0, len(markup), FEED_CHUNK):
+        parser.feed(markup[start:start + FEED_CHUNK])
+        if parser.found:
+            return parser.value
+    parser.close()
+    return parser.value
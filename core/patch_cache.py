@@ -0,0 +1,204 @@
+"""
+Replay cache for patch results.
+
+Rebuilding the same upstream version (e.g. after an apk-mitm or signing
+failure in CI) used to run every patch stage from scratch. After a
+successful `run_patch`, the files the stages created or changed are stored
+by SHA-256 together with the list of deleted files, under a key covering:
+
+    - app_id and the decompile itself (apktool.yml, which carries the upstream
+      version and apktool version, a path/size listing of the tree, and the
+      latest.apk next to it)
+    - apps/<app_id>/ sources and app.json
+    - every file under core/ (patch helpers, updater payload)
+    - the repository the updater points at
+
+When the next run computes the same key, the stored files are written onto
+the fresh decompile instead of running the patches. Any difference in the
+key, or a missing/corrupt blob, means a normal full run.
+
+Files produced next to the decompile (the <app_id>.diff.gz artifact and its
+index) are stored with the entry as well and restored on replay, so a
+replayed build uploads the same diffs as the run that recorded it.
+
+Lives in `$APP_STORE_CACHE_DIR/patches/` (one entry per app); disabled
+without a cache dir or with APP_STORE_PATCH_CACHE=0.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+from core.artifact_cache import CACHE_DIR_ENV, sha256_file
+from core.repository import resolve_repository
+
+
+PATCH_CACHE_ENV = "APP_STORE_PATCH_CACHE"
+
+_CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _walk_files(root_dir: str):
+    for root, dirs, files in os.walk(root_dir):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for name in sorted(files):
+            if not name.endswith(".pyc"):
+                yield os.path.join(root, name)
+
+
+def _hash_files(digest, root_dir: str):
+    for path in _walk_files(root_dir):
+        digest.update(os.path.relpath(path, root_dir).replace(os.sep, "/").encode("utf-8"))
+        digest.update(sha256_file(path).encode("ascii"))
+
+
+def snapshot_tree(root_dir: str) -> dict[str, tuple[int, int, int]]:
+    """Return {relpath: (size, mtime_ns, inode)} for every file, without reading any."""
+    snapshot = {}
+    for root, _, files in os.walk(root_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            snapshot[os.path.relpath(path, root_dir)] = (st.st_size, st.st_mtime_ns, st.st_ino)
+    return snapshot
+
+
+def compute_key(app_id: str, decompiled_dir: str, snapshot: dict | None = None) -> str:
+    """Hash everything that determines the output of run_patch for this decompile."""
+    digest = hashlib.sha256()
+    digest.update(f"app:{app_id}\n".encode("utf-8"))
+
+    apktool_yml = os.path.join(decompiled_dir, "apktool.yml")
+    digest.update(sha256_file(apktool_yml).encode("ascii") if os.path.isfile(apktool_yml) else b"-")
+    snapshot = snapshot if snapshot is not None else snapshot_tree(decompiled_dir)
+    for rel_path in sorted(snapshot):
+        digest.update(f"{rel_path}:{snapshot[rel_path][0]}\n".encode("utf-8"))
+    # Patches may read the APK next to the decompile (e.g. WhatsApp's signature).
+    original_apk = os.path.join(os.path.dirname(os.path.abspath(decompiled_dir)), "latest.apk")
+    digest.update(sha256_file(original_apk).encode("ascii") if os.path.isfile(original_apk) else b"-")
+
+    app_dir = os.path.join("apps", app_id)
+    digest.update(b"app-sources\n")
+    if os.path.isdir(app_dir):
+        for path in _walk_files(app_dir):
+            if path.endswith(".py") or os.path.basename(path) == "app.json":
+                digest.update(path.replace(os.sep, "/").encode("utf-8"))
+                digest.update(sha256_file(path).encode("ascii"))
+
+    digest.update(b"core\n")
+    _hash_files(digest, _CORE_DIR)
+
+    owner, repo = resolve_repository()
+    digest.update(f"repo:{owner}/{repo}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PatchCache:
+    """Per-app record of the files a patch run produced, with content-addressed blobs."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blobs_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+
+    def _manifest_path(self, app_id: str) -> str:
+        return os.path.join(self.root, f"{app_id}.json")
+
+    def _blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blobs_dir, sha256[:2], sha256)
+
+    def _load(self, app_id: str) -> dict | None:
+        try:
+            with open(self._manifest_path(app_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def replay(self, app_id: str, key: str, decompiled_dir: str, artifacts_dir: str | None = None) -> bool:
+        """
+        Apply the stored result for `key` onto `decompiled_dir`, restoring
+        the recorded artifacts into `artifacts_dir` (skipped when None).
+
+        Returns:
+            True if the result was replayed; False (tree untouched) on any mismatch.
+        """
+        entry = self._load(app_id)
+        if not entry or entry.get("key") != key:
+            return False
+
+        files = entry.get("files", {})
+        artifacts = entry.get("artifacts", {}) if artifacts_dir else {}
+        for rel_path, sha256 in {**files, **artifacts}.items():
+            blob = self._blob_path(sha256)
+            if not os.path.isfile(blob) or sha256_file(blob) != sha256:
+                print(f"[!] [PatchCache] Missing or corrupt blob for {rel_path}; running patches.")
+                return False
+
+        restores = [(os.path.join(decompiled_dir, rel_path), sha256) for rel_path, sha256 in files.items()]
+        restores += [(os.path.join(artifacts_dir, name), sha256) for name, sha256 in artifacts.items()]
+        for dest, sha256 in restores:
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            shutil.copyfile(self._blob_path(sha256), f"{dest}.tmp")
+            os.replace(f"{dest}.tmp", dest)
+        for rel_path in entry.get("deleted", []):
+            path = os.path.join(decompiled_dir, rel_path)
+            if os.path.exists(path):
+                os.remove(path)
+
+        print(f"[+] [PatchCache] Replayed {len(files)} patched files for {app_id} "
+              f"({len(entry.get('deleted', []))} deleted).")
+        return True
+
+    def _store_blob(self, path: str) -> str:
+        sha256 = sha256_file(path)
+        blob = self._blob_path(sha256)
+        if not os.path.isfile(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            shutil.copyfile(path, f"{blob}.tmp")
+            os.replace(f"{blob}.tmp", blob)
+        return sha256
+
+    def record(self, app_id: str, key: str, decompiled_dir: str, before: dict, artifacts=()):
+        """
+        Store the files that changed since `before` (a snapshot_tree of the fresh
+        decompile), plus the `artifacts` files (kept by basename).
+        """
+        after = snapshot_tree(decompiled_dir)
+        files = {}
+        for rel_path, stat in sorted(after.items()):
+            if before.get(rel_path) == stat:
+                continue
+            files[rel_path.replace(os.sep, "/")] = self._store_blob(os.path.join(decompiled_dir, rel_path))
+        deleted = sorted(p.replace(os.sep, "/") for p in before if p not in after)
+        stored_artifacts = {
+            os.path.basename(path): self._store_blob(path) for path in artifacts if os.path.isfile(path)
+        }
+
+        entry = {"key": key, "files": files, "deleted": deleted, "artifacts": stored_artifacts}
+        tmp_path = f"{self._manifest_path(app_id)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp_path, self._manifest_path(app_id))
+        self._prune()
+        print(f"[+] [PatchCache] Recorded {len(files)} patched files for {app_id}.")
+
+    def _prune(self):
+        """Drop blobs no app entry references any more."""
+        referenced = set()
+        for name in os.listdir(self.root):
+            if name.endswith(".json"):
+                entry = self._load(name[:-len(".json")]) or {}
+                referenced.update(entry.get("files", {}).values())
+                referenced.update(entry.get("artifacts", {}).values())
+        for path in _walk_files(self.blobs_dir):
+            if os.path.basename(path) not in referenced:
+                os.remove(path)
+
+
+def get_patch_cache() -> PatchCache | None:
+    """Return the configured patch cache, or None when caching is disabled."""
+    root = os.getenv(CACHE_DIR_ENV, "").strip()
+    if not root or os.getenv(PATCH_CACHE_ENV, "1").strip() == "0":
+        return None
+    return PatchCache(os.path.join(root, "patches"))
@@ -0,0 +1,203 @@
+"""
+Declarative smali patch rules.
+
+A `PatchRule` says what to change instead of how to find it:
+
+    PatchRule(
+        name="spi-reporter",
+        anchor='"Please set reporter',                 # literal every target file contains
+        pattern=r"if-nez ([vp]\\d+), (:cond_\\w+)",    # regex applied inside the scope
+        replacement=r"goto \\2",                      # re.sub replacement (str or callable)
+        files="*/SecurePendingIntent*.smali",         # optional fnmatch on the path
+        method=r"public static \\w+\\(",              # optional: only inside matching methods
+        expect=(0, None),                             # match count: exact int or (min, max)
+    )
+
+`compile_rules` compiles every pattern once. `RulePlan.apply` looks up the
+candidate files of all rules through the shared SmaliIndex, reads and writes
+each file once no matter how many rules touch it, and returns a
+`RuleReport` with per-rule match counts.
+
+With `method` set, the rule only sees methods whose `.method` line matches it
+and whose text contains the anchor (found with core.smali, not a DOTALL
+scan); `pattern` then runs on each such method (from `.method` to
+`.end method`). Without `pattern`, the anchor itself is
+replaced literally.
+"""
+
+import fnmatch
+import os
+import re
+from typing import Callable, NamedTuple
+
+from core.smali import SmaliClass
+
+
+class PatchRule(NamedTuple):
+    name: str
+    anchor: str
+    replacement: str | Callable[[re.Match], str]
+    pattern: str | None = None
+    files: str | None = None
+    method: str | None = None
+    expect: int | tuple[int, int | None] = (1, None)
+    flags: int = 0
+    # Stop after this many replacements over the whole tree (0 = no limit).
+    limit: int = 0
+
+
+class RuleResult(NamedTuple):
+    name: str
+    count: int
+    files: list[str]
+    ok: bool
+
+
+class RuleReport(dict):
+    """{rule name: RuleResult} in rule order."""
+
+    def count(self, *names: str) -> int:
+        return sum(self[name].count for name in names)
+
+    def ok(self, *names: str) -> bool:
+        return all(self[name].ok for name in (names or self))
+
+
+class _Compiled(NamedTuple):
+    rule: PatchRule
+    pattern: re.Pattern | None
+    method: re.Pattern | None
+    low: int
+    high: int | None
+
+
+class RulePlan:
+    """A compiled, reusable set of rules. Build with compile_rules()."""
+
+    def __init__(self, rules):
+        self._rules: list[_Compiled] = []
+        names = set()
+        for rule in rules:
+            if rule.name in names:
+                raise ValueError(f"Duplicate patch rule name: {rule.name}")
+            names.add(rule.name)
+            if rule.pattern is None and not isinstance(rule.replacement, str):
+                raise ValueError(f"Rule {rule.name}: a literal (pattern-less) rule needs a str replacement")
+            low, high = (rule.expect, rule.expect) if isinstance(rule.expect, int) else rule.expect
+            self._rules.append(_Compiled(
+                rule,
+                re.compile(rule.pattern, rule.flags) if rule.pattern is not None else None,
+                re.compile(rule.method) if rule.method is not None else None,
+                low,
+                high,
+            ))
+
+    @property
+    def anchors(self) -> list[str]:
+        return list(dict.fromkeys(compiled.rule.anchor for compiled in self._rules))
+
+    def _apply_rule(self, compiled: _Compiled, content: str, budget: int) -> tuple[str, int]:
+        rule = compiled.rule
+
+        def substitute(text: str, remaining: int) -> tuple[str, int]:
+            if compiled.pattern is None:
+                count = text.count(rule.anchor)
+                if remaining:
+                    count = min(count, remaining)
+                return text.replace(rule.anchor, rule.replacement, count) if count else text, count
+            return compiled.pattern.subn(rule.replacement, text, count=remaining)
+
+        if compiled.method is None:
+            return substitute(content, budget)
+
+        total = 0
+        edits = []
+        smali_class = SmaliClass(content)
+        for method in smali_class.methods:
+            if budget and total >= budget:
+                break
+            if not compiled.method.search(method.header):
+                continue
+            block = method.text
+            if rule.anchor not in block:
+                continue
+            new_block, count = substitute(block, budget - total if budget else 0)
+            if count:
+                edits.append((method, new_block))
+                total += count
+        # Splice from the end so the earlier offsets stay valid.
+        for method, new_block in reversed(edits):
+            content = smali_class.replace_method(method, new_block)
+        return content, total
+
+    def apply(self, index, diffs=None, root_dir: str | None = None) -> RuleReport:
+        """
+        Run every rule over the tree behind `index` (a SmaliIndex), saving changed files.
+
+        Args:
+            index: Shared SmaliIndex; all anchors are looked up in one pass.
+            diffs: Optional DiffRecorder for the changed files.
+            root_dir: Base for `files` filters (defaults to index.root_dir).
+
+        Returns:
+            RuleReport with each rule's match count, changed files and whether
+            the count met `expect`.
+        """
+        root_dir = root_dir or index.root_dir
+        index.register(*self.anchors)
+
+        targets: dict[str, list[int]] = {}
+        for i, compiled in enumerate(self._rules):
+            for path in index.files_containing(compiled.rule.anchor):
+                rel_path = os.path.relpath(path, root_dir).replace(os.sep, "/")
+                if compiled.rule.files and not (
+                    fnmatch.fnmatch(rel_path, compiled.rule.files)
+                    or fnmatch.fnmatch(os.path.basename(path), compiled.rule.files)
+                ):
+                    continue
+                targets.setdefault(path, []).append(i)
+
+        counts = [0] * len(self._rules)
+        touched: list[list[str]] = [[] for _ in self._rules]
+        for path in sorted(targets):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    original = f.read()
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"[!] [PatchRules] Could not read {path}: {e}")
+                continue
+
+            content = original
+            for i in sorted(targets[path]):
+                limit = self._rules[i].rule.limit
+                if limit and counts[i] >= limit:
+                    continue
+                content, count = self._apply_rule(self._rules[i], content, limit - counts[i] if limit else 0)
+                if count:
+                    counts[i] += count
+                    touched[i].append(path)
+
+            if content != original:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content)
+                if diffs is not None:
+                    diffs.record(path, original, content)
+                index.update(path, content)
+
+        report = RuleReport()
+        for i, compiled in enumerate(self._rules):
+            ok = counts[i] >= compiled.low and (compiled.high is None or counts[i] <= compiled.high)
+            report[compiled.rule.name] = RuleResult(compiled.rule.name, counts[i], touched[i], ok)
+            marker = "[+]" if ok else "[-]"
+            if compiled.low == compiled.high:
+                expected = str(compiled.low)
+            else:
+                expected = f"{compiled.low}..{compiled.high if compiled.high is not None else ''}"
+            print(f"    {marker} [PatchRules] {compiled.rule.name}: {counts[i]} matches in "
+                  f"{len(touched[i])} files (expected {expected})")
+        return report
+
+
+def compile_rules(rules) -> RulePlan:
+    """Compile `rules` (PatchRule list) once, typically at module import."""
+    return RulePlan(rules)
@@ -0,0 +1,126 @@
+"""
+In-memory view of a decompiled tree shared by the post-patch stages.
+
+`run_patch` opens one `PatchSession` and hands it to the clone, hotfix and
+updater stages. Files are read lazily and kept in memory, parsed XML is
+reused while its text is unchanged, writes only mark the file dirty, and
+`flush()` writes every changed file once at the end (temp file + rename, so
+a crash never leaves a half-written file). `diff()` is the single place
+that describes everything the stages changed.
+
+Code that changes files behind the session's back (shutil.copytree, external
+tools) must call `invalidate(path)` before the session reads them again.
+"""
+
+import difflib
+import io
+import os
+import xml.etree.ElementTree as ET
+
+
+class PatchSession:
+    """Lazy read cache plus dirty tracking over files under `root_dir`."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._original: dict[str, str | None] = {}
+        self._content: dict[str, str | None] = {}
+        self._trees: dict[str, tuple[str, ET.ElementTree]] = {}
+
+    @staticmethod
+    def path(path: str) -> str:
+        """Cache key for `path` (callers pass paths under root_dir, as for open())."""
+        return os.path.normpath(path)
+
+    def _load(self, path: str) -> str | None:
+        if path not in self._content:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                text = None
+            self._original[path] = text
+            self._content[path] = text
+        return self._content[path]
+
+    def exists(self, path: str) -> bool:
+        path = self.path(path)
+        if path in self._content:
+            return self._content[path] is not None
+        return os.path.isfile(path)
+
+    def read(self, path: str) -> str:
+        """Return the current text of `path`; raises FileNotFoundError like open()."""
+        path = self.path(path)
+        text = self._load(path)
+        if text is None:
+            raise FileNotFoundError(path)
+        return text
+
+    def write(self, path: str, content: str):
+        """Replace the text of `path` in memory; it is saved by flush()."""
+        path = self.path(path)
+        self._load(path)
+        self._content[path] = content
+
+    def parse_xml(self, path: str) -> ET.ElementTree:
+        """Parse `path` once per distinct content; raises ET.ParseError like ET.parse."""
+        path = self.path(path)
+        text = self.read(path)
+        cached = self._trees.get(path)
+        if cached and cached[0] is text:
+            return cached[1]
+        tree = ET.ElementTree(ET.fromstring(text))
+        self._trees[path] = (text, tree)
+        return tree
+
+    def write_xml(self, path: str, tree: ET.ElementTree):
+        """Serialize `tree` like tree.write(path, encoding="utf-8", xml_declaration=True)."""
+        buffer = io.BytesIO()
+        tree.write(buffer, encoding="utf-8", xml_declaration=True)
+        text = buffer.getvalue().decode("utf-8")
+        self.write(path, text)
+        self._trees[self.path(path)] = (text, tree)
+
+    def invalidate(self, path: str):
+        """Forget the cached text of `path` (it changed on disk). Pending writes are kept."""
+        path = self.path(path)
+        if path in self._content and self._content[path] == self._original[path]:
+            del self._content[path]
+            del self._original[path]
+            self._trees.pop(path, None)
+
+    @property
+    def dirty(self) -> list[str]:
+        return sorted(p for p, text in self._content.items() if text != self._original[p])
+
+    def iter_diffs(self):
+        """Yield (path, unified diff) for every pending change, named relative to root_dir."""
+        for path in self.dirty:
+            name = os.path.relpath(path, self.root_dir)
+            yield path, "\n".join(difflib.unified_diff(
+                (self._original[path] or "").splitlines(),
+                self._content[path].splitlines(),
+                fromfile=f"a/{name}",
+                tofile=f"b/{name}",
+                lineterm="",
+            ))
+
+    def diff(self) -> str:
+        """Unified diff of every pending change, relative to root_dir."""
+        return "\n".join(text for _, text in self.iter_diffs())
+
+    def flush(self) -> list[str]:
+        """Atomically write every changed file once. Returns the written paths."""
+        written = []
+        for path in self.dirty:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self._content[path])
+            os.replace(tmp_path, path)
+            self._original[path] = self._content[path]
+            written.append(path)
+        if written:
+            print(f"[+] [PatchSession] Wrote {len(written)} changed files.")
+        return written
@@ -3,6 +3,7 @@ Generic patch runner — dynamically loads an app's patch.py module.
 """
 
 import importlib.util
+import inspect
 import os
 
 
@@ -10,11 +11,31 @@ from core.cloner import run_clone
 from core.universal_updater import inject_universal_updater
 from core.utils import load_app_config
 from core.hotfix import apply_hotfix_if_needed
-            
+from core.diff_recorder import DiffRecorder, index_path
+from core.instrumentation import stage
+from core.patch_cache import compute_key, get_patch_cache, snapshot_tree
+from core.patch_session import PatchSession
+from core.smali_index import PatchContext, SmaliIndex
+
+
+def _accepts_context(func) -> bool:
+    try:
+        params = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    positional = [p for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD, p.VAR_POSITIONAL)]
+    return len(positional) >= 2 or any(p.kind == p.VAR_POSITIONAL for p in positional)
+
+
 def run_patch(app_id: str, decompiled_dir: str) -> bool:
     """
     Import apps/{app_id}/patch.py and call its patch(decompiled_dir) function.
 
+    Modules whose patch() takes a second parameter get a PatchContext with a
+    shared SmaliIndex, pre-seeded with the module's optional SMALI_ANCHORS.
+    Every change the run makes is recorded in <app_id>.diff.gz next to
+    `decompiled_dir` (see core.diff_recorder).
+
     Args:
         app_id: The app identifier (subfolder name under apps/).
         decompiled_dir: Path to the apktool-decompiled directory.
@@ -44,9 +65,62 @@ def run_patch(app_id: str, decompiled_dir: str) -> bool:
         print(f"[-] [{app_id}] patch.py does not have a callable 'patch' function")
         return False
 
+    config = {}
+    try:
+        config = load_app_config(app_id)
+    except Exception:
+        # Keep patch runner resilient in unit tests and local ad-hoc runs.
+        config = {}
+
+    diff_path = diff_artifact_path(app_id, decompiled_dir)
+    cache = get_patch_cache()
+    before = key = None
+    if cache is not None:
+        before = snapshot_tree(decompiled_dir)
+        key = compute_key(app_id, decompiled_dir, before)
+        with stage("cache-replay") as record:
+            # Restores <app_id>.diff.gz too, so the diff artifact upload still has content.
+            record["ok"] = cache.replay(app_id, key, decompiled_dir, artifacts_dir=os.path.dirname(diff_path))
+        if record["ok"]:
+            print(f"[+] [{app_id}] Patch result replayed from cache.")
+            return True
+
+    session = PatchSession(decompiled_dir)
+    diffs = DiffRecorder(diff_path, root_dir=decompiled_dir)
+    try:
+        success = _run_stages(app_id, decompiled_dir, module, config, session, diffs)
+    finally:
+        # Every stage's changes reach the disk once, even when a later stage fails.
+        with stage("flush"):
+            for path, text in session.iter_diffs():
+                diffs.add(path, text)
+            session.flush()
+            diffs.close()
+
+    if success and cache is not None:
+        try:
+            with stage("cache-record"):
+                cache.record(app_id, key, decompiled_dir, before, artifacts=[diff_path, index_path(diff_path)])
+        except OSError as e:
+            print(f"[!] [{app_id}] Could not record patch result: {e}")
+    return success
+
+
+def diff_artifact_path(app_id: str, decompiled_dir: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(decompiled_dir)), f"{app_id}.diff.gz")
+
+
+def _run_stages(app_id: str, decompiled_dir: str, module, config: dict, session: PatchSession,
+                diffs: DiffRecorder | None = None) -> bool:
     print(f"[*] [{app_id}] Running patch on: {decompiled_dir}")
     try:
-        result = module.patch(decompiled_dir)
+        with stage("module"):
+            if _accepts_context(module.patch):
+                index = SmaliIndex(decompiled_dir, getattr(module, "SMALI_ANCHORS", ()))
+                ctx = PatchContext(app_id, decompiled_dir, config, index, session, diffs)
+                result = module.patch(decompiled_dir, ctx)
+            else:
+                result = module.patch(decompiled_dir)
     except Exception as e:
         print(f"[-] [{app_id}] Patch raised an exception: {e}")
         return False
@@ -55,31 +129,29 @@ def run_patch(app_id: str, decompiled_dir: str) -> bool:
         print(f"[-] [{app_id}] Patch returned failure.")
         return False
 
-    config = {}
-    try:
-        config = load_app_config(app_id)
-    except Exception:
-        # Keep patch runner resilient in unit tests and local ad-hoc runs.
-        config = {}
-
     clone_config = config.get("clone_config")
     if clone_config:
         print(f"[*] [{app_id}] Applying clone configuration...")
-        if not run_clone(decompiled_dir, clone_config):
+        with stage("clone"):
+            cloned = run_clone(decompiled_dir, clone_config, session=session)
+        if not cloned:
             print(f"[-] [{app_id}] Clone stage failed.")
             return False
 
-    apply_hotfix_if_needed(decompiled_dir, config)
+    with stage("hotfix"):
+        apply_hotfix_if_needed(decompiled_dir, config, session=session)
     
     inject_updater = bool(config.get("inject_updater", True))
     if inject_updater:
         target_smali = config.get("updater_target_smali")
         print(f"[*] [{app_id}] Applying updater injection...")
-        updater_success = inject_universal_updater(
-            decompiled_dir=decompiled_dir,
-            app_id=app_id,
-            target_activity_smali=target_smali,
-        )
+        with stage("updater"):
+            updater_success = inject_universal_updater(
+                decompiled_dir=decompiled_dir,
+                app_id=app_id,
+                target_activity_smali=target_smali,
+                session=session,
+            )
         if not updater_success:
             print(f"[-] [{app_id}] Updater injection failed.")
             return False
@@ -0,0 +1,159 @@
+"""
+Per-host token-bucket rate limiting shared by every source and process.
+
+A host with a configured limit gets a bucket of `burst` tokens refilled at
+`rate` tokens per second; each request takes one token and only blocks when
+the bucket is empty. Bucket state lives in small lock-protected files under
+the temp dir, so parallel workers (run.py --jobs) draw from the same budget.
+Without fcntl (Windows) the buckets are per process.
+
+Limits are set by the sources themselves (see APKMirrorSource) and can be
+overridden with APP_STORE_RATE_LIMITS="host=rate:burst,host2=rate".
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+RATE_LIMITS_ENV = "APP_STORE_RATE_LIMITS"
+STATE_DIR_ENV = "APP_STORE_RATE_LIMIT_DIR"
+
+
+class RateLimiter:
+    """Token buckets keyed by host."""
+
+    def __init__(self, state_dir: str | None = None):
+        self.state_dir = state_dir or os.getenv(STATE_DIR_ENV) or os.path.join(
+            tempfile.gettempdir(), "app-store-ratelimit"
+        )
+        self._limits: dict[str, tuple[float, float]] = {}
+        self._overrides: dict[str, tuple[float, float]] = {}
+        self._local: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, rate: float, burst: float = 1):
+        """Allow `rate` requests/second to `host` with bursts of `burst`. rate <= 0 removes the limit."""
+        if rate <= 0:
+            self._limits.pop(host, None)
+        else:
+            self._limits[host] = (rate, max(1.0, burst))
+
+    def override(self, host: str, rate: float, burst: float = 1):
+        """Like configure, but wins over limits set later by sources (used for user config)."""
+        self._overrides[host] = (rate, max(1.0, burst))
+
+    def limit_for(self, host: str) -> tuple[float, float] | None:
+        limit = self._overrides.get(host) or self._limits.get(host)
+        if limit and limit[0] > 0:
+            return limit
+        return None
+
+    @contextlib.contextmanager
+    def _bucket(self, host: str):
+        if fcntl is None:
+            yield self._local.setdefault(host, {})
+            return
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = os.path.join(self.state_dir, f"{host}.json")
+        with open(path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "{}")
+                except ValueError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _take(self, host: str, rate: float, burst: float) -> float:
+        """Take a token if one is available; otherwise return how long to wait for it."""
+        with self._lock, self._bucket(host) as state:
+            now = time.time()
+            tokens = state.get("tokens", burst)
+            elapsed = max(0.0, now - state.get("updated", now))
+            tokens = min(burst, tokens + elapsed * rate)
+            state["updated"] = now
+            if tokens >= 1:
+                state["tokens"] = tokens - 1
+                return 0.0
+            state["tokens"] = tokens
+            return (1 - tokens) / rate
+
+    def acquire(self, host: str | None) -> float:
+        """
+        Block until a request to `host` is allowed.
+
+        Returns:
+            Seconds spent waiting (0.0 when the budget was not exhausted).
+        """
+        limit = self.limit_for(host) if host else None
+        if not limit:
+            return 0.0
+        waited = 0.0
+        while True:
+            wait = self._take(host, *limit)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, host: str | None) -> float:
+        """Like acquire, but waits on the event loop instead of blocking the thread."""
+        limit = self.limit_for(host) if host else None
+        if not limit:
+            return 0.0
+        waited = 0.0
+        while True:
+            wait = self._take(host, *limit)
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+def _parse_overrides(spec: str) -> dict[str, tuple[float, float]]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        host, _, value = item.partition("=")
+        rate, _, burst = value.partition(":")
+        try:
+            limits[host.strip()] = (float(rate), float(burst or 1))
+        except ValueError:
+            print(f"[!] [RateLimit] Ignoring invalid {RATE_LIMITS_ENV} entry: {item}")
+    return limits
+
+
+limiter = RateLimiter()
+for _host, (_rate, _burst) in _parse_overrides(os.getenv(RATE_LIMITS_ENV, "")).items():
+    limiter.override(_host, _rate, _burst)
+
+
+def set_rate_limit(host: str, rate: float, burst: float = 1):
+    """Configure the shared limiter for `host` (see RateLimiter.configure)."""
+    limiter.configure(host, rate, burst)
+
+
+def acquire(host: str | None) -> float:
+    """Wait for the shared limiter to allow a request to `host`."""
+    return limiter.acquire(host)
+
+
+async def acquire_async(host: str | None) -> float:
+    """Wait on the event loop for the shared limiter to allow a request to `host`."""
+    return await limiter.acquire_async(host)
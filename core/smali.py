@@ -0,0 +1,180 @@
+"""
+Structural view of a smali file: class header, fields and methods.
+
+`SmaliClass` finds every directive line (`.class`, `.super`, `.field`,
+`.method`, `.end method`, ...) in one linear scan, with no DOTALL regex to
+backtrack over multi-megabyte classes, and records where each field and
+method block starts and ends. A method's text, body and register directive
+are sliced out only when accessed, so a method is found by signature with a
+dict lookup once the file has been scanned.
+
+Offsets are character offsets into `SmaliClass.text`.
+
+    cls = SmaliClass.load(path)
+    method = cls.method("onCreate(Landroid/os/Bundle;)V")
+    if method:
+        new_text = cls.replace_method(method, patched)
+"""
+
+import re
+
+
+_DIRECTIVE_RE = re.compile(r"^[ \t]*\.(class|super|implements|source|field|method|end method)\b[^\n]*", re.MULTILINE)
+
+
+class SmaliMethod:
+    """One `.method ... .end method` block of a SmaliClass."""
+
+    __slots__ = ("_source", "start", "end", "header", "header_end", "body_end",
+                 "name", "descriptor", "signature", "modifiers")
+
+    def __init__(self, source: str, start: int, header_end: int, body_end: int, end: int):
+        self._source = source
+        self.start = start
+        self.header_end = header_end
+        self.body_end = body_end
+        self.end = end
+        self.header = source[start:header_end].strip()
+        parts = self.header.split()
+        self.signature = parts[-1] if len(parts) > 1 else ""
+        self.modifiers = tuple(parts[1:-1])
+        paren = self.signature.find("(")
+        self.name = self.signature[:paren] if paren != -1 else self.signature
+        self.descriptor = self.signature[paren:] if paren != -1 else ""
+
+    @property
+    def text(self) -> str:
+        """The whole block, from `.method` through `.end method`."""
+        return self._source[self.start:self.end]
+
+    @property
+    def body(self) -> str:
+        """Everything between the `.method` line and the `.end method` line."""
+        return self._source[self.header_end:self.body_end]
+
+    def registers(self) -> tuple[str, int] | None:
+        """The (directive, count) of the `.locals`/`.registers` line, if any."""
+        for line in self.body.splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[0] in (".locals", ".registers") and parts[1].isdigit():
+                return parts[0], int(parts[1])
+        return None
+
+    def rfind(self, needle: str) -> int:
+        """Absolute offset of the last `needle` in the body, or -1."""
+        return self._source.rfind(needle, self.header_end, self.body_end)
+
+    def __repr__(self):
+        return f"SmaliMethod({self.header!r})"
+
+
+class SmaliClass:
+    """Lazily scanned structure of one smali file's text."""
+
+    def __init__(self, text: str, path: str | None = None):
+        self.path = path
+        self.text = text
+        self._scanned = False
+        self._directives: dict[str, str] = {}
+        self._interfaces: list[str] = []
+        self._fields: list[tuple[int, int]] = []
+        self._methods: list[SmaliMethod] = []
+        self._by_signature: dict[str, SmaliMethod] = {}
+        self._header_end = len(text)
+
+    @classmethod
+    def load(cls, path: str) -> "SmaliClass":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read(), path)
+
+    def _scan(self):
+        if self._scanned:
+            return
+        text = self.text
+        method_start = header_end = None
+        for match in _DIRECTIVE_RE.finditer(text):
+            kind = match.group(1)
+            line_end = match.end() + 1 if match.end() < len(text) else match.end()
+            if kind == "end method":
+                if method_start is not None:
+                    method = SmaliMethod(text, method_start, header_end, match.start(), match.end())
+                    self._methods.append(method)
+                    self._by_signature.setdefault(method.signature, method)
+                method_start = None
+                continue
+            if method_start is not None:
+                # Directives inside a method body (none of these kinds are legal there).
+                continue
+            if kind in ("field", "method") and self._header_end == len(text):
+                self._header_end = match.start()
+            if kind == "method":
+                method_start, header_end = match.start(), line_end
+            elif kind == "field":
+                self._fields.append((match.start(), match.end()))
+            elif kind == "implements":
+                self._interfaces.append(match.group(0).split()[-1])
+            else:
+                self._directives.setdefault(kind, match.group(0).split()[-1])
+        self._scanned = True
+
+    def _reset(self):
+        self._scanned = False
+        self._directives, self._interfaces, self._fields = {}, [], []
+        self._methods, self._by_signature = [], {}
+        self._header_end = len(self.text)
+
+    @property
+    def descriptor(self) -> str | None:
+        self._scan()
+        return self._directives.get("class")
+
+    @property
+    def super_class(self) -> str | None:
+        self._scan()
+        return self._directives.get("super")
+
+    @property
+    def interfaces(self) -> list[str]:
+        self._scan()
+        return list(self._interfaces)
+
+    @property
+    def header(self) -> str:
+        """Text before the first field or method."""
+        self._scan()
+        return self.text[:self._header_end]
+
+    @property
+    def fields(self) -> list[str]:
+        self._scan()
+        return [self.text[start:end].strip() for start, end in self._fields]
+
+    @property
+    def methods(self) -> list[SmaliMethod]:
+        self._scan()
+        return list(self._methods)
+
+    def method(self, signature: str) -> SmaliMethod | None:
+        """The method with `signature` (e.g. "onResume()V"), or None."""
+        self._scan()
+        return self._by_signature.get(signature)
+
+    def methods_named(self, name: str) -> list[SmaliMethod]:
+        self._scan()
+        return [method for method in self._methods if method.name == name]
+
+    def replace_method(self, method: SmaliMethod, new_text: str) -> str:
+        """Replace `method`'s whole block with `new_text`; returns the new file text."""
+        return self.splice(method.start, method.end, new_text)
+
+    def insert(self, offset: int, text: str) -> str:
+        return self.splice(offset, offset, text)
+
+    def append_method(self, method_text: str) -> str:
+        return self.splice(len(self.text), len(self.text), "\n" + method_text)
+
+    def splice(self, start: int, end: int, text: str) -> str:
+        """Replace text[start:end]; earlier SmaliMethod objects become stale."""
+        self.text = self.text[:start] + text + self.text[end:]
+        self._reset()
+        return self.text
@@ -0,0 +1,195 @@
+"""
+Single-pass index over an apktool-decompiled tree, shared by the patch modules.
+
+Patches used to locate their targets with one full `os.walk` + read of every
+.smali file per lookup. `SmaliIndex` walks the tree once (enough for lookups by
+file name) and reads it once on the first content query, keeping:
+
+    - file names        -> paths      (`find_file("Conversation.smali")`)
+    - class descriptors -> path       (`find_class("Lcom/whatsapp/Main;")`)
+    - method signatures -> paths      (`files_with_method("onCreate(Landroid/os/Bundle;)V")`)
+    - registered anchors -> paths     (`files_containing(anchor)`)
+
+Anchors are the substrings a patch searches for; registering them up front
+(`SMALI_ANCHORS` in patch.py, see core.patcher) lets the initial pass answer
+them through one core.anchor_search automaton. Unregistered text falls back to
+one scan whose result is memoized. Files are matched as bytes, never decoded.
+Patches that rewrite a file call `update(path, content)` to keep it current.
+"""
+
+import os
+import re
+from typing import NamedTuple
+
+from core.anchor_search import AnchorMatcher, open_bytes
+from core.diff_recorder import DiffRecorder
+from core.patch_session import PatchSession
+from core.smali import SmaliClass
+
+
+_CLASS_RE = re.compile(rb"^\.class[^\n]*?(L[^\s;]+;)", re.MULTILINE)
+_METHOD_RE = re.compile(rb"^\.method [^\n]*?([\w$<>-]+\([^)\n]*\)\S+)", re.MULTILINE)
+
+
+class SmaliIndex:
+    """Lazily built lookup tables over every .smali file under `root_dir`."""
+
+    def __init__(self, root_dir: str, anchors=()):
+        self.root_dir = root_dir
+        self._anchors = list(dict.fromkeys(anchors))
+        self._walked = False
+        self._built = False
+        self._files: list[str] = []
+        self._by_name: dict[str, list[str]] = {}
+        self._classes: dict[str, str] = {}
+        self._file_classes: dict[str, str] = {}
+        self._methods: dict[str, set[str]] = {}
+        self._file_methods: dict[str, tuple[str, ...]] = {}
+        self._containing: dict[str, set[str]] = {}
+        self._matcher: AnchorMatcher | None = None
+
+    def register(self, *anchors: str):
+        """Add anchors to answer from the initial pass; once built, scan the new ones in one pass."""
+        new = [anchor for anchor in dict.fromkeys(anchors) if anchor not in self._anchors]
+        self._anchors.extend(new)
+        new = [anchor for anchor in new if anchor not in self._containing]
+        if self._built and new:
+            hits = AnchorMatcher(new).scan(self._files)
+            for anchor in new:
+                self._containing[anchor] = set(hits.get(anchor, ()))
+            self._matcher = None
+
+    def _walk(self):
+        if self._walked:
+            return
+        for root, _, files in os.walk(self.root_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                self._by_name.setdefault(name, []).append(path)
+                if name.endswith(".smali"):
+                    self._files.append(path)
+        self._files.sort()
+        for paths in self._by_name.values():
+            paths.sort()
+        self._walked = True
+
+    def build(self):
+        """Read every .smali file once. Called implicitly by the first content query."""
+        if self._built:
+            return
+        self._walk()
+        print(f"[*] [SmaliIndex] Indexing {len(self._files)} smali files under {self.root_dir}...")
+        for anchor in self._anchors:
+            self._containing[anchor] = set()
+        for path in self._files:
+            try:
+                with open_bytes(path) as data:
+                    self._index_content(path, data)
+            except OSError:
+                self._index_content(path, b"")
+        self._built = True
+        print(f"[+] [SmaliIndex] Indexed {len(self._classes)} classes, {len(self._methods)} method signatures.")
+
+    def _index_content(self, path: str, data):
+        match = _CLASS_RE.search(data)
+        if match:
+            descriptor = match.group(1).decode("utf-8", "replace")
+            self._classes[descriptor] = path
+            self._file_classes[path] = descriptor
+        methods = tuple(m.decode("utf-8", "replace") for m in _METHOD_RE.findall(data))
+        self._file_methods[path] = methods
+        for method in methods:
+            self._methods.setdefault(method, set()).add(path)
+        if self._matcher is None:
+            self._matcher = AnchorMatcher(self._containing)
+        for anchor in self._matcher.search(data):
+            self._containing[anchor].add(path)
+
+    def _forget(self, path: str):
+        descriptor = self._file_classes.pop(path, None)
+        if descriptor and self._classes.get(descriptor) == path:
+            del self._classes[descriptor]
+        for method in self._file_methods.pop(path, ()):
+            self._methods.get(method, set()).discard(path)
+        for paths in self._containing.values():
+            paths.discard(path)
+
+    def update(self, path: str, content: str | None = None):
+        """Re-index `path` after it was rewritten (reads it from disk if `content` is None)."""
+        if not self._walked or not path.endswith(".smali"):
+            return
+        name = os.path.basename(path)
+        if path not in self._by_name.get(name, ()):
+            # A file the patch created after the tree was walked.
+            self._files.append(path)
+            self._files.sort()
+            self._by_name.setdefault(name, []).append(path)
+            self._by_name[name].sort()
+        if not self._built:
+            return
+        self._forget(path)
+        if content is None:
+            try:
+                with open_bytes(path) as data:
+                    self._index_content(path, data)
+            except OSError:
+                self._index_content(path, b"")
+        else:
+            self._index_content(path, content.encode("utf-8"))
+
+    @property
+    def files(self) -> list[str]:
+        """Every .smali path in the tree."""
+        self._walk()
+        return self._files
+
+    def find_file(self, filename: str) -> str | None:
+        """First path whose basename is `filename` (any file type)."""
+        self._walk()
+        paths = self._by_name.get(filename)
+        return paths[0] if paths else None
+
+    def files_named(self, filename: str) -> list[str]:
+        self._walk()
+        return list(self._by_name.get(filename, ()))
+
+    def find_class(self, descriptor: str) -> str | None:
+        """Path of the class `Lpkg/Name;`."""
+        self.build()
+        return self._classes.get(descriptor)
+
+    def load_class(self, descriptor: str) -> SmaliClass | None:
+        """Read and wrap the file defining `descriptor` (parsed lazily on first access)."""
+        path = self.find_class(descriptor)
+        return SmaliClass.load(path) if path else None
+
+    def files_with_method(self, signature: str) -> list[str]:
+        """Paths declaring `name(args)ret`."""
+        self.build()
+        return sorted(self._methods.get(signature, ()))
+
+    def files_containing(self, text: str) -> list[str]:
+        """Sorted .smali paths whose content contains `text`."""
+        self.build()
+        if text not in self._containing:
+            hits = AnchorMatcher([text]).scan(self._files)
+            self._containing[text] = set(hits.get(text, ()))
+            # Keep the new text current on later updates.
+            self._matcher = None
+        return sorted(self._containing[text])
+
+    def find_file_containing(self, text: str) -> str | None:
+        paths = self.files_containing(text)
+        return paths[0] if paths else None
+
+
+class PatchContext(NamedTuple):
+    """Second argument to `patch(decompiled_dir, ctx)` for modules that accept it."""
+    app_id: str
+    decompiled_dir: str
+    config: dict
+    index: SmaliIndex
+    # Writes through the session are flushed once after every stage ran.
+    session: PatchSession | None = None
+    # Streams per-file diffs to <app_id>.diff.gz next to the decompile.
+    diffs: DiffRecorder | None = None
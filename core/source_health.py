@@ -0,0 +1,181 @@
+"""
+Persistent health record for download sources.
+
+Every version check and download records its outcome for the source that
+served it: whether it succeeded, how long the check took and, on failure,
+a short failure class ("HTTP 403", "Timeout", "NoResults", ...). The record
+keeps the last WINDOW outcomes (dropping anything older than MAX_AGE_DAYS)
+and the last LATENCY_SAMPLES check latencies per source:
+
+    {"apkmirror": {"results": [[ts, 1], [ts, 0], ...],
+                   "latencies": [0.84, 1.2, ...],
+                   "successes": 41, "failures": 3,
+                   "last_success": "...",
+                   "last_failure": {"class": "HTTP 403", "message": "...", "at": "..."}}}
+
+`order(names)` ranks the sources an app accepts (app.json `sources`): sources
+scoring at least HEALTHY_SCORE keep their configured order, the others move
+to the back, best score first. The score is the success rate over the window
+with PRIOR_SUCCESSES optimistic samples, so a source nobody has used yet
+counts as healthy and one bad run does not demote a good source.
+
+Lives in `$APP_STORE_CACHE_DIR/source_health.json` (or the file named by
+APP_STORE_SOURCE_HEALTH); disabled without either, in which case sources are
+tried in configured order.
+"""
+
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+
+import requests
+
+from core.artifact_cache import CACHE_DIR_ENV
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+SOURCE_HEALTH_ENV = "APP_STORE_SOURCE_HEALTH"
+
+WINDOW = 20
+LATENCY_SAMPLES = 50
+MAX_AGE_DAYS = 14
+PRIOR_SUCCESSES = 2
+HEALTHY_SCORE = 0.5
+
+_thread_lock = threading.Lock()
+
+
+def failure_class(error: BaseException | str | None) -> str | None:
+    """A short, stable name for why a source call failed."""
+    if error is None or isinstance(error, str):
+        return error
+    # DownloadError wraps the original exception; classify the root cause.
+    seen = set()
+    while id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return f"HTTP {error.response.status_code}"
+        if isinstance(error, requests.Timeout):
+            return "Timeout"
+        if isinstance(error, requests.ConnectionError):
+            return "ConnectionError"
+        cause = error.__cause__ or error.__context__
+        if cause is None:
+            break
+        error = cause
+    return type(error).__name__
+
+
+def _percentile(values: list[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+class SourceHealth:
+    """Per-source success/latency record shared by every run using the same file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # --jobs workers are processes, check-only runs use threads.
+        with _thread_lock, open(self.lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def record(self, source: str, ok: bool, latency: float | None = None,
+               error: BaseException | str | None = None):
+        """Add one outcome for `source`. `latency` (seconds) is kept for checks only."""
+        now = time.time()
+        stamp = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).isoformat()
+        with self._locked():
+            data = self._read()
+            entry = data.setdefault(source, {})
+            results = [r for r in entry.get("results", []) if now - r[0] < MAX_AGE_DAYS * 86400]
+            results.append([round(now), 1 if ok else 0])
+            entry["results"] = results[-WINDOW:]
+            if latency is not None:
+                entry["latencies"] = (entry.get("latencies", []) + [round(latency, 3)])[-LATENCY_SAMPLES:]
+            if ok:
+                entry["successes"] = entry.get("successes", 0) + 1
+                entry["last_success"] = stamp
+            else:
+                entry["failures"] = entry.get("failures", 0) + 1
+                entry["last_failure"] = {
+                    "class": failure_class(error) or "Unknown",
+                    "message": str(error or "")[:300],
+                    "at": stamp,
+                }
+            self._write(data)
+
+    @staticmethod
+    def _summarize(entry: dict) -> dict:
+        results = [r[1] for r in entry.get("results", [])]
+        latencies = entry.get("latencies", [])
+        return {
+            "samples": len(results),
+            "success_rate": round(sum(results) / len(results), 3) if results else None,
+            "score": round((sum(results) + PRIOR_SUCCESSES) / (len(results) + PRIOR_SUCCESSES), 3),
+            "p50_s": _percentile(latencies, 0.5),
+            "p95_s": _percentile(latencies, 0.95),
+            "last_failure": (entry.get("last_failure") or {}).get("class"),
+        }
+
+    def stats(self, source: str | None = None) -> dict:
+        """Summary for one source, or {source: summary} for every recorded source."""
+        data = self._read()
+        if source is not None:
+            return self._summarize(data.get(source, {}))
+        return {name: self._summarize(entry) for name, entry in data.items()}
+
+    def order(self, names: list[str]) -> list[str]:
+        """`names` with unhealthy sources moved behind the healthy ones."""
+        data = self._read()
+        scores = {name: self._summarize(data.get(name, {}))["score"] for name in names}
+        healthy = [name for name in names if scores[name] >= HEALTHY_SCORE]
+        unhealthy = sorted((name for name in names if scores[name] < HEALTHY_SCORE),
+                           key=lambda name: -scores[name])
+        return healthy + unhealthy
+
+
+def get_source_health() -> SourceHealth | None:
+    """Return the configured health record, or None when it is disabled."""
+    path = os.getenv(SOURCE_HEALTH_ENV, "").strip()
+    if not path:
+        root = os.getenv(CACHE_DIR_ENV, "").strip()
+        if not root:
+            return None
+        path = os.path.join(root, "source_health.json")
+    return SourceHealth(path)
@@ -4,6 +4,6 @@ from .apkpure import APKPureSource
 from .apkpure_mobile import APKPureMobileSource
 from .github import GitHubSource
 from .apkcombo import APKComboSource
-from .registry import create_source, SOURCE_DEFINITIONS
+from .registry import as_async, create_source, source_candidates, AsyncSource, SOURCE_DEFINITIONS
 from .google_play import GooglePlaySource
 from .apkeep import ApkeepSource
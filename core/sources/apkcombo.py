@@ -1,13 +1,15 @@
 import re
 import base64
 from urllib.parse import unquote
-import cloudscraper
-from bs4 import BeautifulSoup
+
+from core.http_cache import cached_get
+from core.parsing import first_attr, make_soup
+from core.transport import get_session
 
 class APKComboSource:
     def __init__(self, timeout: int = 30):
         self.timeout = timeout
-        self.scraper = cloudscraper.create_scraper()
+        self.scraper = get_session("apkcombo", scraper=True)
         self.scraper.headers.update({
             'User-Agent': 'Mozilla/5.0 (Linux; Android 13) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Mobile Safari/537.36'
         })
@@ -23,13 +25,12 @@ class APKComboSource:
         url = f"https://apkcombo.com/app/{package_name}/download/apk"
         
         try:
-            response = self.scraper.get(url, timeout=self.timeout)
+            response = cached_get(self.scraper, url, "apkcombo.page", timeout=self.timeout)
             response.raise_for_status()
             html = response.text
-            soup = BeautifulSoup(html, 'html.parser')
 
             # Phase 1: Check if we need to do the XID POST
-            if not soup.select_one('a.variant'):
+            if first_attr(html, 'a', 'class', {'class': 'variant'}) is None:
                 print("[*] [APKCombo] Direct links not found, looking for XID...")
                 xid_match = re.search(r'var xid = "([^"]+)"', html)
                 if xid_match:
@@ -55,7 +56,7 @@ class APKComboSource:
             return None, None, None
 
     def _parse_html(self, html: str, package_name: str):
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = make_soup(html)
         
         title_el = soup.find('h1')
         title = title_el.get_text(strip=True) if title_el else ""
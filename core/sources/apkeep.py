@@ -3,10 +3,15 @@ import sys
 import re
 import platform
 import subprocess
-import urllib.request
 import zipfile
 from pathlib import Path
 
+from core.tracing import run_subprocess
+from core.transport import download_to_file, get_session
+
+# Reported by check-only runs when Play hides the version (see get_latest_version).
+UNKNOWN_VERSION = "unknown"
+
 AURORA_PIXEL_TEMPLATE = """[default]
 UserReadableName=Google Pixel 7a
 Build.BOOTLOADER=lynx-1.0-9716681
@@ -81,7 +86,7 @@ class ApkeepScraper:
         
         elif url.startswith("apkeep_dl:"):
             package_name = url.split("apkeep_dl:")[1]
-            out_dir = os.path.join(os.getcwd(), "scratch", "apkeep_tmp")
+            out_dir = os.path.join(os.getcwd(), "scratch", "apkeep_tmp", package_name)
             xapk_path = self.source._download_universal_xapk(package_name, out_dir)
             return LocalFileResponse(xapk_path, url)
         else:
@@ -99,6 +104,8 @@ class ApkeepSource:
 
         self.bin_path = self._ensure_binary_exists()
         self.scraper = ApkeepScraper(self)
+        # Set by check_for_update: never download a build just to read its version.
+        self.check_only = False
 
     def _ensure_binary_exists(self) -> str:
         bin_dir = os.path.join(os.getcwd(), "core", "bin")
@@ -113,7 +120,7 @@ class ApkeepSource:
         print(f"[*] [apkeep] Downloading apkeep tool for {platform.system()}...")
         url = "https://github.com/EFForg/apkeep/releases/latest/download/apkeep-x86_64-pc-windows-msvc.exe" if is_win else "https://github.com/EFForg/apkeep/releases/latest/download/apkeep-x86_64-unknown-linux-gnu"
         try:
-            urllib.request.urlretrieve(url, bin_path)
+            download_to_file(url, bin_path, get_session("github"))
             if not is_win:
                 os.chmod(bin_path, 0o755)
         except Exception as e:
@@ -136,7 +143,7 @@ class ApkeepSource:
             f.write(AURORA_PIXEL_TEMPLATE.replace("Platforms=arm64-v8a", "Platforms=armeabi-v7a,armeabi"))
 
         print(f"[*] [apkeep] Downloading 64-bit splits (he/en) for {package_name}...")
-        subprocess.run([
+        run_subprocess([
             self.bin_path, "-a", package_name, "-d", "google-play",
             "-e", self.google_email, "-t", self.aas_token,
             "-o", f"locale=he_IL,split_apk=true,device=default,device_properties_file={prop_64}",
@@ -144,7 +151,7 @@ class ApkeepSource:
         ], check=True, stdout=subprocess.DEVNULL)
 
         print(f"[*] [apkeep] Downloading 32-bit splits (he/en) for {package_name}...")
-        subprocess.run([
+        run_subprocess([
             self.bin_path, "-a", package_name, "-d", "google-play",
             "-e", self.google_email, "-t", self.aas_token,
             "-o", f"locale=he_IL,split_apk=true,device=default,device_properties_file={prop_32}",
@@ -174,9 +181,9 @@ class ApkeepSource:
         url = f"https://play.google.com/store/apps/details?id={package_name}&hl=en"
         headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
         try:
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=10) as resp:
-                html = resp.read().decode('utf-8', errors='ignore')
+            resp = get_session("google_play").get(url, headers=headers, timeout=10)
+            resp.raise_for_status()
+            html = resp.content.decode('utf-8', errors='ignore')
             
             version_match = re.search(r'\[\[\["(\d+(?:\.\d+)+)"\]\]', html)
             if not version_match:
@@ -188,8 +195,13 @@ class ApkeepSource:
         except Exception as e:
             print(f"[-] [apkeep] Web scrape failed: {e}")
 
+        if self.check_only:
+            print(f"[!] [apkeep] Version hidden. Not downloading the Universal build in check-only mode.")
+            return UNKNOWN_VERSION, f"dl:{package_name}", package_name
+
         print(f"[!] [apkeep] Version hidden. Extracting from Universal build...")
-        out_dir = os.path.join(os.getcwd(), "scratch", "apkeep_tmp")
+        # Per-package scratch dir so parallel runs never mix each other's splits.
+        out_dir = os.path.join(os.getcwd(), "scratch", "apkeep_tmp", package_name)
         try:
             xapk_path = self._download_universal_xapk(package_name, out_dir)
         except Exception as e:
@@ -200,7 +212,7 @@ class ApkeepSource:
         apktool_cmd = ["apktool", "d", "-s", "-f", "-o", decode_dir, xapk_path]
         version = "latest"
         try:
-            subprocess.run(apktool_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            run_subprocess(apktool_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             yml_path = os.path.join(decode_dir, "apktool.yml")
             if os.path.exists(yml_path):
                 with open(yml_path, "r", encoding="utf-8") as f:
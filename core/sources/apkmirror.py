@@ -1,8 +1,14 @@
-import time
 import re
-from urllib.parse import quote_plus
-from bs4 import BeautifulSoup
-import cloudscraper
+from urllib.parse import quote_plus, urlparse
+from bs4 import SoupStrainer
+
+from core.http_cache import cached_get
+from core.parsing import first_attr, make_soup
+from core.ratelimit import set_rate_limit
+from core.transport import get_session
+
+# Requests APKMirror may receive back-to-back before the limiter starts spacing them.
+APKMIRROR_BURST = 4
 
 class APKMirrorSource:
     def __init__(self, timeout: int = 5, results: int = 5):
@@ -12,7 +18,10 @@ class APKMirrorSource:
         self.headers = {"User-Agent": self.user_agent}
         self.base_url = "https://www.apkmirror.com"
         self.base_search = f"{self.base_url}/?post_type=app_release&searchtype=apk&s="
-        self.scraper = cloudscraper.create_scraper()
+        self.scraper = get_session("apkmirror", scraper=True)
+        # On average one request per `timeout` seconds, shared by all workers; 0 disables the limit.
+        set_rate_limit(urlparse(self.base_url).hostname, rate=1 / timeout if timeout else 0,
+                       burst=APKMIRROR_BURST)
 
     def _extract_version_from_title(self, title: str) -> str:
         match = re.search(r"(\d+(?:\.\d+)+)", title)
@@ -26,14 +35,13 @@ class APKMirrorSource:
             (version, download_link, title)
         """
         print(f"[*] [APKMirror] Searching for: {package_name}")
-        time.sleep(self.timeout)
         search_url = self.base_search + quote_plus(package_name)
-        resp = self.scraper.get(search_url, headers=self.headers)
+        resp = cached_get(self.scraper, search_url, "apkmirror.search", headers=self.headers)
         
         if resp.status_code != 200:
             return None, None, None
 
-        soup = BeautifulSoup(resp.text, "html.parser")
+        soup = make_soup(resp.text, parse_only=SoupStrainer("div", class_="appRow"))
         app_rows = soup.find_all("div", {"class": "appRow"})
         
         if not app_rows:
@@ -48,12 +56,10 @@ class APKMirrorSource:
 
     def get_download_url(self, app_release_url: str):
         """Resolve the final direct download link."""
-        time.sleep(self.timeout)
         print("[*] [APKMirror] Getting variant details...")
-        resp = self.scraper.get(app_release_url, headers=self.headers)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        
+        resp = cached_get(self.scraper, app_release_url, "apkmirror.release", headers=self.headers)
         # This part is sensitive to APKMirror HTML structure
+        soup = make_soup(resp.text, parse_only=SoupStrainer("div", class_=["table-row", "headerFont"]))
         rows = soup.find_all("div", {"class": ["table-row", "headerFont"]})
         if len(rows) < 2:
             return None
@@ -62,19 +68,19 @@ class APKMirrorSource:
         data = rows[1]
         download_link = self.base_url + data.find_all("a", {"class": "accent_color"})[0]["href"]
 
-        time.sleep(self.timeout)
         print("[*] [APKMirror] Getting download page...")
         resp = self.scraper.get(download_link, headers=self.headers)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        button_page = self.base_url + str(soup.find_all("a", {"class": "downloadButton"})[0]["href"])
+        button_href = first_attr(resp.text, "a", "href", {"class": "downloadButton"})
+        if not button_href:
+            return None
+        button_page = self.base_url + button_href
 
-        time.sleep(self.timeout)
         print("[*] [APKMirror] Extracting direct link...")
         resp = self.scraper.get(button_page, headers=self.headers)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        
-        direct_link_element = soup.find(
+        direct_href = first_attr(
+            resp.text,
             "a",
+            "href",
             {
                 "rel": "nofollow",
                 "data-google-interstitial": "false",
@@ -82,7 +88,7 @@ class APKMirrorSource:
             }
         )
         
-        if not direct_link_element:
+        if not direct_href:
             return None
 
-        return self.base_url + str(direct_link_element["href"])
+        return self.base_url + direct_href
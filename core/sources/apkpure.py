@@ -1,7 +1,7 @@
 import re
 from urllib.parse import quote
 
-import cloudscraper
+from core.transport import get_session
 
 
 class APKPureSource:
@@ -12,7 +12,9 @@ class APKPureSource:
         self.base_direct_api = "https://d.apkpure.com/b"
         
         # Use cloudscraper to bypass Cloudflare/WAF 403 errors
-        self.scraper = cloudscraper.create_scraper(
+        self.scraper = get_session(
+            "apkpure",
+            scraper=True,
             browser={
                 'browser': 'chrome',
                 'platform': 'windows',
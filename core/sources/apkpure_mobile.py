@@ -1,5 +1,7 @@
+import asyncio
 import re
-import requests
+
+from core.transport import async_get, get_session
 
 class APKPureMobileSource:
     def __init__(self, timeout: int = 30):
@@ -14,7 +16,7 @@ class APKPureMobileSource:
             'User-Agent': 'Mozilla/5.0 (Linux; Android 10) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/80.0.3987.162 Mobile Safari/537.36'
         }
         # שימוש ב-Session כדי לעקוב אחר ההפניות (Redirects) לשרתי ה-CDN בצורה חלקה
-        self.scraper = requests.Session()
+        self.scraper = get_session("apkpure_mobile")
 
     def _extract_version(self, text: str) -> str | None:
         if not text:
@@ -39,77 +41,14 @@ class APKPureMobileSource:
             )
             response.raise_for_status()
 
-            # חילוץ מחרוזות ארוכות מהתשובה הבינארית כדי למצוא כתובות URL
-            strings = re.findall(rb'[ -~]{8,}', response.content)
-            
-            valid_urls = []
-            for s in strings:
-                if s.startswith(b'http'):
-                    s_upper = s.upper()
-                    # חיפוש עם לוכסן כדי לוודא שזה נתיב קובץ ולא סתם כתובת API
-                    if b'/APK' in s_upper or b'/XAPK' in s_upper:
-                        valid_urls.append(s.decode('utf-8'))
-            
-            if not valid_urls:
-                print("[-] [APKPure Mobile] No APK/XAPK URL found in API response.")
+            release_url = self._pick_release_url(response.content)
+            if not release_url:
                 return None, None, None
-                
-            # ברירת המחדל - הקישור הראשון (הכי חדש שיש)
-            best_url = valid_urls[0]
-            latest_version = self._extract_version(best_url)
-            
-            # אם הראשון הוא XAPK, נחפש אם קיים APK זהה לאותה גרסה
-            if '/XAPK' in best_url.upper() and latest_version:
-                for url in valid_urls[1:]:
-                    url_version = self._extract_version(url)
-                    
-                    if not url_version:
-                        continue
-                        
-                    # אם הגענו לגרסה ישנה יותר, סימן שאין APK לגרסה החדשה - עוצרים!
-                    if url_version != latest_version:
-                        break
-                        
-                    # אם מצאנו APK מאותה גרסה בדיוק, ניקח אותו!
-                    if url_version == latest_version and '/APK' in url.upper() and '/XAPK' not in url.upper():
-                        best_url = url
-                        break
-            
-            release_url = best_url
-            
-            if '/XAPK' in release_url.upper():
-                print("[*] [APKPure Mobile] Selected XAPK format (Only option for latest version)")
-            else:
-                print("[*] [APKPure Mobile] Selected APK format (Latest version)")
-                
+
             title = package_name
-            version = None
-            
             # ניסיון 1: חילוץ הגרסה מתוך ה-URL עצמו (אם זמין)
-            version = self._extract_version(release_url)
-            
             # ניסיון 2: פתיחת חיבור זריז וקריאת הכתובת הסופית לאחר ההפניה (Redirect)
-            if not version:
-                try:
-                    # שימוש ב-stream=True קורא רק את ההדרים ולא מוריד את הקובץ כולו
-                    resp = self.scraper.get(release_url, headers=self.headers, allow_redirects=True, stream=True, timeout=10)
-                    final_url = resp.url
-                    cd = resp.headers.get("Content-Disposition", "")
-                    resp.close() # סגירת החיבור מיד כדי לחסוך זמן ומשאבים
-                    
-                    # בדיקה בשם הקובץ המוצהר
-                    match = re.search(r"filename\*?=['\"]?(?:UTF-8'')?([^'\";\n]+)", cd)
-                    if match:
-                        filename = match.group(1)
-                        version = self._extract_version(filename)
-                    
-                    # אם לא נמצא, נחפש בסוף הכתובת הסופית של ה-CDN שבהכרח מכילה את השם המקורי
-                    if not version:
-                        final_part = final_url.split('/')[-1]
-                        version = self._extract_version(final_part)
-                        
-                except Exception as e:
-                    print(f"[-][APKPure Mobile] Warning - Could not fetch final URL for version: {e}")
+            version = self._extract_version(release_url) or self._probe_version(release_url)
 
             # גיבוי סופי
             if not version:
@@ -121,6 +60,100 @@ class APKPureMobileSource:
             print(f"[-] [APKPure Mobile] Error resolving via API: {e}")
             return None, None, None
 
+    async def aget_latest_version(self, package_name: str):
+        """Event-loop version of get_latest_version."""
+        print(f"[*][APKPure Mobile] Fetching metadata for: {package_name}")
+        params = {'hl': 'he-IL', 'package_name': package_name}
+        try:
+            response = await async_get(
+                "apkpure_mobile", self.base_api, params=params, headers=self.headers, timeout=self.timeout
+            )
+            response.raise_for_status()
+
+            release_url = self._pick_release_url(response.content)
+            if not release_url:
+                return None, None, None
+
+            version = self._extract_version(release_url)
+            if not version:
+                # The redirect probe streams headers only; keep it on the requests session.
+                version = await asyncio.to_thread(self._probe_version, release_url)
+            return version or "latest", release_url, package_name
+
+        except Exception as e:
+            print(f"[-] [APKPure Mobile] Error resolving via API: {e}")
+            return None, None, None
+
+    def _pick_release_url(self, content: bytes) -> str | None:
+        # חילוץ מחרוזות ארוכות מהתשובה הבינארית כדי למצוא כתובות URL
+        strings = re.findall(rb'[ -~]{8,}', content)
+        
+        valid_urls = []
+        for s in strings:
+            if s.startswith(b'http'):
+                s_upper = s.upper()
+                # חיפוש עם לוכסן כדי לוודא שזה נתיב קובץ ולא סתם כתובת API
+                if b'/APK' in s_upper or b'/XAPK' in s_upper:
+                    valid_urls.append(s.decode('utf-8'))
+        
+        if not valid_urls:
+            print("[-] [APKPure Mobile] No APK/XAPK URL found in API response.")
+            return None
+            
+        # ברירת המחדל - הקישור הראשון (הכי חדש שיש)
+        best_url = valid_urls[0]
+        latest_version = self._extract_version(best_url)
+        
+        # אם הראשון הוא XAPK, נחפש אם קיים APK זהה לאותה גרסה
+        if '/XAPK' in best_url.upper() and latest_version:
+            for url in valid_urls[1:]:
+                url_version = self._extract_version(url)
+                
+                if not url_version:
+                    continue
+                    
+                # אם הגענו לגרסה ישנה יותר, סימן שאין APK לגרסה החדשה - עוצרים!
+                if url_version != latest_version:
+                    break
+                    
+                # אם מצאנו APK מאותה גרסה בדיוק, ניקח אותו!
+                if url_version == latest_version and '/APK' in url.upper() and '/XAPK' not in url.upper():
+                    best_url = url
+                    break
+        
+        if '/XAPK' in best_url.upper():
+            print("[*] [APKPure Mobile] Selected XAPK format (Only option for latest version)")
+        else:
+            print("[*] [APKPure Mobile] Selected APK format (Latest version)")
+        return best_url
+
+    def _probe_version(self, release_url: str) -> str | None:
+        version = None
+        try:
+            # שימוש ב-stream=True קורא רק את ההדרים ולא מוריד את הקובץ כולו
+            resp = self.scraper.get(release_url, headers=self.headers, allow_redirects=True, stream=True, timeout=10)
+            final_url = resp.url
+            cd = resp.headers.get("Content-Disposition", "")
+            resp.close() # סגירת החיבור מיד כדי לחסוך זמן ומשאבים
+            
+            # בדיקה בשם הקובץ המוצהר
+            match = re.search(r"filename\*?=['\"]?(?:UTF-8'')?([^'\";\n]+)", cd)
+            if match:
+                filename = match.group(1)
+                version = self._extract_version(filename)
+            
+            # אם לא נמצא, נחפש בסוף הכתובת הסופית של ה-CDN שבהכרח מכילה את השם המקורי
+            if not version:
+                final_part = final_url.split('/')[-1]
+                version = self._extract_version(final_part)
+                
+        except Exception as e:
+            print(f"[-][APKPure Mobile] Warning - Could not fetch final URL for version: {e}")
+        return version
+
     def get_download_url(self, initial_url: str):
         # ה-URL שהתקבל פועל כקישור הורדה ישיר
         return initial_url
+
+    async def aget_download_url(self, initial_url: str):
+        return initial_url
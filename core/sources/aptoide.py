@@ -1,9 +1,12 @@
-import requests
+from core.transport import async_get, get_session
 
 class AptoideSource:
     def __init__(self, timeout: int = 10):
         self.timeout = timeout
         self.base_url = "https://ws2.aptoide.com/api/7/app/getMeta"
+        self.scraper = get_session("aptoide")
+        # download link -> md5 published in the file metadata
+        self._md5sums = {}
 
     def get_latest_version(self, package_name: str):
         """
@@ -19,28 +22,50 @@ class AptoideSource:
         }
         
         try:
-            response = requests.get(self.base_url, params=params, timeout=self.timeout)
+            response = self.scraper.get(self.base_url, params=params, timeout=self.timeout)
             response.raise_for_status()
-            data = response.json()
-            
-            if data.get("info", {}).get("status") != "OK":
-                print(f"[-] [Aptoide] API returned status: {data.get('info', {}).get('status')}")
-                return None, None, None
-            
-            app_data = data.get("data", {})
-            file_data = app_data.get("file", {})
-            
-            version = file_data.get("vername")
-            # Prefer 'path', fallback to 'path_alt'
-            download_url = file_data.get("path") or file_data.get("path_alt")
-            title = app_data.get("name", package_name)
-            
-            return version, download_url, title
-            
+            return self._parse_meta(response.json(), package_name)
         except Exception as e:
             print(f"[-] [Aptoide] Error fetching metadata: {e}")
             return None, None, None
 
+    async def aget_latest_version(self, package_name: str):
+        """Event-loop version of get_latest_version."""
+        print(f"[*] [Aptoide] Fetching metadata for: {package_name}")
+        params = {"package_name": package_name, "language": "en"}
+        try:
+            response = await async_get("aptoide", self.base_url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            return self._parse_meta(response.json(), package_name)
+        except Exception as e:
+            print(f"[-] [Aptoide] Error fetching metadata: {e}")
+            return None, None, None
+
+    def _parse_meta(self, data: dict, package_name: str):
+        if data.get("info", {}).get("status") != "OK":
+            print(f"[-] [Aptoide] API returned status: {data.get('info', {}).get('status')}")
+            return None, None, None
+        
+        app_data = data.get("data", {})
+        file_data = app_data.get("file", {})
+        
+        version = file_data.get("vername")
+        # Prefer 'path', fallback to 'path_alt'
+        download_url = file_data.get("path") or file_data.get("path_alt")
+        title = app_data.get("name", package_name)
+        if download_url and file_data.get("md5sum"):
+            self._md5sums[download_url] = file_data["md5sum"]
+        
+        return version, download_url, title
+
     def get_download_url(self, initial_url: str):
         """Aptoide provides the direct link in the metadata, so this is just a passthrough."""
         return initial_url
+
+    async def aget_download_url(self, initial_url: str):
+        return initial_url
+
+    def get_expected_digest(self, download_url: str) -> str | None:
+        """md5 of the file from the Aptoide metadata, as "md5:<hex>"."""
+        md5sum = self._md5sums.get(download_url)
+        return f"md5:{md5sum}" if md5sum else None
@@ -3,15 +3,26 @@
 import os
 import re
 import time
-from bs4 import BeautifulSoup
-import cloudscraper
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from core.http_cache import cached_get
+from core.parsing import first_attr, make_soup
+from core.transport import get_session
 
 class CustomFallbackSource:
-    def __init__(self, uptodown_subdomain=None, timeout=30):
+    def __init__(self, uptodown_subdomain=None, timeout=30, race=True, hedge_delay=0.0):
         self.uptodown_subdomain = uptodown_subdomain
         self.timeout = timeout
+        # race: query the sub-sources concurrently (priority order still decides the winner);
+        # hedge_delay: seconds to wait on the running ones before starting the next.
+        self.race = race
+        self.hedge_delay = hedge_delay
+        # (helper, package) -> result, so get_download_url reuses get_latest_version's discovery.
+        self._resolved = {}
         
-        self.scraper = cloudscraper.create_scraper(
+        self.scraper = get_session(
+            "custom_fallback",
+            scraper=True,
             browser={
                 'browser': 'chrome',
                 'platform': 'windows',
@@ -37,8 +48,8 @@ class CustomFallbackSource:
                 app_url = f"https://{self.uptodown_subdomain}.en.uptodown.com/android"
             else:
                 search_url = f"https://en.uptodown.com/android/search?query={package_name}"
-                r_search = self.scraper.get(search_url, timeout=self.timeout)
-                soup_search = BeautifulSoup(r_search.text, 'html.parser')
+                r_search = cached_get(self.scraper, search_url, "custom_fallback.page", timeout=self.timeout)
+                soup_search = make_soup(r_search.text)
                 first_item = soup_search.select_one('.item .name a')
                 if first_item:
                     app_url = first_item.get('href')
@@ -49,8 +60,8 @@ class CustomFallbackSource:
 
             # 2. כניסה לעמוד ההורדה
             download_page = f"{app_url.rstrip('/')}/download"
-            r_dl = self.scraper.get(download_page, timeout=self.timeout)
-            soup_dl = BeautifulSoup(r_dl.text, 'html.parser')
+            r_dl = cached_get(self.scraper, download_page, "custom_fallback.page", timeout=self.timeout)
+            soup_dl = make_soup(r_dl.text)
 
             version_div = soup_dl.select_one('div.version')
             version_name = version_div.get_text(strip=True) if version_div else "latest"
@@ -80,10 +91,10 @@ class CustomFallbackSource:
                         domain = app_url.split('//')[1].split('/')[0]
                         variants_url = f"https://{domain}/app/{data_code}/version/{data_version}/files"
                         
-                        r_var = self.scraper.get(variants_url, timeout=self.timeout)
+                        r_var = cached_get(self.scraper, variants_url, "custom_fallback.page", timeout=self.timeout)
                         if r_var.status_code == 200:
                             var_json = r_var.json()
-                            var_soup = BeautifulSoup(var_json.get('content', ''), 'html.parser')
+                            var_soup = make_soup(var_json.get('content', ''))
                             for variant in var_soup.select('div.variant'):
                                 v_format_el = variant.select_one('div.v-file span')
                                 v_format = v_format_el.get_text(strip=True).upper() if v_format_el else ""
@@ -100,12 +111,8 @@ class CustomFallbackSource:
 
             # 4. חילוץ טוקן ההורדה הסופי
             pre_download_url = f"{download_page.rstrip('/')}/{target_file_id}-x"
-            self.scraper.headers.update({'Referer': download_page})
-            r_pre = self.scraper.get(pre_download_url, timeout=self.timeout)
-            soup_pre = BeautifulSoup(r_pre.text, 'html.parser')
-            
-            download_button = soup_pre.select_one('#detail-download-button')
-            final_token = download_button.get('data-url') if download_button else None
+            r_pre = self.scraper.get(pre_download_url, headers={'Referer': download_page}, timeout=self.timeout)
+            final_token = first_attr(r_pre.text, None, 'data-url', {'id': 'detail-download-button'})
             
             if not final_token:
                 return None, None
@@ -127,7 +134,7 @@ class CustomFallbackSource:
         try:
             print(f"[*] [Custom Fallback] Querying Aptoide API for pure Standalone APK...")
             search_url = f"https://ws75.aptoide.com/api/7/listSearchApps?query={package_name}"
-            res = self.scraper.get(search_url, timeout=self.timeout).json()
+            res = cached_get(self.scraper, search_url, "custom_fallback.api", timeout=self.timeout).json()
             
             app_id = None
             for app in res.get('datalist', {}).get('list', []):
@@ -139,7 +146,7 @@ class CustomFallbackSource:
                 return None, None
                 
             info_url = f"https://ws75.aptoide.com/api/7/getApp?app_id={app_id}"
-            info_res = self.scraper.get(info_url, timeout=self.timeout).json()
+            info_res = cached_get(self.scraper, info_url, "custom_fallback.api", timeout=self.timeout).json()
             
             meta = info_res.get('nodes', {}).get('meta', {}).get('data', {})
             file_info = meta.get('file', {})
@@ -210,61 +217,127 @@ class CustomFallbackSource:
             print(f"[-] APKPure API check failed: {e}")
             return None
 
-    def get_latest_version(self, package_name):
-        print(f"[*] [Custom Fallback] Resolving accurate version and pure APK download link for {package_name}...")
-        
-        real_version = "latest"
-        
-        # 0. שאיבת מספר הגרסה הרשמי
+    def _resolve(self, helper, package_name):
+        key = (helper.__name__, package_name)
+        if key not in self._resolved:
+            self._resolved[key] = helper(package_name)
+        return self._resolved[key]
+
+    def _candidates(self):
+        """Sub-sources in priority order, as (link prefix, helper)."""
+        return [
+            ("uptodown_direct", self._get_uptodown_pure_apk),
+            ("aptoide_direct", self._get_aptoide_apk),
+            ("apkpure_direct", self._get_apkpure_pure_apk),
+        ]
+
+    def _usable(self, future):
+        """(url, version) from a finished sub-source future; (None, None) if it failed."""
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"[-] [Custom Fallback] Sub-source failed: {e}")
+            return None, None
+        if isinstance(result, tuple):
+            return result
+        return result, None
+
+    def _first_usable(self, package_name):
+        """Sequential mode: try each sub-source in priority order."""
+        for prefix, helper in self._candidates():
+            result = self._resolve(helper, package_name)
+            url, version = result if isinstance(result, tuple) else (result, None)
+            if url:
+                return prefix, url, version
+        return None
+
+    def _race(self, package_name, pool):
+        """
+        Hedged race: start the top sub-source, then start the next one every
+        `hedge_delay` seconds (or as soon as nothing is in flight). Returns the
+        highest-priority usable answer as (prefix, url, version) once every
+        higher-priority sub-source has failed; lower-priority stragglers are
+        left to finish in the background and ignored.
+        """
+        candidates = self._candidates()
+        futures = []
+
+        def launch():
+            _, helper = candidates[len(futures)]
+            futures.append(pool.submit(self._resolve, helper, package_name))
+
+        launch()
+        while True:
+            for i, future in enumerate(futures):
+                if not future.done():
+                    break
+                url, version = self._usable(future)
+                if url:
+                    for straggler in futures[i + 1:]:
+                        straggler.cancel()
+                    return candidates[i][0], url, version
+            else:
+                # Everything launched so far has failed.
+                if len(futures) == len(candidates):
+                    return None
+                launch()
+                continue
+
+            pending = [future for future in futures if not future.done()]
+            can_hedge = len(futures) < len(candidates)
+            done, _ = wait(pending, timeout=self.hedge_delay if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done and can_hedge:
+                launch()
+
+    def _probe_version(self, package_name):
         try:
             from core.sources.apkpure_mobile import APKPureMobileSource
             pure = APKPureMobileSource(timeout=self.timeout)
             v, _, _ = pure.get_latest_version(package_name)
             if v and v != "latest":
-                real_version = v
-                print(f"[+] Successfully resolved version name: {real_version}")
+                print(f"[+] Successfully resolved version name: {v}")
+                return v
         except Exception as e:
             pass
+        return None
 
-        # 1. עדיפות ראשונה: Uptodown
-        uptodown_url, uptodown_ver = self._get_uptodown_pure_apk(package_name)
-        if uptodown_url:
-            if real_version == "latest" and uptodown_ver:
-                real_version = uptodown_ver
-            return real_version, f"uptodown_direct:{uptodown_url}", package_name
+    def _pick(self, package_name, with_version=False):
+        """Run the sub-sources (raced or sequential); returns (winner or None, probed version)."""
+        if not self.race:
+            probed = self._probe_version(package_name) if with_version else None
+            return self._first_usable(package_name), probed
 
-        # 2. עדיפות שניה: Aptoide
-        aptoide_url, aptoide_ver = self._get_aptoide_apk(package_name)
-        if aptoide_url:
-            if real_version == "latest" and aptoide_ver:
-                real_version = aptoide_ver
-            return real_version, f"aptoide_direct:{aptoide_url}", package_name
-            
-        # 3. עדיפות שלישית (גיבוי אחרון): APKPure מסונן XAPK
-        pure_apk_url = self._get_apkpure_pure_apk(package_name)
-        if pure_apk_url:
-            return real_version, f"apkpure_direct:{pure_apk_url}", package_name
+        pool = ThreadPoolExecutor(max_workers=len(self._candidates()) + 1, thread_name_prefix="custom-fallback")
+        try:
+            # 0. שאיבת מספר הגרסה הרשמי - במקביל למקורות
+            probe = pool.submit(self._probe_version, package_name) if with_version else None
+            winner = self._race(package_name, pool)
+            return winner, probe.result() if probe else None
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_latest_version(self, package_name):
+        print(f"[*] [Custom Fallback] Resolving accurate version and pure APK download link for {package_name}...")
+
+        winner, probed = self._pick(package_name, with_version=True)
+        real_version = probed or "latest"
+
+        # עדיפויות: Uptodown, אחריו Aptoide, ולבסוף APKPure מסונן XAPK
+        if winner:
+            prefix, url, version = winner
+            if real_version == "latest" and version:
+                real_version = version
+            return real_version, f"{prefix}:{url}", package_name
 
         return real_version, f"fallback:{package_name}", package_name
 
     def get_download_url(self, initial_url):
-        if initial_url.startswith("uptodown_direct:"):
-            return initial_url.split("uptodown_direct:", 1)[1]
-        if initial_url.startswith("aptoide_direct:"):
-            return initial_url.split("aptoide_direct:", 1)[1]
-        if initial_url.startswith("apkpure_direct:"):
-            return initial_url.split("apkpure_direct:", 1)[1]
+        for prefix, _ in self._candidates():
+            if initial_url.startswith(f"{prefix}:"):
+                return initial_url.split(f"{prefix}:", 1)[1]
 
         package_name = initial_url.split("fallback:", 1)[1] if "fallback:" in initial_url else initial_url
         
         # שיחזור לוגיקת העדיפויות במקרה של ניתוב מחדש
-        uptodown_url, _ = self._get_uptodown_pure_apk(package_name)
-        if uptodown_url: return uptodown_url
-        
-        aptoide_url, _ = self._get_aptoide_apk(package_name)
-        if aptoide_url: return aptoide_url
-        
-        pure_apk_url = self._get_apkpure_pure_apk(package_name)
-        if pure_apk_url: return pure_apk_url
-        
-        return None
+        winner, _ = self._pick(package_name)
+        return winner[1] if winner else None
@@ -1,11 +1,45 @@
-import requests
+import asyncio
+import os
 import re
 
+from core.http_cache import cached_get, get_http_cache
+from core.transport import async_get, get_session
+
+
+API_URL = "https://api.github.com"
+
+
+def api_headers(extra: dict | None = None) -> dict:
+    """GitHub REST headers, authenticated when GITHUB_TOKEN is set (5000 req/h instead of 60)."""
+    headers = {"Accept": "application/vnd.github+json"}
+    token = os.environ.get("GITHUB_TOKEN")
+    if token:
+        headers["Authorization"] = f"token {token}"
+    headers.update(extra or {})
+    return headers
+
+
+def api_get(url: str, **kwargs):
+    """
+    Conditional GET against the GitHub API through the HTTP cache.
+
+    The last 200 response per URL is kept with its ETag; every call sends
+    If-None-Match and a 304 Not Modified (which GitHub does not count against
+    the rate limit of authenticated clients) returns the stored response,
+    marked `from_cache`. Without a cache dir this is a plain GET.
+    """
+    kwargs["headers"] = api_headers(kwargs.get("headers"))
+    return cached_get(get_session("github"), url, "github.api", **kwargs)
+
+
 class GitHubSource:
     def __init__(self, timeout: int = 10, asset_regex: str | None = None):
         self.timeout = timeout
         self.asset_regex = asset_regex
-        self.api_base_url = "https://api.github.com/repos"
+        self.api_base_url = f"{API_URL}/repos"
+        self.scraper = get_session("github")
+        # browser_download_url -> "sha256:<hex>" published by the releases API
+        self._asset_digests = {}
 
     def get_latest_version(self, repo: str):
         """
@@ -24,51 +58,78 @@ class GitHubSource:
         url = f"{self.api_base_url}/{repo}/releases/latest"
         
         try:
-            # We don't use a token by default to keep it simple, 
-            # but GitHub API has rate limits for unauthenticated requests.
-            response = requests.get(url, timeout=self.timeout)
+            response = api_get(url, timeout=self.timeout)
             response.raise_for_status()
-            data = response.json()
-            
-            tag_name = data.get("tag_name")
-            
-            # Normalize version: remove 'v' prefix if present
-            if tag_name and tag_name.lower().startswith("v"):
-                version = tag_name[1:]
+            if getattr(response, "from_cache", False):
+                print(f"[i] [GitHub] Latest release of {repo} unchanged (304)")
+            return self._parse_release(response.json())
+        except Exception as e:
+            print(f"[-] [GitHub] Error fetching metadata: {e}")
+            return None, None, None
+
+    async def aget_latest_version(self, repo: str):
+        """Event-loop version of get_latest_version."""
+        print(f"[*] [GitHub] Fetching latest release for: {repo}")
+        url = f"{self.api_base_url}/{repo}/releases/latest"
+        try:
+            if get_http_cache() is not None:
+                # Conditional requests go through the sqlite HTTP cache, which is synchronous.
+                response = await asyncio.to_thread(api_get, url, timeout=self.timeout)
             else:
-                version = tag_name
-            title = data.get("name") or version
+                response = await async_get("github", url, headers=api_headers(), timeout=self.timeout)
+            response.raise_for_status()
+            return self._parse_release(response.json())
+        except Exception as e:
+            print(f"[-] [GitHub] Error fetching metadata: {e}")
+            return None, None, None
+
+    def _parse_release(self, data: dict):
+        """(version, download_url, title) of the first matching .apk asset of a release."""
+        tag_name = data.get("tag_name")
+        
+        # Normalize version: remove 'v' prefix if present
+        if tag_name and tag_name.lower().startswith("v"):
+            version = tag_name[1:]
+        else:
+            version = tag_name
+        title = data.get("name") or version
+        
+        # Find the first matching .apk asset
+        assets = data.get("assets", [])
+        download_url = None
+        for asset in assets:
+            name = asset.get("name", "")
+            if not name.endswith(".apk"):
+                continue
             
-            # Find the first matching .apk asset
-            assets = data.get("assets", [])
-            download_url = None
-            for asset in assets:
-                name = asset.get("name", "")
-                if not name.endswith(".apk"):
-                    continue
-                
-                if self.asset_regex:
-                    if re.search(self.asset_regex, name):
-                        download_url = asset.get("browser_download_url")
-                        print(f"[+] [GitHub] Found matching asset: {name}")
-                        break
-                else:
+            if self.asset_regex:
+                if re.search(self.asset_regex, name):
                     download_url = asset.get("browser_download_url")
+                    print(f"[+] [GitHub] Found matching asset: {name}")
                     break
-            
-            if not download_url:
-                if self.asset_regex:
-                    print(f"[-] [GitHub] No APK asset matching '{self.asset_regex}' found in release {version}")
-                else:
-                    print(f"[-] [GitHub] No APK asset found in release {version}")
-                return None, None, None
-                
-            return version, download_url, title
-            
-        except Exception as e:
-            print(f"[-] [GitHub] Error fetching metadata: {e}")
+            else:
+                download_url = asset.get("browser_download_url")
+                break
+
+        if download_url and asset.get("digest"):
+            self._asset_digests[download_url] = asset["digest"]
+        
+        if not download_url:
+            if self.asset_regex:
+                print(f"[-] [GitHub] No APK asset matching '{self.asset_regex}' found in release {version}")
+            else:
+                print(f"[-] [GitHub] No APK asset found in release {version}")
             return None, None, None
+            
+        return version, download_url, title
 
     def get_download_url(self, initial_url: str):
         """GitHub browser_download_url is a direct-ish link (redirects to objects.githubusercontent.com)."""
         return initial_url
+
+    async def aget_download_url(self, initial_url: str):
+        return initial_url
+
+    def get_expected_digest(self, download_url: str) -> str | None:
+        """Asset checksum from the releases API ("sha256:<hex>"), if GitHub published one."""
+        return self._asset_digests.get(download_url)
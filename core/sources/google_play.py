@@ -2,9 +2,11 @@ import os
 import sys
 import json
 import subprocess
-import urllib.request
 from pathlib import Path
 
+from core.tracing import run_subprocess
+from core.transport import download_to_file, get_session
+
 class FakeResponse:
     """מזייף אובייקט Response של requests כדי ש-downloader.py יעבוד כרגיל"""
     def __init__(self, filepath, url):
@@ -36,7 +38,7 @@ class GPlayScraper:
     def get(self, url, stream=False, headers=None, allow_redirects=True):
         # מחלצים את שם החבילה מה-URL המזויף שלנו
         package_name = url.split("gplay_dl:")[1]
-        out_dir = os.path.join(os.getcwd(), "scratch", "gplay_tmp")
+        out_dir = os.path.join(os.getcwd(), "scratch", "gplay_tmp", package_name)
         os.makedirs(out_dir, exist_ok=True)
 
         print(f"[*] [GooglePlay] Downloading & Merging {package_name} via GPlay Engine...")
@@ -49,7 +51,7 @@ class GPlayScraper:
         ]
         
         try:
-            subprocess.run(cmd, check=True)
+            run_subprocess(cmd, check=True)
         except subprocess.CalledProcessError:
             raise Exception("GPlay CLI download failed. Check console logs.")
 
@@ -85,7 +87,7 @@ class GooglePlaySource:
             repo_url = "https://github.com/alltechdev/gplay-apk-downloader.git"
             try:
                 # --depth 1 כדי להוריד מהר בלי היסטוריית גיט
-                subprocess.run(["git", "clone", "--depth", "1", repo_url, self.engine_dir], check=True)
+                run_subprocess(["git", "clone", "--depth", "1", repo_url, self.engine_dir], check=True)
             except subprocess.CalledProcessError as e:
                 raise Exception(f"Failed to clone GPlay Engine: {e}")
 
@@ -95,7 +97,7 @@ class GooglePlaySource:
             print("[*] [GooglePlay] Downloading APKEditor.jar for GPlay Engine...")
             apkeditor_url = "https://github.com/REAndroid/APKEditor/releases/download/V1.4.7/APKEditor-1.4.7.jar"
             try:
-                urllib.request.urlretrieve(apkeditor_url, apkeditor_path)
+                download_to_file(apkeditor_url, apkeditor_path, get_session("github"))
             except Exception as e:
                 print(f"[-] [GooglePlay] Failed to download APKEditor: {e}")
 
@@ -108,12 +110,12 @@ class GooglePlaySource:
             dispenser_url = os.environ.get("DISPENSER_URL", "https://dispenser.auroraoss.com/")
             
             cmd = [sys.executable, self.gplay_script, "auth", "-d", dispenser_url]
-            subprocess.run(cmd, check=True)
+            run_subprocess(cmd, check=True)
 
     def get_latest_version(self, package_name: str):
         print(f"[*] [GooglePlay] Checking latest version for: {package_name}")
         try:
-            result = subprocess.run(
+            result = run_subprocess(
                 [sys.executable, self.gplay_script, "check-version", package_name, "--json"],
                 capture_output=True, text=True, check=True
             )
@@ -1,5 +1,8 @@
+import asyncio
 from dataclasses import dataclass
-from typing import Any, Callable
+from typing import Any, Callable, Protocol, runtime_checkable
+
+from core.source_health import SourceHealth, get_source_health
 
 from .apkmirror import APKMirrorSource
 from .aptoide import AptoideSource
@@ -42,7 +45,11 @@ SOURCE_DEFINITIONS: dict[str, SourceDefinition] = {
         lookup_field="repo",
     ),
     "custom_fallback": SourceDefinition(
-        factory=lambda cfg: CustomFallbackSource(uptodown_subdomain=cfg.get("uptodown_subdomain")),
+        factory=lambda cfg: CustomFallbackSource(
+            uptodown_subdomain=cfg.get("uptodown_subdomain"),
+            race=bool(cfg.get("fallback_race", True)),
+            hedge_delay=float(cfg.get("fallback_hedge_delay", 0)),
+        ),
         lookup_field="package_name"
     ),
     "uptodown": SourceDefinition(
@@ -52,12 +59,63 @@ SOURCE_DEFINITIONS: dict[str, SourceDefinition] = {
 }
 
 
-def create_source(source_name: str, app_config: dict) -> tuple[str, Any, str]:
+@runtime_checkable
+class AsyncSource(Protocol):
+    """
+    Event-loop interface of a source adapter.
+
+    Adapters that implement it natively (GitHub, Aptoide, APKPure mobile,
+    WhatsApp official) fetch through core.transport.async_get; every other
+    adapter is wrapped in SyncSourceAdapter by `as_async`.
+    """
+
+    async def aget_latest_version(self, lookup_value: str) -> tuple: ...
+
+    async def aget_download_url(self, release_url: str) -> str | None: ...
+
+
+class SyncSourceAdapter:
+    """Runs a blocking source adapter on a worker thread behind AsyncSource."""
+
+    def __init__(self, source: Any):
+        self.source = source
+
+    def __getattr__(self, name: str):
+        return getattr(self.source, name)
+
+    async def aget_latest_version(self, lookup_value: str) -> tuple:
+        return await asyncio.to_thread(self.source.get_latest_version, lookup_value)
+
+    async def aget_download_url(self, release_url: str) -> str | None:
+        return await asyncio.to_thread(self.source.get_download_url, release_url)
+
+
+def as_async(source: Any) -> AsyncSource:
+    """`source` itself if it is async-native, else a SyncSourceAdapter around it."""
+    return source if isinstance(source, AsyncSource) else SyncSourceAdapter(source)
+
+
+def _normalize(source_name: str | None) -> str:
     normalized = (source_name or "apkmirror").lower()
-    source_def = SOURCE_DEFINITIONS.get(normalized)
-    if source_def is None:
-        normalized = "apkmirror"
-        source_def = SOURCE_DEFINITIONS[normalized]
+    return normalized if normalized in SOURCE_DEFINITIONS else "apkmirror"
+
+
+def source_candidates(app_config: dict, health: SourceHealth | None = None) -> list[str]:
+    """
+    The sources to try for an app, healthiest first.
+
+    app.json `sources` lists every acceptable source in order of preference;
+    without it the single `source` is used. With a health record, sources
+    that have been failing are moved behind the others.
+    """
+    configured = app_config.get("sources") or [app_config.get("source", "apkmirror")]
+    names = list(dict.fromkeys(_normalize(name) for name in configured))
+    return health.order(names) if health else names
+
+
+def create_source(source_name: str, app_config: dict) -> tuple[str, Any, str]:
+    normalized = _normalize(source_name)
+    source_def = SOURCE_DEFINITIONS[normalized]
 
     lookup_value = app_config.get(source_def.lookup_field)
     if not lookup_value:
@@ -65,4 +123,11 @@ def create_source(source_name: str, app_config: dict) -> tuple[str, Any, str]:
             f"'{source_def.lookup_field}' field is required for source '{normalized}'."
         )
 
-    return normalized, source_def.factory(app_config), lookup_value
+    try:
+        source = source_def.factory(app_config)
+    except Exception as e:
+        health = get_source_health()
+        if health:
+            health.record(normalized, False, error=e)
+        raise
+    return normalized, source, lookup_value
@@ -2,10 +2,12 @@ import os
 import re
 import json
 import time
-import cloudscraper
 import urllib.parse
 import socket
-from bs4 import BeautifulSoup
+
+from core.http_cache import cached_get
+from core.parsing import make_soup
+from core.transport import get_session
 
 class UptodownSource:
     def __init__(self, uptodown_subdomain=None, timeout=30, debug=True):
@@ -13,13 +15,17 @@ class UptodownSource:
         self.timeout = timeout
         self.debug = debug
 
-        self.scraper = cloudscraper.create_scraper(
-            browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True}
+        self.scraper = get_session(
+            "uptodown",
+            scraper=True,
+            browser={'browser': 'chrome', 'platform': 'windows', 'desktop': True},
         )
         self.scraper.headers.update({
             "Accept-Language": "en-US,en;q=0.9",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
         })
+        # Referer/User-Agent picked up while scraping; the session is shared, so they
+        # travel per request (and with the final download) instead of on the session.
         self.headers = {}
     
     def _log(self, *args, **kwargs):
@@ -86,7 +92,7 @@ class UptodownSource:
 
     def _extract_version_from_headers(self, url):
         try:
-            head = self.scraper.head(url, allow_redirects=True, timeout=10)
+            head = self.scraper.head(url, headers=self.headers, allow_redirects=True, timeout=10)
             cd = head.headers.get('Content-Disposition', '')
             match = re.search(r'filename="?([^"]+)"?', cd)
             if match:
@@ -156,7 +162,7 @@ class UptodownSource:
                     for direct_url in guesses:
                         self._log(f"Trying direct URL guess: {direct_url}")
                         try:
-                            r_dir = self.scraper.get(direct_url, timeout=self.timeout)
+                            r_dir = cached_get(self.scraper, direct_url, "uptodown.page", timeout=self.timeout)
                             if r_dir.status_code == 200:
                                 if 'detail-app-name' in r_dir.text or re.search(r'\b' + re.escape(package_name) + r'\b', r_dir.text):
                                     app_url = direct_url
@@ -172,14 +178,14 @@ class UptodownSource:
                     search_url = f"                                         {search_query_escaped}"
                     
                     self._log(f"Search URL: {search_url}")
-                    r_search = self.scraper.get(search_url, timeout=self.timeout)
+                    r_search = cached_get(self.scraper, search_url, "uptodown.page", timeout=self.timeout)
                     
                     if r_search.status_code == 200:
                         m_redirect = re.search(r'^(https://[a-z0-9-]+\.en\.uptodown\.com/android)', r_search.url)
                         if r_search.url != search_url and m_redirect:
                             app_url = m_redirect.group(1)
                         else:
-                            soup_search = BeautifulSoup(r_search.text, 'html.parser')
+                            soup_search = make_soup(r_search.text)
                             for item in soup_search.select('.item .name a, a.app-link'):
                                 href = item.get('href', '')
                                 if href and 'uptodown-android' not in href:
@@ -226,13 +232,13 @@ class UptodownSource:
 
             # --- שלב 1: כניסה לעמוד הראשי של האפליקציה ---
             self._log(f"Fetching main app page: {app_url}")
-            r_main = self.scraper.get(app_url, timeout=self.timeout)
+            r_main = cached_get(self.scraper, app_url, "uptodown.page", timeout=self.timeout)
             
             if r_main.status_code != 200:
                 self._log(f"CRITICAL: Failed to load main app page! Status {r_main.status_code}")
                 return None, None
                 
-            soup_main = BeautifulSoup(r_main.text, 'html.parser')
+            soup_main = make_soup(r_main.text)
             latest_btn = soup_main.select_one('a.button-download, div.button-download a, button#detail-download-button, a.latest, a[href$="/download"]')
             
             if not latest_btn:
@@ -246,20 +252,19 @@ class UptodownSource:
             time.sleep(2)
             
             # --- שלב 2: כניסה לעמוד ההורדה ---
-            self.scraper.headers.update({"Referer": r_main.url})
-            r_dl = self.scraper.get(download_page_url, timeout=self.timeout)
+            self.headers["Referer"] = r_main.url
+            r_dl = self.scraper.get(download_page_url, headers=self.headers, timeout=self.timeout)
             
             if r_dl.status_code in [410, 403]:
                 self._log(f"Got {r_dl.status_code} on download page. Trying standard requests fallback...")
-                import requests
                 fallback_headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36", "Referer": r_main.url}
-                r_dl = requests.get(download_page_url, headers=fallback_headers, timeout=self.timeout)
+                r_dl = get_session("uptodown_plain").get(download_page_url, headers=fallback_headers, timeout=self.timeout)
             
             if r_dl.status_code != 200:
                 self._log(f"CRITICAL: Failed to load specific download page! Status {r_dl.status_code}")
                 return None, None
                 
-            soup_dl = BeautifulSoup(r_dl.text, 'html.parser')
+            soup_dl = make_soup(r_dl.text)
             name_el = soup_dl.select_one('#detail-app-name')
             default_file_id = name_el.get('data-file-id') if name_el else None
             target_file_id = default_file_id
@@ -278,9 +283,9 @@ class UptodownSource:
                         variants_url = f"https://{domain}/app/{data_code_match.group(1)}/version/{data_version}/files"
                         try:
                             time.sleep(1)
-                            r_var = self.scraper.get(variants_url, timeout=self.timeout)
+                            r_var = self.scraper.get(variants_url, headers=self.headers, timeout=self.timeout)
                             if r_var.status_code == 200:
-                                var_soup = BeautifulSoup(r_var.json().get('content', ''), 'html.parser')
+                                var_soup = make_soup(r_var.json().get('content', ''))
                                 for variant in var_soup.select('div.variant'):
                                     v_format_el = variant.select_one('div.v-file span')
                                     if v_format_el and "APK" in v_format_el.get_text().upper():
@@ -293,10 +298,10 @@ class UptodownSource:
 
             if target_file_id and target_file_id != default_file_id:
                 current_download_page = f"{app_url}/download/{target_file_id}"
-                self.scraper.headers.update({"Referer": r_dl.url})
-                r_dl = self.scraper.get(current_download_page, timeout=self.timeout)
+                self.headers["Referer"] = r_dl.url
+                r_dl = self.scraper.get(current_download_page, headers=self.headers, timeout=self.timeout)
                 if r_dl.status_code == 200:
-                    soup_dl = BeautifulSoup(r_dl.text, 'html.parser')
+                    soup_dl = make_soup(r_dl.text)
 
             # --- שלב 3: פתרון חינמי לחלוטין באמצעות דפדפן נסתר (Playwright) ---
             # --- שלב 3: פתרון חינמי לחלוטין באמצעות דפדפן נסתר (Playwright) ---
@@ -394,8 +399,8 @@ class UptodownSource:
                 return None, None
                 
             # 4. עקיפת ה-Redirect (302) כדי לקבל את לינק ה-APK הסופי ללא הורדתו עדיין
-            self.scraper.headers.update({"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"})
-            r_final = self.scraper.head(intermediate_url, allow_redirects=False, timeout=self.timeout)
+            self.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+            r_final = self.scraper.head(intermediate_url, headers=self.headers, allow_redirects=False, timeout=self.timeout)
             
             if r_final.status_code in [301, 302, 303, 307]:
                 download_url = r_final.headers.get('Location')
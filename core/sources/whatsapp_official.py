@@ -1,13 +1,17 @@
 import re
 import gzip
-import cloudscraper
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
+
+from core.parsing import make_soup
+from core.transport import async_get, get_session
 
 class WhatsAppOfficialSource:
     def __init__(self, timeout: int = 30):
         self.timeout = timeout
         self.base_url = "https://www.whatsapp.com/android"
-        self.scraper = cloudscraper.create_scraper(
+        self.scraper = get_session(
+            "whatsapp_official",
+            scraper=True,
             browser={
                 'browser': 'chrome',
                 'platform': 'windows',
@@ -48,82 +52,101 @@ class WhatsAppOfficialSource:
             # פענוח ידני
             html = self._decode_response(response)
             
-            # שמירה לקובץ לבדיקה
-            with open("whatsapp_page.html", "w", encoding="utf-8") as f:
-                f.write(html)
-            print("[*] [WhatsApp Official] Saved decoded HTML to whatsapp_page.html")
-            
-            # תצוגה מקדימה
-            print("[*] [WhatsApp Official] HTML preview (first 500 chars):")
-            print(html[:500])
-            
-            soup = BeautifulSoup(html, 'html.parser')
+            return self._parse_page(html)
 
-            # --- 1. חיפוש קישור ---
-            apk_link = None
-            
-            # חיפוש בכל הקישורים
-            all_links = soup.find_all('a', href=True)
-            print(f"[*] [WhatsApp Official] Found {len(all_links)} links")
-            
-            for link in all_links:
-                href = link.get('href', '')
-                if 'scontent.whatsapp.net' in href and '.apk' in href:
-                    apk_link = href
-                    print(f"[+] [WhatsApp Official] Found APK link: {href[:100]}...")
-                    break
-
-            # חיפוש גולמי ב-HTML
-            if not apk_link:
-                print("[*] [WhatsApp Official] Searching raw HTML for APK links...")
-                pattern = r'https?://[^\s"\'<>]+\.apk[^\s"\'<>]*'
-                matches = re.findall(pattern, html)
-                print(f"[*] [WhatsApp Official] Found {len(matches)} raw matches")
-                if matches:
-                    apk_link = matches[0]
-                    print(f"[+] [WhatsApp Official] Using raw match: {apk_link[:100]}...")
-
-            if not apk_link:
-                print("[-] [WhatsApp Official] Could not find APK download link.")
-                return None, None, None
-
-            # --- 2. חילוץ גרסה ---
-            version = None
-            patterns = [
-                r'גרסה\s+([\d.]+)',
-                r'Version\s+([\d.]+)',
-                r'version["\']?\s*[:=]\s*["\']?([\d.]+)',
-                r'v([\d.]+)',
-            ]
-            for pat in patterns:
-                match = re.search(pat, html, re.IGNORECASE)
-                if match:
-                    version = match.group(1)
-                    print(f"[*] [WhatsApp Official] Found version via '{pat}': {version}")
-                    break
-
-            if not version:
-                # נסיון מחלץ משם הקובץ
-                filename_match = re.search(r'/([^/]+)\.apk', apk_link)
-                if filename_match:
-                    filename = filename_match.group(1)
-                    ver_match = re.search(r'(\d+\.\d+\.\d+\.\d+)', filename) or re.search(r'(\d+\.\d+\.\d+)', filename)
-                    if ver_match:
-                        version = ver_match.group(1)
-                        print(f"[*] [WhatsApp Official] Found version in filename: {version}")
-
-            if not version:
-                from datetime import datetime
-                version = datetime.utcnow().strftime("%Y.%m.%d")
-                print(f"[!] [WhatsApp Official] Using date as version: {version}")
-
-            title = "WhatsApp Messenger"
-            print(f"[+] [WhatsApp Official] Final version: {version}")
-            return version, apk_link, title
+        except Exception as e:
+            print(f"[-] [WhatsApp Official] Error: {e}")
+            return None, None, None
 
+    async def aget_latest_version(self, package_name: str):
+        """Event-loop version of get_latest_version."""
+        print(f"[*] [WhatsApp Official] Fetching latest APK from {self.base_url}")
+        try:
+            # Served by the cloudscraper session, so async_get keeps it on a worker thread.
+            response = await async_get("whatsapp_official", self.base_url, timeout=self.timeout)
+            response.raise_for_status()
+            return self._parse_page(self._decode_response(response))
         except Exception as e:
             print(f"[-] [WhatsApp Official] Error: {e}")
             return None, None, None
 
+    def _parse_page(self, html: str):
+        """(version, apk_link, title) from the decoded download page."""
+        # שמירה לקובץ לבדיקה
+        with open("whatsapp_page.html", "w", encoding="utf-8") as f:
+            f.write(html)
+        print("[*] [WhatsApp Official] Saved decoded HTML to whatsapp_page.html")
+        
+        # תצוגה מקדימה
+        print("[*] [WhatsApp Official] HTML preview (first 500 chars):")
+        print(html[:500])
+        
+        soup = make_soup(html, parse_only=SoupStrainer('a', href=True))
+
+        # --- 1. חיפוש קישור ---
+        apk_link = None
+        
+        # חיפוש בכל הקישורים
+        all_links = soup.find_all('a', href=True)
+        print(f"[*] [WhatsApp Official] Found {len(all_links)} links")
+        
+        for link in all_links:
+            href = link.get('href', '')
+            if 'scontent.whatsapp.net' in href and '.apk' in href:
+                apk_link = href
+                print(f"[+] [WhatsApp Official] Found APK link: {href[:100]}...")
+                break
+
+        # חיפוש גולמי ב-HTML
+        if not apk_link:
+            print("[*] [WhatsApp Official] Searching raw HTML for APK links...")
+            pattern = r'https?://[^\s"\'<>]+\.apk[^\s"\'<>]*'
+            matches = re.findall(pattern, html)
+            print(f"[*] [WhatsApp Official] Found {len(matches)} raw matches")
+            if matches:
+                apk_link = matches[0]
+                print(f"[+] [WhatsApp Official] Using raw match: {apk_link[:100]}...")
+
+        if not apk_link:
+            print("[-] [WhatsApp Official] Could not find APK download link.")
+            return None, None, None
+
+        # --- 2. חילוץ גרסה ---
+        version = None
+        patterns = [
+            r'גרסה\s+([\d.]+)',
+            r'Version\s+([\d.]+)',
+            r'version["\']?\s*[:=]\s*["\']?([\d.]+)',
+            r'v([\d.]+)',
+        ]
+        for pat in patterns:
+            match = re.search(pat, html, re.IGNORECASE)
+            if match:
+                version = match.group(1)
+                print(f"[*] [WhatsApp Official] Found version via '{pat}': {version}")
+                break
+
+        if not version:
+            # נסיון מחלץ משם הקובץ
+            filename_match = re.search(r'/([^/]+)\.apk', apk_link)
+            if filename_match:
+                filename = filename_match.group(1)
+                ver_match = re.search(r'(\d+\.\d+\.\d+\.\d+)', filename) or re.search(r'(\d+\.\d+\.\d+)', filename)
+                if ver_match:
+                    version = ver_match.group(1)
+                    print(f"[*] [WhatsApp Official] Found version in filename: {version}")
+
+        if not version:
+            from datetime import datetime
+            version = datetime.utcnow().strftime("%Y.%m.%d")
+            print(f"[!] [WhatsApp Official] Using date as version: {version}")
+
+        title = "WhatsApp Messenger"
+        print(f"[+] [WhatsApp Official] Final version: {version}")
+        return version, apk_link, title
+
     def get_download_url(self, initial_url: str):
         return initial_url
+
+    async def aget_download_url(self, initial_url: str):
+        return initial_url
@@ -0,0 +1,190 @@
+"""
+Trace Event Format (Chrome trace / Perfetto) spans for pipeline runs.
+
+`run.py --trace out.json` points APP_STORE_TRACE_DIR at a scratch directory.
+Every process (the parent and each --jobs worker, which inherit the
+environment) appends complete events ("ph": "X") to its own
+`trace-<pid>.jsonl` there, one line per span, from any thread. At the end
+`merge()` combines the files into one JSON document that chrome://tracing
+and ui.perfetto.dev load directly.
+
+Timestamps are wall-clock microseconds (comparable across processes);
+durations come from perf_counter_ns. Without APP_STORE_TRACE_DIR, `span()`
+returns a shared no-op context manager after one environment lookup.
+
+Span categories: "app", "stage" (core.instrumentation stages), "http"
+(core.transport requests), "subprocess" (run_subprocess) and "patch"
+(functions decorated with @traced).
+
+Complete events nest by time on one thread, which coroutines interleaving on
+one event loop do not. Code running on an event loop uses `async_span()`
+instead: a pair of async begin/end events ("ph": "b"/"e") tied together by an
+"id", which the viewers draw as separate tracks per span.
+"""
+
+import contextlib
+import functools
+import glob
+import itertools
+import json
+import os
+import subprocess
+import threading
+import time
+
+
+TRACE_DIR_ENV = "APP_STORE_TRACE_DIR"
+
+_NULL = contextlib.nullcontext()
+_lock = threading.Lock()
+_file = None
+_file_pid = None
+_async_ids = itertools.count(1)
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(TRACE_DIR_ENV))
+
+
+def _emit(event: dict):
+    global _file, _file_pid
+    trace_dir = os.environ.get(TRACE_DIR_ENV)
+    if not trace_dir:
+        return
+    line = json.dumps(event, default=str) + "\n"
+    with _lock:
+        pid = os.getpid()
+        if _file is None or _file_pid != pid:
+            os.makedirs(trace_dir, exist_ok=True)
+            _file = open(os.path.join(trace_dir, f"trace-{pid}.jsonl"), "a", encoding="utf-8")
+            _file_pid = pid
+        _file.write(line)
+        _file.flush()
+
+
+def _reset_after_fork():
+    # The child must not write through (or wait on) the parent's file and lock.
+    global _lock, _file, _file_pid
+    _lock = threading.Lock()
+    _file = None
+    _file_pid = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@contextlib.contextmanager
+def _span(name: str, cat: str, args: dict):
+    ts = time.time_ns() // 1000
+    start = time.perf_counter_ns()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        _emit({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": ts,
+            "dur": (time.perf_counter_ns() - start) // 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": args,
+        })
+
+
+def span(name: str, cat: str = "stage", **args):
+    """Context manager recording `name` as one span; yields its args dict (mutable)."""
+    if not os.environ.get(TRACE_DIR_ENV):
+        return _NULL
+    return _span(name, cat, args)
+
+
+@contextlib.contextmanager
+def _async_span(name: str, cat: str, args: dict):
+    span_id = f"{os.getpid()}-{next(_async_ids)}"
+    event = {"name": name, "cat": cat, "id": span_id, "pid": os.getpid(), "tid": threading.get_native_id()}
+    _emit({**event, "ph": "b", "ts": time.time_ns() // 1000})
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        _emit({**event, "ph": "e", "ts": time.time_ns() // 1000, "args": args})
+
+
+def async_span(name: str, cat: str = "stage", **args):
+    """Like span(), recorded as async begin/end events for code that awaits inside it."""
+    if not os.environ.get(TRACE_DIR_ENV):
+        return _NULL
+    return _async_span(name, cat, args)
+
+
+def traced(name: str | None = None, cat: str = "patch"):
+    """Decorator recording every call of the function as a span."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not os.environ.get(TRACE_DIR_ENV):
+                return func(*args, **kwargs)
+            with _span(span_name, cat, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_process_name(name: str):
+    """Label this process's track in the trace viewer."""
+    _emit({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": name}})
+
+
+def _command_name(cmd) -> str:
+    if isinstance(cmd, str):
+        cmd = cmd.split()
+    cmd = [str(part) for part in cmd]
+    if not cmd:
+        return "subprocess"
+    name = os.path.basename(cmd[0])
+    if name.startswith("java") and "-jar" in cmd:
+        jar_index = cmd.index("-jar") + 1
+        if jar_index < len(cmd):
+            name = f"{name} {os.path.basename(cmd[jar_index])}"
+    return name
+
+
+def run_subprocess(cmd, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run(cmd, **kwargs), traced as a "subprocess" span."""
+    if not os.environ.get(TRACE_DIR_ENV):
+        return subprocess.run(cmd, **kwargs)
+    argv = cmd if isinstance(cmd, str) else " ".join(str(part) for part in cmd)
+    with _span(_command_name(cmd), "subprocess", {"argv": argv[:500]}) as args:
+        result = subprocess.run(cmd, **kwargs)
+        args["returncode"] = result.returncode
+        return result
+
+
+def merge(trace_dir: str, out_path: str) -> int:
+    """Combine every per-process trace file in `trace_dir` into `out_path`. Returns the event count."""
+    events = []
+    for path in sorted(glob.glob(os.path.join(trace_dir, "trace-*.jsonl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # A worker killed mid-write leaves a partial last line.
+                    continue
+    events.sort(key=lambda event: (event.get("ph") != "M", event.get("ts", 0)))
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
@@ -0,0 +1,234 @@
+"""
+Shared HTTP transport for the downloader and the source adapters.
+
+`get_session(profile)` hands out one pooled session per profile (usually one
+per source) for the lifetime of the process. Connection pools are keyed by
+host inside each session, so multi-step scrapes reuse keep-alive connections
+instead of paying a TLS handshake per request. Every session gets a default
+timeout and a retry/backoff policy for transient failures, and every request
+waits on the per-host limiter in core.ratelimit.
+
+`async_get(profile, url)` is the event-loop counterpart used by async source
+adapters: with httpx installed it goes through one pooled httpx.AsyncClient
+per profile and event loop (same timeout, pool size, rate limits, tracing and
+byte accounting); otherwise, and for cloudscraper profiles whose Cloudflare
+handling only exists on the requests side, the pooled session runs on a
+worker thread.
+
+Tunables (environment):
+    APP_STORE_HTTP_TIMEOUT      default timeout in seconds (30)
+    APP_STORE_HTTP_POOL_SIZE    connections kept per host (16)
+    APP_STORE_HTTP_RETRIES      retries for connection errors / 429 / 5xx (3)
+    APP_STORE_HTTP_BACKOFF      exponential backoff factor in seconds (0.5)
+"""
+
+import asyncio
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core import instrumentation, ratelimit, tracing
+
+try:
+    import httpx
+except ImportError:  # optional: async requests fall back to worker threads
+    httpx = None
+
+
+DEFAULT_TIMEOUT = float(os.getenv("APP_STORE_HTTP_TIMEOUT", "") or 30)
+POOL_SIZE = int(os.getenv("APP_STORE_HTTP_POOL_SIZE", "") or 16)
+RETRIES = int(os.getenv("APP_STORE_HTTP_RETRIES", "") or 3)
+BACKOFF = float(os.getenv("APP_STORE_HTTP_BACKOFF", "") or 0.5)
+
+# 503 is left out on purpose: cloudscraper answers Cloudflare challenges served with 503.
+RETRY_STATUSES = (429, 500, 502, 504)
+
+_sessions: dict[str, requests.Session] = {}
+_async_clients: dict[tuple[str, int], "httpx.AsyncClient"] = {}
+_lock = threading.Lock()
+
+
+def _retry_policy() -> Retry:
+    return Retry(
+        total=RETRIES,
+        connect=RETRIES,
+        read=RETRIES,
+        status=RETRIES,
+        backoff_factor=BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _configure(session: requests.Session, timeout: float):
+    """Apply pool sizes, retries and a default timeout to `session` in place."""
+    retry = _retry_policy()
+    for prefix in ("https://", "http://"):
+        adapter = session.adapters.get(prefix)
+        if type(adapter) is HTTPAdapter or adapter is None:
+            session.mount(prefix, HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE,
+                                              max_retries=retry))
+            continue
+        # Keep custom adapters (cloudscraper's TLS cipher adapter) and only resize them.
+        adapter.max_retries = retry
+        adapter._pool_connections = POOL_SIZE
+        adapter._pool_maxsize = POOL_SIZE
+        adapter.init_poolmanager(POOL_SIZE, POOL_SIZE, block=adapter._pool_block)
+
+    send = session.request
+
+    def request(method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = timeout
+        host = urlparse(url).hostname
+        ratelimit.acquire(host)
+        with tracing.span(f"{method} {host}", "http", url=url) as args:
+            response = send(method, url, **kwargs)
+            if args is not None:
+                args["status"] = getattr(response, "status_code", None)
+        _count_received(response)
+        return response
+
+    session.request = request
+
+
+def _count_received(response):
+    """Feed body bytes into core.instrumentation, without forcing streamed bodies to load."""
+    content = getattr(response, "_content", None)
+    if isinstance(content, bytes):
+        instrumentation.add_net_bytes(len(content))
+        return
+    raw = getattr(response, "raw", None)
+    read = getattr(raw, "read", None)
+    if not callable(read):
+        return
+
+    def counting_read(*args, **kwargs):
+        data = read(*args, **kwargs)
+        if data:
+            instrumentation.add_net_bytes(len(data))
+        return data
+
+    try:
+        raw.read = counting_read
+    except AttributeError:
+        pass
+
+
+def _create(scraper: bool, browser: dict | None) -> requests.Session:
+    if not scraper:
+        return requests.Session()
+    import cloudscraper
+    if browser:
+        return cloudscraper.create_scraper(browser=browser)
+    return cloudscraper.create_scraper()
+
+
+def get_session(profile: str = "default", scraper: bool = False, browser: dict | None = None,
+                timeout: float | None = None) -> requests.Session:
+    """
+    Return the pooled session for `profile`, creating it on first use.
+
+    Args:
+        profile: Cache key, usually the source name. Sessions with different
+            default headers or cookies should use different profiles.
+        scraper: Create a cloudscraper session (Cloudflare-aware) instead of a
+            plain requests.Session.
+        browser: cloudscraper browser filter, e.g. {"browser": "chrome", ...}.
+        timeout: Default timeout for requests that do not pass one.
+    """
+    session = _sessions.get(profile)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(profile)
+        if session is None:
+            session = _create(scraper, browser)
+            _configure(session, timeout or DEFAULT_TIMEOUT)
+            _sessions[profile] = session
+    return session
+
+
+def download_to_file(url: str, path: str, session: requests.Session | None = None,
+                     chunk_size: int = 1024 * 1024):
+    """Stream `url` to `path` through a pooled session, raising on HTTP errors."""
+    session = session or get_session()
+    with session.get(url, stream=True, allow_redirects=True) as response:
+        response.raise_for_status()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def _async_client(profile: str, timeout: float | None) -> "httpx.AsyncClient":
+    # httpx clients are bound to the event loop that first used them.
+    key = (profile, id(asyncio.get_running_loop()))
+    client = _async_clients.get(key)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=timeout or DEFAULT_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            transport=httpx.AsyncHTTPTransport(retries=RETRIES),
+        )
+        _async_clients[key] = client
+    return client
+
+
+async def async_get(profile: str, url: str, timeout: float | None = None, **kwargs):
+    """
+    GET `url` for source `profile` without blocking the event loop.
+
+    Returns an httpx.Response, or a requests.Response when the request ran on
+    the pooled session (both offer status_code, headers, content, json() and
+    raise_for_status()).
+    """
+    session = _sessions.get(profile)
+    if httpx is None or (session is not None and type(session) is not requests.Session):
+        session = session or get_session(profile)
+        return await asyncio.to_thread(session.get, url, timeout=timeout, **kwargs)
+
+    host = urlparse(url).hostname
+    await ratelimit.acquire_async(host)
+    with tracing.async_span(f"GET {host}", "http", url=url) as args:
+        response = await _async_client(profile, timeout).get(url, **kwargs)
+        if args is not None:
+            args["status"] = response.status_code
+    instrumentation.add_net_bytes(len(response.content))
+    return response
+
+
+async def close_async_clients():
+    """Close the httpx clients created on the running event loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [key for key in _async_clients if key[1] == loop_id]:
+        await _async_clients.pop(key).aclose()
+
+
+def close_sessions():
+    """Close and forget every pooled session."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _forget_after_fork():
+    # A forked worker (run.py --jobs) must not share sockets with its parent.
+    global _lock
+    _sessions.clear()
+    _async_clients.clear()
+    _lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_after_fork)
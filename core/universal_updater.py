@@ -5,17 +5,22 @@ Updater injector for decompiled APKs.
 from __future__ import annotations
 
 import os
-import re
 import shutil
 import xml.etree.ElementTree as ET
 
+from core.patch_session import PatchSession
+from core.smali import SmaliClass
 from core.repository import resolve_repository
 
 
-def _get_package_name(manifest_path: str) -> str | None:
+# Lifecycle methods to inject into, in order of preference.
+_LIFECYCLE_METHODS = ("onCreate(Landroid/os/Bundle;)V", "onResume()V", "onStart()V")
+
+
+def _get_package_name(session: PatchSession, manifest_path: str) -> str | None:
     """Return the Android package name from AndroidManifest.xml."""
     try:
-        tree = ET.parse(manifest_path)
+        tree = session.parse_xml(manifest_path)
         root = tree.getroot()
         return root.get("package")
     except Exception as exc:
@@ -23,10 +28,10 @@ def _get_package_name(manifest_path: str) -> str | None:
         return None
 
 
-def _get_main_activity_smali_path(manifest_path: str) -> str | None:
+def _get_main_activity_smali_path(session: PatchSession, manifest_path: str) -> str | None:
     """Return the main launcher activity as a smali relative path."""
     try:
-        tree = ET.parse(manifest_path)
+        tree = session.parse_xml(manifest_path)
         root = tree.getroot()
         ns = {"android": "http://schemas.android.com/apk/res/android"}
 
@@ -84,6 +89,7 @@ def _next_smali_classes_dir(decompiled_dir: str) -> str:
 
 
 def _copy_payload_and_replace_placeholders(
+    session: PatchSession,
     decompiled_dir: str,
     payload_dir: str,
     provider_authority: str,
@@ -104,10 +110,13 @@ def _copy_payload_and_replace_placeholders(
     try:
         next_smali_dir = _next_smali_classes_dir(decompiled_dir)
         dst_smali_root = os.path.join(decompiled_dir, next_smali_dir, "storeautoupdater")
-        shutil.copytree(src_updater_files, dst_smali_root, dirs_exist_ok=True)
 
         dst_res = os.path.join(decompiled_dir, "res")
-        shutil.copytree(src_res, dst_res, dirs_exist_ok=True)
+        copied = shutil.copytree(src_res, dst_res, dirs_exist_ok=True)
+        for root, _, files in os.walk(src_res):
+            for filename in files:
+                rel_path = os.path.relpath(os.path.join(root, filename), src_res)
+                session.invalidate(os.path.join(copied, rel_path))
 
         replacements = {
             "__PROVIDER_AUTHORITY__": provider_authority,
@@ -116,19 +125,22 @@ def _copy_payload_and_replace_placeholders(
             "__RELEASE_DOWNLOAD_MIDDLE__": download_middle,
         }
 
-        for root, _, files in os.walk(dst_smali_root):
+        # The smali payload goes straight into the session with its placeholders filled in.
+        for root, _, files in os.walk(src_updater_files):
             for filename in files:
+                src_path = os.path.join(root, filename)
+                dst_path = os.path.join(dst_smali_root, os.path.relpath(src_path, src_updater_files))
                 if not filename.endswith(".smali"):
+                    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                    shutil.copy2(src_path, dst_path)
                     continue
-                smali_path = os.path.join(root, filename)
-                with open(smali_path, "r", encoding="utf-8") as smali_file:
+                with open(src_path, "r", encoding="utf-8") as smali_file:
                     content = smali_file.read()
 
                 for old, new in replacements.items():
                     content = content.replace(old, new)
 
-                with open(smali_path, "w", encoding="utf-8") as smali_file:
-                    smali_file.write(content)
+                session.write(dst_path, content)
 
         print(f"[+] Updater payload copied to {next_smali_dir}/storeautoupdater.")
         return True
@@ -137,10 +149,9 @@ def _copy_payload_and_replace_placeholders(
         return False
 
 
-def _patch_manifest(manifest_path: str, provider_authority: str) -> bool:
+def _patch_manifest(session: PatchSession, manifest_path: str, provider_authority: str) -> bool:
     try:
-        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
-            manifest_content = manifest_file.read()
+        manifest_content = session.read(manifest_path)
 
         if "android.permission.REQUEST_INSTALL_PACKAGES" not in manifest_content:
             if "<application" not in manifest_content:
@@ -174,9 +185,7 @@ def _patch_manifest(manifest_path: str, provider_authority: str) -> bool:
                 1,
             )
 
-        with open(manifest_path, "w", encoding="utf-8") as manifest_file:
-            manifest_file.write(manifest_content)
-
+        session.write(manifest_path, manifest_content)
         print("[+] AndroidManifest.xml updated for updater.")
         return True
     except Exception as exc:
@@ -202,10 +211,9 @@ def _find_activity_file(decompiled_dir: str, activity_smali_path: str) -> str |
     return None
 
 
-def _inject_updater_call(activity_file_path: str) -> bool:
+def _inject_updater_call(session: PatchSession, activity_file_path: str) -> bool:
     try:
-        with open(activity_file_path, "r", encoding="utf-8") as activity_file:
-            content = activity_file.read()
+        content = session.read(activity_file_path)
     except Exception as exc:
         print(f"[-] Failed to read activity file: {exc}")
         return False
@@ -220,41 +228,23 @@ def _inject_updater_call(activity_file_path: str) -> bool:
         "    # --- END INJECTION ---\n\n    "
     )
 
-    methods_to_check = [
-        r"(\.method.*?onCreate\(Landroid/os/Bundle;\)V)(.*?)(\.end method)",
-        r"(\.method.*?onResume\(\)V)(.*?)(\.end method)",
-        r"(\.method.*?onStart\(\)V)(.*?)(\.end method)",
-    ]
-
-    import re
-    for pattern in methods_to_check:
-        method_pattern = re.compile(pattern, re.DOTALL)
-        match = method_pattern.search(content)
-        if match:
-            method_body = match.group(2)
-            last_return_idx = method_body.rfind("return-void")
+    smali_class = SmaliClass(content, activity_file_path)
+    for signature in _LIFECYCLE_METHODS:
+        method = smali_class.method(signature)
+        if method:
+            last_return_idx = method.rfind("return-void")
             if last_return_idx != -1:
-                new_method_body = method_body[:last_return_idx] + updater_call + method_body[last_return_idx:]
-                new_method = match.group(1) + new_method_body + match.group(3)
-                new_content = content.replace(match.group(0), new_method, 1)
-                try:
-                    with open(activity_file_path, "w", encoding="utf-8") as f:
-                        f.write(new_content)
-                    print(f"[+] Updater call injected successfully into {os.path.basename(activity_file_path)}")
-                    return True
-                except Exception as exc:
-                    print(f"[-] Failed to write activity file: {exc}")
-                    return False
+                new_content = smali_class.insert(last_return_idx, updater_call)
+                session.write(activity_file_path, new_content)
+                print(f"[+] Updater call injected successfully into {os.path.basename(activity_file_path)}")
+                return True
 
     print("[i] Standard lifecycle methods not found. Generating onResume()...")
-    super_pattern = re.compile(r"\.super\s+(L[^;]+;)")
-    super_match = super_pattern.search(content)
-    if not super_match:
+    super_class = smali_class.super_class
+    if not super_class:
         print("[-] Could not find .super class in MainActivity.")
         return False
     
-    super_class = super_match.group(1)
-    
     injected_method = f"""
 .method protected onResume()V
     .locals 0
@@ -269,14 +259,9 @@ def _inject_updater_call(activity_file_path: str) -> bool:
 .end method
 """
     new_content = content + "\n" + injected_method
-    try:
-        with open(activity_file_path, "w", encoding="utf-8") as f:
-            f.write(new_content)
-        print(f"[+] Updater call and onResume injected successfully into {os.path.basename(activity_file_path)}")
-        return True
-    except Exception as exc:
-        print(f"[-] Failed to write activity file: {exc}")
-        return False
+    session.write(activity_file_path, new_content)
+    print(f"[+] Updater call and onResume injected successfully into {os.path.basename(activity_file_path)}")
+    return True
 
 
 def _normalize_smali_path(smali_path: str | None) -> str | None:
@@ -298,23 +283,34 @@ def inject_universal_updater(
     app_id: str,
     payload_dir: str | None = None,
     target_activity_smali: str | None = None,
+    session: PatchSession | None = None,
 ) -> bool:
     """
     Inject updater payload and startup hook into an APK decompile.
+
+    Changes go through `session` when given (flushed by the caller);
+    otherwise they are written before returning.
     """
+    if session is None:
+        session = PatchSession(decompiled_dir)
+        try:
+            return inject_universal_updater(decompiled_dir, app_id, payload_dir, target_activity_smali, session)
+        finally:
+            session.flush()
+
     manifest_path = os.path.join(decompiled_dir, "AndroidManifest.xml")
-    if not os.path.isfile(manifest_path):
+    if not session.exists(manifest_path):
         print("[-] CRITICAL: AndroidManifest.xml not found. Cannot inject updater.")
         return False
 
-    package_name = _get_package_name(manifest_path)
+    package_name = _get_package_name(session, manifest_path)
     if not package_name:
         print("[-] CRITICAL: Failed to get package name. Aborting updater injection.")
         return False
 
     main_activity_smali = _normalize_smali_path(target_activity_smali)
     if not main_activity_smali:
-        main_activity_smali = _get_main_activity_smali_path(manifest_path)
+        main_activity_smali = _get_main_activity_smali_path(session, manifest_path)
     if not main_activity_smali:
         print("[-] CRITICAL: Could not detect Main Activity automatically.")
         return False
@@ -341,6 +337,7 @@ def inject_universal_updater(
         return False
 
     if not _copy_payload_and_replace_placeholders(
+        session=session,
         decompiled_dir=decompiled_dir,
         payload_dir=payload_dir,
         provider_authority=provider_authority,
@@ -350,7 +347,7 @@ def inject_universal_updater(
     ):
         return False
 
-    if not _patch_manifest(manifest_path, provider_authority):
+    if not _patch_manifest(session, manifest_path, provider_authority):
         return False
 
     main_activity_file = _find_activity_file(decompiled_dir, main_activity_smali)
@@ -358,7 +355,7 @@ def inject_universal_updater(
         print(f"[-] Error: Failed to locate {main_activity_smali}.")
         return False
 
-    if not _inject_updater_call(main_activity_file):
+    if not _inject_updater_call(session, main_activity_file):
         return False
 
     print("[+] Universal updater injected successfully.")
@@ -29,8 +29,12 @@ def update_version(version_file: str, new_version: str):
 
 
 def update_status(status_file: str, success: bool, failed_version: str = "",
-                  error_message: str = ""):
-    """Write build status to the per-app status file."""
+                  error_message: str = "", artifact: dict | None = None):
+    """Write build status to the per-app status file.
+
+    `artifact` is the upstream package's integrity metadata (sha256, size, ...),
+    recorded for successful builds.
+    """
     import datetime
     os.makedirs(os.path.dirname(status_file), exist_ok=True)
     status = {
@@ -39,6 +43,8 @@ def update_status(status_file: str, success: bool, failed_version: str = "",
         "error_message": error_message,
         "updated_at": datetime.datetime.utcnow().strftime("%a %b %d %H:%M:%S UTC %Y"),
     }
+    if artifact:
+        status["artifact"] = artifact
     with open(status_file, "w", encoding="utf-8") as f:
         json.dump(status, f)
 
@@ -128,6 +134,7 @@ def run_apk_mitm(apk_path: str):
     Requires apk-mitm to be installed (npm install -g apk-mitm).
     """
     import subprocess
+    from core.tracing import run_subprocess
     import shutil
 
     if not os.path.exists(apk_path):
@@ -144,7 +151,7 @@ def run_apk_mitm(apk_path: str):
     try:
         # apk-mitm <path-to-apk>
         # It typically produces <original>-patched.apk
-        result = subprocess.run(["apk-mitm", apk_path], check=True)
+        result = run_subprocess(["apk-mitm", apk_path], check=True)
         
         # Determine the output filename
         # apk-mitm logic: if input is app.apk, output is app-patched.apk
@@ -173,8 +180,8 @@ def generate_download_stats(repo_name: str = "cfopuser/app-store", output_file:
     Fetch all releases from GitHub and aggregate download counts per app.
     Only counts .apk assets.
     """
-    import requests
-    
+    from core.sources.github import API_URL, api_get
+
     print(f"[*] Fetching release statistics for {repo_name}...")
     
     app_ids = discover_apps()
@@ -184,14 +191,9 @@ def generate_download_stats(repo_name: str = "cfopuser/app-store", output_file:
     page = 1
     total_releases_processed = 0
     
-    headers = {}
-    token = os.environ.get("GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"token {token}"
-        
     while True:
-        url = f"https://api.github.com/repos/{repo_name}/releases?per_page=100&page={page}"
-        response = requests.get(url, headers=headers)
+        url = f"{API_URL}/repos/{repo_name}/releases?per_page=100&page={page}"
+        response = api_get(url)
         if response.status_code != 200:
             print(f"[-] Failed to fetch releases: {response.status_code} {response.text}")
             break
@@ -242,23 +244,19 @@ def generate_releases_index(repo_name: str = "cfopuser/app-store", output_file:
 
     Must be run in CI where GITHUB_TOKEN is available (5 000 req/h).
     """
-    import requests
+    from core.sources.github import API_URL, api_get
 
     print(f"[*] Generating releases index for {repo_name}...")
 
-    headers = {"Accept": "application/vnd.github+json"}
-    token = os.environ.get("GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"token {token}"
-    else:
+    if not os.environ.get("GITHUB_TOKEN"):
         print("[!] Warning: No GITHUB_TOKEN set — may hit rate limits.")
 
     all_releases = []
     page = 1
 
     while True:
-        url = f"https://api.github.com/repos/{repo_name}/releases?per_page=100&page={page}"
-        resp = requests.get(url, headers=headers)
+        url = f"{API_URL}/repos/{repo_name}/releases?per_page=100&page={page}"
+        resp = api_get(url)
         if resp.status_code != 200:
             print(f"[-] Failed to fetch releases page {page}: {resp.status_code} {resp.text}")
             break
@@ -7,10 +7,21 @@ Usage:
     python run.py --app bit                 # Process only the 'bit' app
     python run.py --app bit --step download # Only run the download step
     python run.py --list                    # List all registered apps
+    python run.py --jobs 4                  # Process apps in 4 parallel workers
+    python run.py --check-only              # Write update_plan.json, download nothing
+    python run.py --trace trace.json        # Also write a Perfetto/Chrome trace of the run
 """
 
 import argparse
+import asyncio
+import atexit
+import datetime
+import json
+import os
+import shutil
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from core.utils import (
     discover_apps,
@@ -23,18 +34,25 @@ from core.utils import (
     generate_download_stats,
     generate_releases_index,
 )
-from core.downloader import DownloadError, download_app
+from core.downloader import DownloadError, async_check_for_update, download_app, read_artifact_meta
 from core.pre_patcher import run_pre_patch
 from core.patcher import run_patch
+from core.parallel_rewrite import WORKERS_ENV as PATCH_WORKERS_ENV
+from core.instrumentation import run_report, stage
+from core import tracing
+from core.transport import close_async_clients
 
 
-def process_app(app_id: str, step: str = "all", no_mitm: bool = False) -> bool:
+def process_app(app_id: str, step: str = "all", no_mitm: bool = False,
+                work_dir: str | None = None) -> bool:
     """
     Run the pipeline for a single app.
 
     Args:
         app_id: The app identifier (subfolder name under apps/).
         step: Which step to run — 'download', 'patch', or 'all'.
+        work_dir: Optional private directory for the APK and decompiled tree.
+            Defaults to the shared CI names in the current directory.
 
     Returns:
         True if the step(s) completed successfully.
@@ -49,6 +67,15 @@ def process_app(app_id: str, step: str = "all", no_mitm: bool = False) -> bool:
         print(f"[-] {e}")
         return False
 
+    # Per-stage timings go next to status.json (see core/instrumentation.py).
+    report_path = os.path.join(os.path.dirname(config["status_file"]), "run_report.json")
+    with tracing.span(app_id, "app", step=step), run_report(app_id, report_path, step=step):
+        return _run_pipeline(app_id, config, step, no_mitm, work_dir)
+
+
+def _run_pipeline(app_id: str, config: dict, step: str, no_mitm: bool,
+                  work_dir: str | None) -> bool:
+    """The download and patch steps of process_app, one instrumented stage each."""
     # Variables to track version state
     new_version = None
     update_needed = False
@@ -56,9 +83,12 @@ def process_app(app_id: str, step: str = "all", no_mitm: bool = False) -> bool:
     # --- Download step ---
     # Use a consistent name so the GitHub Action workflow knows what to look for
     output_filename = "latest.apk"
+    if work_dir:
+        output_filename = os.path.join(work_dir, output_filename)
     if step in ("download", "all"):
         try:
-            update_needed, new_version = download_app(config, output_filename=output_filename)
+            with stage("download"):
+                update_needed, new_version = download_app(config, output_filename=output_filename)
         except DownloadError as e:
             print(f"[-] [{app_id}] {e}")
             update_status(
@@ -84,6 +114,9 @@ def process_app(app_id: str, step: str = "all", no_mitm: bool = False) -> bool:
 
         if new_version:
             set_github_output("new_version", new_version)
+            artifact = read_artifact_meta(output_filename)
+            if artifact:
+                set_github_output("upstream_sha256", artifact["sha256"])
 
         if not update_needed:
             print(f"[i] [{app_id}] No update needed. Done.")
@@ -91,12 +124,14 @@ def process_app(app_id: str, step: str = "all", no_mitm: bool = False) -> bool:
 
         if not no_mitm and not config.get("skip_mitm", False):
             # Run MITM and check success
-            mitm_success = run_apk_mitm(output_filename)
+            with stage("apk-mitm"):
+                mitm_success = run_apk_mitm(output_filename)
             if not mitm_success:
                 print(f"[-] [{app_id}] apk-mitm failed. Aborting to prevent bad patch.")
                 return False
 
-        pre_patch_success = run_pre_patch(app_id, output_filename)
+        with stage("pre-patch"):
+            pre_patch_success = run_pre_patch(app_id, output_filename)
         if not pre_patch_success:
             print(f"[-] [{app_id}] Pre-patching failed. Aborting.")
             return False
@@ -108,7 +143,10 @@ def process_app(app_id: str, step: str = "all", no_mitm: bool = False) -> bool:
     if step in ("patch", "all"):
         # In CI the decompiled directory is always "build_output"
         decompiled_dir = "build_output"
-        success = run_patch(app_id, decompiled_dir)
+        if work_dir:
+            decompiled_dir = os.path.join(work_dir, decompiled_dir)
+        with stage("patch"):
+            success = run_patch(app_id, decompiled_dir)
 
         if not success:
             update_status(
@@ -121,7 +159,11 @@ def process_app(app_id: str, step: str = "all", no_mitm: bool = False) -> bool:
             return False
 
         # If we are here, patch was successful.
-        update_status(config["status_file"], success=True)
+        update_status(
+            config["status_file"],
+            success=True,
+            artifact=read_artifact_meta(output_filename),
+        )
         
         # If running locally in 'all' mode, update the version file now.
         # In CI, this is handled by the workflow file after the APK is signed.
@@ -135,6 +177,151 @@ def process_app(app_id: str, step: str = "all", no_mitm: bool = False) -> bool:
     return True
 
 
+def _read_github_outputs(outputs_file: str) -> list[tuple[str, str]]:
+    """Parse a GITHUB_OUTPUT-style file into ordered (key, value) pairs."""
+    if not os.path.exists(outputs_file):
+        return []
+    outputs = []
+    with open(outputs_file, "r", encoding="utf-8") as f:
+        for line in f:
+            key, sep, value = line.rstrip("\n").partition("=")
+            if sep:
+                outputs.append((key, value))
+    return outputs
+
+
+def _process_app_isolated(app_id: str, step: str, no_mitm: bool,
+                          work_root: str) -> tuple[bool, list[tuple[str, str]]]:
+    """
+    Worker entry point for --jobs: run one app inside its own working directory.
+
+    GitHub outputs are captured into a per-app file instead of the shared
+    GITHUB_OUTPUT, so the parent can replay them per app in a deterministic order.
+    """
+    work_dir = os.path.join(work_root, app_id)
+    os.makedirs(work_dir, exist_ok=True)
+
+    outputs_file = os.path.join(work_dir, "github_output")
+    if os.path.exists(outputs_file):
+        os.remove(outputs_file)
+    os.environ["GITHUB_OUTPUT"] = outputs_file
+    tracing.set_process_name(f"worker {os.getpid()}")
+
+    try:
+        success = process_app(app_id, step=step, no_mitm=no_mitm, work_dir=work_dir)
+    except Exception as e:
+        print(f"[-] [{app_id}] Worker crashed: {e}")
+        success = False
+
+    return success, _read_github_outputs(outputs_file)
+
+
+def run_parallel(app_ids: list[str], step: str, no_mitm: bool, jobs: int,
+                 work_root: str) -> dict[str, bool]:
+    """
+    Process independent apps in worker processes, one working directory each.
+
+    Returns:
+        Mapping of app_id -> success, in the same order as app_ids.
+    """
+    print(f"[*] Running {len(app_ids)} apps with {jobs} parallel workers (work dir: {work_root})")
+    # Split the cores between apps so their patch-rewrite pools do not oversubscribe.
+    os.environ.setdefault(PATCH_WORKERS_ENV, str(max(1, (os.cpu_count() or 1) // jobs)))
+
+    results = {}
+    outputs = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(_process_app_isolated, app_id, step, no_mitm, work_root): app_id
+            for app_id in app_ids
+        }
+        for future in as_completed(futures):
+            app_id = futures[future]
+            try:
+                results[app_id], outputs[app_id] = future.result()
+            except Exception as e:
+                print(f"[-] [{app_id}] Worker process failed: {e}")
+                results[app_id], outputs[app_id] = False, []
+
+    # Replay outputs in app order so the merged result does not depend on
+    # which worker happened to finish first. Every app sets the same keys, so
+    # they are prefixed with the app id (`<app_id>_new_version`) and also
+    # collected into one JSON map for fromJson().
+    app_outputs = {}
+    for app_id in app_ids:
+        for key, value in outputs[app_id]:
+            set_github_output(f"{app_id}_{key}", value)
+            app_outputs.setdefault(app_id, {})[key] = value
+    set_github_output("app_outputs", json.dumps(app_outputs))
+
+    return {app_id: results[app_id] for app_id in app_ids}
+
+
+async def _check_single_app(app_id: str, limit: asyncio.Semaphore) -> dict:
+    """Version-check one app for the update plan; errors are recorded, not raised."""
+    entry = {
+        "app_id": app_id,
+        "source": None,
+        "local_version": None,
+        "remote_version": None,
+        "update_needed": False,
+        "error": None,
+    }
+    try:
+        config = load_app_config(app_id)
+        async with limit:
+            with tracing.async_span(app_id, "app", step="check"):
+                entry.update(await async_check_for_update(config))
+    except Exception as e:
+        print(f"[-] [{app_id}] Version check failed: {e}")
+        entry["error"] = str(e)
+    return entry
+
+
+async def _check_all(app_ids: list[str], max_workers: int) -> list[dict]:
+    limit = asyncio.Semaphore(max_workers)
+    try:
+        return list(await asyncio.gather(*(_check_single_app(app_id, limit) for app_id in app_ids)))
+    finally:
+        await close_async_clients()
+
+
+def check_updates(app_ids: list[str], max_workers: int,
+                  plan_file: str = "update_plan.json") -> dict:
+    """
+    Run every app's version check on one event loop, at most `max_workers`
+    at a time, and write a JSON update plan.
+
+    Nothing is downloaded; CI can use the plan to build only changed apps.
+    Apps whose version cannot be known without a download (update_needed
+    None, listed under "unknown") are fanned out with the updates so the
+    download step decides for them.
+
+    Returns:
+        The plan dict that was written to plan_file.
+    """
+    print(f"[*] Checking {len(app_ids)} apps for updates ({max_workers} concurrent checks)...")
+
+    entries = asyncio.run(_check_all(app_ids, max_workers))
+
+    plan = {
+        "generated_at": datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "apps": entries,
+        "updates": [e["app_id"] for e in entries if e["update_needed"]],
+        "unknown": [e["app_id"] for e in entries if e["update_needed"] is None and not e["error"]],
+        "errors": [e["app_id"] for e in entries if e["error"]],
+    }
+
+    with open(plan_file, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+
+    print(f"[+] Update plan saved to {plan_file}: "
+          f"{len(plan['updates'])} to update, {len(plan['unknown'])} unknown, "
+          f"{len(plan['errors'])} failed checks")
+    set_github_output("apps_to_update", json.dumps(plan["updates"] + plan["unknown"]))
+    return plan
+
+
 def list_apps():
     """Print all registered apps and their metadata."""
     app_ids = discover_apps()
@@ -159,6 +346,12 @@ def list_apps():
             print(f"  [{app_id}] Error: {e}\n")
 
 
+def _write_trace(trace_dir: str, out_path: str):
+    count = tracing.merge(trace_dir, out_path)
+    shutil.rmtree(trace_dir, ignore_errors=True)
+    print(f"[i] Trace with {count} events written to {out_path} (open in ui.perfetto.dev)")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Modular APK Patching Framework",
@@ -169,6 +362,9 @@ Examples:
   python run.py --app bit                 Process only 'bit'
   python run.py --app bit --step download Only download
   python run.py --list                    List registered apps
+  python run.py --jobs 4                  Process all apps, 4 at a time
+  python run.py --check-only              Only check versions, write update_plan.json
+  python run.py --trace trace.json        Write a trace for ui.perfetto.dev
         """,
     )
     parser.add_argument(
@@ -196,6 +392,38 @@ Examples:
         action="store_true",
         help="Skip running apk-mitm on the downloaded APK",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of apps to process in parallel worker processes (default: 1)",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default="workspace",
+        help="Root for per-app working directories when --jobs > 1 (default: workspace)",
+    )
+    parser.add_argument(
+        "--check-only",
+        action="store_true",
+        help="Only check remote versions concurrently and write an update plan (no downloads)",
+    )
+    parser.add_argument(
+        "--plan-file",
+        default="update_plan.json",
+        help="Where --check-only writes the JSON update plan (default: update_plan.json)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Keep downloaded packages in a content-addressed cache under this directory "
+             "(default: $APP_STORE_CACHE_DIR, disabled if unset)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="OUT_JSON",
+        help="Write a Trace Event Format file (Perfetto / chrome://tracing) of apps, stages, "
+             "HTTP requests, subprocesses and patch functions",
+    )
     parser.add_argument(
         "--update-stats",
         action="store_true",
@@ -209,6 +437,17 @@ Examples:
 
     args = parser.parse_args()
 
+    if args.cache_dir:
+        # Exported so worker processes started by --jobs pick it up too.
+        os.environ["APP_STORE_CACHE_DIR"] = os.path.abspath(args.cache_dir)
+
+    if args.trace:
+        # Every process appends to its own file here; merged into args.trace on exit.
+        trace_dir = tempfile.mkdtemp(prefix="app-store-trace-")
+        os.environ[tracing.TRACE_DIR_ENV] = trace_dir
+        tracing.set_process_name("run.py")
+        atexit.register(_write_trace, trace_dir, args.trace)
+
     if args.list:
         list_apps()
         return
@@ -234,11 +473,26 @@ Examples:
             print("[-] No apps found under apps/. Nothing to do.")
             sys.exit(1)
 
+    if args.check_only:
+        # Version checks are network-bound, so allow more concurrency than --jobs' default.
+        max_workers = args.jobs if args.jobs > 1 else 8
+        check_updates(app_ids, max_workers=min(max_workers, len(app_ids)), plan_file=args.plan_file)
+        return
+
     # Process each app
-    results = {}
-    for app_id in app_ids:
-        success = process_app(app_id, step=args.step, no_mitm=args.no_mitm)
-        results[app_id] = success
+    if args.jobs > 1 and len(app_ids) > 1:
+        results = run_parallel(
+            app_ids,
+            step=args.step,
+            no_mitm=args.no_mitm,
+            jobs=min(args.jobs, len(app_ids)),
+            work_root=os.path.abspath(args.work_dir),
+        )
+    else:
+        results = {}
+        for app_id in app_ids:
+            success = process_app(app_id, step=args.step, no_mitm=args.no_mitm)
+            results[app_id] = success
 
     # Summary
     print(f"\n{'='*50}")
@@ -0,0 +1,80 @@
+import mmap
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from core import anchor_search
+from core.anchor_search import AnchorMatcher
+
+
+class _FakeAutomaton:
+    """Naive stand-in for ahocorasick.Automaton: str input, (end_index, value) hits."""
+
+    def __init__(self):
+        self.words = {}
+
+    def add_word(self, word, value):
+        self.words[word] = value
+
+    def make_automaton(self):
+        pass
+
+    def iter(self, text):
+        assert isinstance(text, str)
+        for start in range(len(text)):
+            for word, value in self.words.items():
+                if text.startswith(word, start):
+                    yield start + len(word) - 1, value
+
+
+@pytest.fixture(params=["automaton", "fake-automaton", "regex"])
+def backend(request, monkeypatch):
+    if request.param == "regex":
+        monkeypatch.setattr(anchor_search, "ahocorasick", None)
+    elif request.param == "fake-automaton":
+        monkeypatch.setattr(anchor_search, "ahocorasick", types.SimpleNamespace(Automaton=_FakeAutomaton))
+    elif anchor_search.ahocorasick is None:
+        pytest.skip("pyahocorasick is not installed")
+
+
+def test_reports_every_hit_including_overlaps_and_prefixes(backend):
+    matcher = AnchorMatcher(["channel", "channel_status", "nels", '"@newsletter"'])
+    data = b'const-string v0, "channel_status" # channels\n"@newsletter"'
+
+    hits = matcher.search(data)
+
+    assert hits["channel"] == [18, data.index(b"channels")]
+    assert hits["channel_status"] == [18]
+    assert hits["nels"] == [data.index(b"nels")]
+    assert hits['"@newsletter"'] == [data.index(b'"@newsletter"')]
+
+
+def test_scans_memory_mapped_files_without_decoding(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(anchor_search, "MMAP_THRESHOLD", 1)
+    small = tmp_path / "a.smali"
+    small.write_bytes(b'\xff\xfe invalid utf-8 "INVOKE_RETURN"')
+    offset = small.read_bytes().index(b'"INVOKE')
+    other = tmp_path / "b.smali"
+    other.write_bytes(b"nothing here")
+
+    with open(small, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert AnchorMatcher(['"INVOKE_RETURN"']).search(mapped) == {'"INVOKE_RETURN"': [offset]}
+
+    results = anchor_search.scan_tree(str(tmp_path), ['"INVOKE_RETURN"', "missing"])
+    assert results == {'"INVOKE_RETURN"': {str(small): [offset]}}
+
+
+def test_chunked_scan_finds_hits_across_chunk_boundaries_once(backend):
+    anchors = ["channel", "channel_status", "nels", "xx"]
+    data = b"..channel_status.channels.xxxx.chan" * 7
+    expected = {
+        anchor: [i for i in range(len(data)) if data.startswith(anchor.encode(), i)]
+        for anchor in anchors
+    }
+
+    for chunk_size in (3, 8, 13, len(data)):
+        assert AnchorMatcher(anchors, chunk_size=chunk_size).search(data) == expected
@@ -24,8 +24,9 @@ def test_aptoide_metadata_parsing():
     response.raise_for_status.return_value = None
     response.json.return_value = payload
 
-    with patch("core.sources.aptoide.requests.get", return_value=response):
-        version, download_url, title = AptoideSource().get_latest_version("com.waze")
+    source = AptoideSource()
+    with patch.object(source.scraper, "get", return_value=response):
+        version, download_url, title = source.get_latest_version("com.waze")
 
     assert version == "4.100.1.0"
     assert download_url == "https://cdn.example.com/waze.apk"
@@ -1,12 +1,15 @@
+import hashlib
 import io
 import os
 import sys
 import zipfile
 from unittest.mock import patch
 
+import pytest
+
 sys.path.append(os.getcwd())
 
-from core.downloader import download_app
+from core.downloader import DownloadError, download_app, read_artifact_meta
 
 
 class _FakeResponse:
@@ -69,3 +72,43 @@ def test_aptoide_download_with_mocked_source(tmp_path):
     assert update_needed is True
     assert new_version == "4.100.1.0"
     assert output_apk.exists()
+
+
+def test_download_verifies_source_checksum_and_records_digest(tmp_path):
+    body = _build_minimal_apk_bytes()
+    app_config = {
+        "name": "Waze Test",
+        "package_name": "com.waze",
+        "source": "aptoide",
+        "version_file": str(tmp_path / "version.txt"),
+    }
+    output_apk = str(tmp_path / "waze_test.apk")
+    fake_source = _FakeSource(body)
+    fake_source.get_expected_digest = lambda _url: f"md5:{hashlib.md5(body).hexdigest()}"
+
+    with patch("core.downloader.create_source", return_value=("aptoide", fake_source, "com.waze")):
+        download_app(app_config, output_filename=output_apk)
+
+    meta = read_artifact_meta(output_apk)
+    assert meta["sha256"] == hashlib.sha256(body).hexdigest()
+    assert meta["verified_digest"].startswith("md5:")
+    assert meta["version"] == "4.100.1.0"
+
+
+def test_download_rejects_checksum_mismatch(tmp_path):
+    app_config = {
+        "name": "Waze Test",
+        "package_name": "com.waze",
+        "source": "aptoide",
+        "version_file": str(tmp_path / "version.txt"),
+    }
+    output_apk = tmp_path / "waze_test.apk"
+    fake_source = _FakeSource(_build_minimal_apk_bytes())
+    fake_source.get_expected_digest = lambda _url: "md5:" + "0" * 32
+
+    with patch("core.downloader.create_source", return_value=("aptoide", fake_source, "com.waze")):
+        with pytest.raises(DownloadError, match="Checksum mismatch"):
+            download_app(app_config, output_filename=str(output_apk))
+
+    assert not output_apk.exists()
+    assert not os.path.exists(str(output_apk) + ".part")
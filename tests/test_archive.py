@@ -0,0 +1,44 @@
+import os
+import sys
+import zipfile
+
+sys.path.append(os.getcwd())
+
+from core.archive import classify_package
+
+
+def _build_zip(path, files: dict[str, str], comment: bytes = b"") -> str:
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+        zf.comment = comment
+    return str(path)
+
+
+def test_classifies_apk_xapk_and_apks(tmp_path):
+    apk = _build_zip(tmp_path / "a.apk", {"AndroidManifest.xml": "<manifest/>", "classes.dex": "x"})
+    xapk = _build_zip(
+        tmp_path / "a.xapk",
+        {"manifest.json": "{}", "base.apk": "b", "config.arm64_v8a.apk": "c", "icon.png": "i"},
+        comment=b"PK\x05\x06 lookalike in the comment",
+    )
+    apks = _build_zip(tmp_path / "a.apks", {"toc.pb": "", "splits/base-master.apk": "b"})
+
+    assert classify_package(apk).kind == "apk"
+    info = classify_package(xapk)
+    assert info.kind == "xapk"
+    assert info.splits == ("base.apk", "config.arm64_v8a.apk")
+    assert classify_package(apks) == ("apks", ("splits/base-master.apk",))
+
+
+def test_rejects_non_zip_and_truncated_archives(tmp_path):
+    junk = tmp_path / "junk.bin"
+    junk.write_bytes(b"<html>blocked</html>")
+    apk = _build_zip(tmp_path / "a.apk", {"AndroidManifest.xml": "<manifest/>"})
+    data = open(apk, "rb").read()
+    truncated = tmp_path / "truncated.apk"
+    truncated.write_bytes(data[:len(data) // 2])
+
+    assert classify_package(str(junk)).kind == "invalid"
+    assert classify_package(str(truncated)).kind == "invalid"
+    assert classify_package(str(tmp_path / "missing.apk")).kind == "invalid"
@@ -0,0 +1,58 @@
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.getcwd())
+
+from core.artifact_cache import ArtifactCache, sha256_file
+from core.downloader import download_app
+
+
+def _write(path, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_store_and_fetch_by_release(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    src = _write(tmp_path / "app.apk", b"apk-bytes")
+
+    sha = cache.store(src, "com.example", "1.2", "aptoide")
+
+    assert sha == sha256_file(src)
+    dest = str(tmp_path / "out" / "latest.apk")
+    assert cache.fetch("com.example", "1.2", "aptoide", dest)
+    assert open(dest, "rb").read() == b"apk-bytes"
+    assert not cache.fetch("com.example", "1.3", "aptoide", dest)
+
+
+def test_least_recently_used_release_is_evicted(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), max_bytes=25)
+    cache.store(_write(tmp_path / "a", b"a" * 10), "pkg", "1", "src")
+    cache.store(_write(tmp_path / "b", b"b" * 10), "pkg", "2", "src")
+    assert cache.lookup("pkg", "1", "src")  # 1 is now more recent than 2
+
+    cache.store(_write(tmp_path / "c", b"c" * 10), "pkg", "3", "src")
+
+    assert cache.lookup("pkg", "1", "src")
+    assert cache.lookup("pkg", "2", "src") is None
+    assert cache.lookup("pkg", "3", "src")
+
+
+def test_download_app_uses_cached_release(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_STORE_CACHE_DIR", str(tmp_path / "cache"))
+    ArtifactCache(str(tmp_path / "cache" / "artifacts")).store(
+        _write(tmp_path / "cached.apk", b"cached"), "com.example", "2.0", "aptoide"
+    )
+    source = MagicMock()
+    source.get_latest_version.return_value = ("2.0", "release", "Example 2.0")
+    config = {"name": "Example", "package_name": "com.example", "source": "aptoide",
+              "version_file": str(tmp_path / "version.txt")}
+    output = str(tmp_path / "latest.apk")
+
+    with patch("core.downloader.create_source", return_value=("aptoide", source, "com.example")):
+        assert download_app(config, output) == (True, "2.0")
+
+    source.get_download_url.assert_not_called()
+    assert open(output, "rb").read() == b"cached"
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+sys.path.append(os.getcwd())
+
+from core import transport
+from core.downloader import async_check_for_update
+from core.sources import AsyncSource, as_async
+from core.sources.github import GitHubSource
+from core.sources.registry import SyncSourceAdapter
+
+
+class _JSONResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        return None
+
+    def json(self):
+        return self._data
+
+
+class _BlockingSource:
+    def __init__(self):
+        self.threads = []
+
+    def get_latest_version(self, lookup):
+        self.threads.append(threading.get_ident())
+        return "1.1", f"https://example.com/{lookup}", lookup
+
+    def get_download_url(self, release_url):
+        return release_url
+
+
+def test_sync_sources_are_shimmed_and_native_ones_used_directly(tmp_path):
+    blocking = _BlockingSource()
+    shim = as_async(blocking)
+    assert isinstance(shim, SyncSourceAdapter) and shim.get_download_url("x") == "x"
+    github = GitHubSource()
+    assert isinstance(github, AsyncSource) and as_async(github) is github
+
+    async def fake_get(profile, url, **_kwargs):
+        assert profile == "github" and url.endswith("/owner/repo/releases/latest")
+        return _JSONResponse({"tag_name": "v2.0", "assets": [
+            {"name": "app.apk", "browser_download_url": "https://example.com/app.apk", "digest": "sha256:ab"},
+        ]})
+
+    configs = [
+        {"name": "Meld", "repo": "owner/repo", "source": "github", "version_file": str(tmp_path / "a.txt")},
+        {"name": "Demo", "package_name": "com.demo", "source": "aptoide", "version_file": str(tmp_path / "b.txt")},
+    ]
+
+    async def check_all():
+        return await asyncio.gather(*(async_check_for_update(config) for config in configs))
+
+    def create(name, config):
+        source = github if name == "github" else blocking
+        return name, source, config.get("repo") or config["package_name"]
+
+    with patch("core.sources.github.async_get", new=fake_get), \
+            patch("core.downloader.create_source", side_effect=create):
+        meld, demo = asyncio.run(check_all())
+
+    assert meld["remote_version"] == "2.0" and meld["update_needed"] is True
+    assert github.get_expected_digest("https://example.com/app.apk") == "sha256:ab"
+    assert demo["source"] == "aptoide" and demo["remote_version"] == "1.1"
+    assert blocking.threads and blocking.threads[0] != threading.get_ident()
+
+
+def test_async_get_without_httpx_uses_pooled_session_on_a_thread(monkeypatch):
+    calls = []
+
+    class _Session:
+        def get(self, url, **kwargs):
+            calls.append((threading.get_ident(), url, kwargs))
+            return "response"
+
+    monkeypatch.setattr(transport, "httpx", None)
+    monkeypatch.setitem(transport._sessions, "async-test", _Session())
+
+    result = asyncio.run(transport.async_get("async-test", "https://example.com/api", params={"q": 1}))
+
+    assert result == "response"
+    assert calls[0][1] == "https://example.com/api" and calls[0][2]["params"] == {"q": 1}
+    assert calls[0][0] != threading.get_ident()
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import sys
+from unittest.mock import Mock, patch
+
+sys.path.append(os.getcwd())
+
+import run
+from core.downloader import async_check_for_update, check_for_update
+from core.sources import apkeep
+from core.sources.apkeep import ApkeepSource
+
+
+def test_check_updates_writes_plan_without_downloading(tmp_path, monkeypatch):
+    monkeypatch.delenv("GITHUB_OUTPUT", raising=False)
+    configs = {
+        "waze": {"name": "Waze"},
+        "bit": {"name": "Bit"},
+        "broken": {"name": "Broken"},
+        "egg": {"name": "Egg"},
+    }
+
+    async def fake_check(config):
+        if config["name"] == "Broken":
+            raise RuntimeError("source down")
+        if config["name"] == "Egg":
+            return {"source": "apkeep", "local_version": "1.0", "remote_version": "unknown", "update_needed": None}
+        newer = config["name"] == "Waze"
+        return {
+            "source": "aptoide",
+            "local_version": "1.0",
+            "remote_version": "1.1" if newer else "1.0",
+            "update_needed": newer,
+        }
+
+    plan_file = tmp_path / "plan.json"
+    outputs = {}
+    with (
+        patch("run.set_github_output", side_effect=outputs.__setitem__),
+        patch("run.load_app_config", side_effect=lambda app_id: configs[app_id]),
+        patch("run.async_check_for_update", new=fake_check),
+        patch("run.download_app") as download_mock,
+    ):
+        run.check_updates(["waze", "bit", "broken", "egg"], max_workers=3, plan_file=str(plan_file))
+
+    download_mock.assert_not_called()
+    plan = json.loads(plan_file.read_text(encoding="utf-8"))
+    assert [e["app_id"] for e in plan["apps"]] == ["waze", "bit", "broken", "egg"]
+    assert plan["updates"] == ["waze"]
+    assert plan["unknown"] == ["egg"]
+    assert plan["errors"] == ["broken"]
+    # Apps with an unknown version still go through the download-based check.
+    assert json.loads(outputs["apps_to_update"]) == ["waze", "egg"]
+    assert plan["apps"][2]["error"] == "source down"
+
+
+def test_apkeep_does_not_download_when_play_hides_the_version(tmp_path, monkeypatch):
+    page = Mock(content=b"<html>Varies with device</html>")
+    monkeypatch.setattr(apkeep, "get_session", lambda _profile: Mock(get=Mock(return_value=page)))
+    source = ApkeepSource.__new__(ApkeepSource)
+    source.check_only = False
+    source._download_universal_xapk = Mock(side_effect=RuntimeError("downloaded"))
+    app_config = {"name": "Bit", "package_name": "com.bit", "source": "apkeep",
+                  "version_file": str(tmp_path / "version.txt")}
+
+    with patch("core.downloader.create_source", return_value=("apkeep", source, "com.bit")):
+        sync_result = check_for_update(app_config)
+        async_result = asyncio.run(async_check_for_update(app_config))
+
+    source._download_universal_xapk.assert_not_called()
+    assert sync_result == async_result == {
+        "source": "apkeep",
+        "local_version": "0.0.0",
+        "remote_version": "unknown",
+        "update_needed": None,
+    }
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.append(os.getcwd())
+
+from core.sources import custom_fallback
+from core.sources.custom_fallback import CustomFallbackSource
+
+
+def _source(monkeypatch, uptodown, aptoide, apkpure, **kwargs):
+    monkeypatch.setattr(custom_fallback, "get_session", lambda *a, **kw: MagicMock())
+    source = CustomFallbackSource(**kwargs)
+
+    def delayed(name, delay, result):
+        def helper(package_name):
+            time.sleep(delay)
+            return result
+        helper.__name__ = name
+        setattr(source, name, helper)
+
+    delayed("_get_uptodown_pure_apk", *uptodown)
+    delayed("_get_aptoide_apk", *aptoide)
+    delayed("_get_apkpure_pure_apk", *apkpure)
+    source._probe_version = lambda package_name: "2.0"
+    return source
+
+
+def test_race_keeps_priority_and_costs_one_source(monkeypatch):
+    source = _source(
+        monkeypatch,
+        uptodown=(0.3, ("https://up/app.apk", "2.0")),
+        aptoide=(0.0, ("https://apt/app.apk", "2.0")),
+        apkpure=(0.3, "https://pure/app.apk"),
+    )
+    started = time.monotonic()
+    version, link, package = source.get_latest_version("com.example")
+    elapsed = time.monotonic() - started
+
+    assert (version, link, package) == ("2.0", "uptodown_direct:https://up/app.apk", "com.example")
+    assert elapsed < 0.55
+
+
+def test_race_falls_through_failed_sources_and_hedges(monkeypatch):
+    source = _source(
+        monkeypatch,
+        uptodown=(0.2, (None, None)),
+        aptoide=(0.0, (None, None)),
+        apkpure=(0.0, "https://pure/app.apk"),
+        hedge_delay=5,
+    )
+    assert source.get_latest_version("com.example")[1] == "apkpure_direct:https://pure/app.apk"
+    assert source.get_download_url("fallback:com.example") == "https://pure/app.apk"
+
+    source.race = False
+    assert source.get_download_url("fallback:com.example") == "https://pure/app.apk"
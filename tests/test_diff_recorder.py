@@ -0,0 +1,36 @@
+import os
+import sys
+import gzip
+
+sys.path.append(os.getcwd())
+
+from core.diff_recorder import DiffRecorder, read_diff, read_index
+
+
+def test_recorded_diffs_are_streamed_and_indexed_by_file(tmp_path):
+    root = tmp_path / "build_output"
+    artifact = str(tmp_path / "demo.diff.gz")
+
+    with DiffRecorder(artifact, root_dir=str(root)) as recorder:
+        assert recorder.record(str(root / "smali" / "A.smali"), "a\nb\n", "a\nc\n") is True
+        assert recorder.record(str(root / "smali" / "B.smali"), "x\n", "x\n") is False
+        recorder.record(str(root / "smali" / "A.smali"), "a\nc\n", "a\nc\nd\n")
+
+    index = read_index(artifact)
+    assert list(index["files"]) == ["smali/A.smali"]
+    assert [entry["added"] for entry in index["files"]["smali/A.smali"]] == [1, 1]
+    assert "+c" in read_diff(artifact, "smali/A.smali") and "+d" in read_diff(artifact, "smali/A.smali")
+    assert read_diff(artifact, "smali/B.smali") is None
+
+    with gzip.open(artifact, "rt", encoding="utf-8") as f:
+        assert f.read().count("--- a/smali/A.smali") == 2
+
+
+def test_size_cap_drops_diffs_and_marks_index_truncated(tmp_path):
+    artifact = str(tmp_path / "demo.diff.gz")
+    with DiffRecorder(artifact, max_bytes=0) as recorder:
+        assert recorder.add("A.smali", "--- a/A.smali\n+++ b/A.smali\n+x") is False
+
+    index = read_index(artifact)
+    assert index["truncated"] is True and index["dropped"] == 1
+    assert index["files"] == {}
@@ -0,0 +1,132 @@
+import io
+import os
+import sys
+import zipfile
+
+import requests
+
+sys.path.append(os.getcwd())
+
+from core import downloader
+from core.downloader import _fetch_package
+
+
+def _apk_bytes() -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("AndroidManifest.xml", "<manifest/>")
+        zf.writestr("classes.dex", os.urandom(64 * 1024))
+    return buf.getvalue()
+
+
+class _Response:
+    def __init__(self, status_code, headers, body, fail_after=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.url = "https://cdn.example.com/app.apk"
+        self._body = body
+        self._fail_after = fail_after
+
+    def iter_content(self, chunk_size=8192):
+        # Like a socket, never hand out more than a small read at a time.
+        chunk_size = min(chunk_size, 16 * 1024)
+        sent = 0
+        for i in range(0, len(self._body), chunk_size):
+            if self._fail_after is not None and sent >= self._fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection reset")
+            chunk = self._body[i:i + chunk_size]
+            sent += len(chunk)
+            yield chunk
+
+    def close(self):
+        return None
+
+
+class _RangeServer:
+    """Serves `body`, dropping the first connection half-way through."""
+
+    def __init__(self, body: bytes, supports_ranges: bool = True):
+        self.body = body
+        self.supports_ranges = supports_ranges
+        self.requests = []
+
+    def get(self, url, stream=False, headers=None, allow_redirects=True):
+        headers = headers or {}
+        self.requests.append(dict(headers))
+        base = {"Content-Type": "application/vnd.android.package-archive", "ETag": '"v1"'}
+        range_header = headers.get("Range")
+        if range_header and self.supports_ranges and headers.get("If-Range") == '"v1"':
+            start = int(range_header.split("=")[1].rstrip("-"))
+            part = self.body[start:]
+            return _Response(206, {**base, "Content-Range": f"bytes {start}-{len(self.body) - 1}/{len(self.body)}",
+                                   "Content-Length": str(len(part))}, part)
+        fail_after = len(self.body) // 2 if len(self.requests) == 1 else None
+        return _Response(200, {**base, "Content-Length": str(len(self.body))}, self.body, fail_after)
+
+
+def test_interrupted_download_resumes_with_range(tmp_path):
+    body = _apk_bytes()
+    server = _RangeServer(body)
+    output = str(tmp_path / "latest.apk")
+
+    path, _ = _fetch_package(server, "https://cdn.example.com/app.apk", {}, output, "Test")
+
+    assert open(path, "rb").read() == body
+    assert "Range" not in server.requests[0]
+    assert server.requests[1]["Range"].startswith("bytes=")
+    assert not os.path.exists(output + ".part")
+    assert not os.path.exists(output + ".part.json")
+
+
+def test_download_restarts_when_server_ignores_range(tmp_path):
+    body = _apk_bytes()
+    server = _RangeServer(body, supports_ranges=False)
+    output = str(tmp_path / "latest.apk")
+
+    path, _ = _fetch_package(server, "https://cdn.example.com/app.apk", {}, output, "Test")
+
+    assert open(path, "rb").read() == body
+    assert len(server.requests) == 2
+
+
+class _SegmentServer:
+    """Serves `body` with byte-range support; the first ranged request is dropped mid-way."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.requests = []
+        self.dropped = False
+
+    def get(self, url, stream=False, headers=None, allow_redirects=True):
+        headers = headers or {}
+        self.requests.append(dict(headers))
+        base = {"Content-Type": "application/vnd.android.package-archive", "ETag": '"v1"',
+                "Accept-Ranges": "bytes"}
+        range_header = headers.get("Range")
+        if not range_header:
+            return _Response(200, {**base, "Content-Length": str(len(self.body))}, self.body)
+        start, end = range_header.split("=")[1].split("-")
+        start, end = int(start), int(end or len(self.body) - 1)
+        part = self.body[start:end + 1]
+        fail_after = None
+        if not self.dropped:
+            self.dropped = True
+            fail_after = len(part) // 2
+        return _Response(206, {**base, "Content-Range": f"bytes {start}-{end}/{len(self.body)}",
+                               "Content-Length": str(len(part))}, part, fail_after)
+
+
+def test_large_download_is_fetched_in_resumable_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "MIN_SEGMENTED_SIZE", 1024)
+    body = _apk_bytes()
+    server = _SegmentServer(body)
+    output = str(tmp_path / "latest.apk")
+
+    path, _ = _fetch_package(server, "https://cdn.example.com/app.apk", {}, output, "Test", segments=4)
+
+    assert open(path, "rb").read() == body
+    ranged = [r for r in server.requests if "Range" in r]
+    # Three segments on the first attempt, then the dropped one is resumed.
+    assert len(ranged) == 4
+    assert all(r["If-Range"] == '"v1"' for r in ranged)
+    assert not os.path.exists(output + ".part.json")
@@ -0,0 +1,48 @@
+import json
+import os
+import sys
+from unittest.mock import Mock
+
+import requests
+
+sys.path.append(os.getcwd())
+
+from core import http_cache
+from core.sources import github
+from core.sources.github import GitHubSource
+
+
+RELEASE = {
+    "tag_name": "v1.4.0",
+    "name": "Meld 1.4.0",
+    "assets": [{"name": "meld.apk", "browser_download_url": "https://example.invalid/meld.apk"}],
+}
+
+
+def _response(status=200, data=None, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(data).encode() if data is not None else b""
+    response.headers.update(headers or {})
+    response.url = "https://api.github.com/repos/owner/meld/releases/latest"
+    response.encoding = "utf-8"
+    return response
+
+
+def test_latest_release_is_revalidated_with_etag_and_token(tmp_path, monkeypatch):
+    monkeypatch.setenv(http_cache.CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setenv("GITHUB_TOKEN", "secret")
+    session = Mock()
+    monkeypatch.setattr(github, "get_session", lambda _profile: session)
+    source = GitHubSource()
+
+    session.get.return_value = _response(data=RELEASE, headers={"ETag": 'W/"r1"'})
+    first = source.get_latest_version("owner/meld")
+    assert session.get.call_args.kwargs["headers"]["Authorization"] == "token secret"
+
+    session.get.return_value = _response(status=304)
+    second = source.get_latest_version("owner/meld")
+
+    assert session.get.call_count == 2
+    assert session.get.call_args.kwargs["headers"]["If-None-Match"] == 'W/"r1"'
+    assert first == second == ("1.4.0", "https://example.invalid/meld.apk", "Meld 1.4.0")
@@ -0,0 +1,60 @@
+import os
+import sys
+from unittest.mock import Mock
+
+import requests
+
+sys.path.append(os.getcwd())
+
+from core import http_cache
+
+
+def _response(status=200, body=b"<html>v1</html>", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    response.url = "https://example.invalid/app"
+    response.encoding = "utf-8"
+    return response
+
+
+def test_fresh_responses_are_served_without_a_request(tmp_path, monkeypatch):
+    monkeypatch.setenv(http_cache.CACHE_DIR_ENV, str(tmp_path))
+    session = Mock()
+    session.get.return_value = _response()
+
+    first = http_cache.cached_get(session, "https://example.invalid/app", "apkcombo.page")
+    second = http_cache.cached_get(session, "https://example.invalid/app", "apkcombo.page")
+
+    assert session.get.call_count == 1
+    assert not getattr(first, "from_cache", False)
+    assert second.from_cache
+    assert second.text == "<html>v1</html>"
+
+
+def test_stale_responses_are_revalidated_with_validators(tmp_path, monkeypatch):
+    monkeypatch.setenv(http_cache.CACHE_DIR_ENV, str(tmp_path))
+    session = Mock()
+    session.get.return_value = _response(headers={"ETag": '"abc"'})
+    http_cache.cached_get(session, "https://example.invalid/app", "apkcombo.page")
+
+    session.get.return_value = _response(status=304, body=b"")
+    revalidated = http_cache.cached_get(session, "https://example.invalid/app", "apkcombo.page", ttl=0)
+
+    assert session.get.call_args.kwargs["headers"]["If-None-Match"] == '"abc"'
+    assert revalidated.from_cache
+    assert revalidated.text == "<html>v1</html>"
+
+
+def test_cache_is_bypassed_when_disabled(tmp_path, monkeypatch):
+    monkeypatch.setenv(http_cache.CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setenv(http_cache.HTTP_CACHE_ENV, "0")
+    session = Mock()
+    session.get.return_value = _response()
+
+    http_cache.cached_get(session, "https://example.invalid/app", "apkcombo.page")
+    http_cache.cached_get(session, "https://example.invalid/app", "apkcombo.page")
+
+    assert session.get.call_count == 2
+    assert not os.path.exists(tmp_path / "http")
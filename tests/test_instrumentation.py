@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from core import instrumentation
+from core.instrumentation import run_report, stage, timed
+
+
+def test_nested_stages_are_recorded_with_resource_fields(tmp_path):
+    path = tmp_path / "apps" / "demo" / "run_report.json"
+
+    @timed("fetch")
+    def fetch():
+        instrumentation.add_net_bytes(1234)
+        return "ok"
+
+    with run_report("demo", str(path), step="download"):
+        with stage("download") as record:
+            assert fetch() == "ok"
+            record["ok"] = True
+        with pytest.raises(ValueError):
+            with stage("pre-patch"):
+                raise ValueError("boom")
+
+    report = json.loads(path.read_text(encoding="utf-8"))
+    entry = report["steps"]["download"]
+    stages = {s["stage"]: s for s in entry["stages"]}
+    assert list(stages) == ["download/fetch", "download", "pre-patch"]
+    assert stages["download/fetch"]["net_bytes"] == 1234
+    assert stages["download"]["ok"] is True and stages["download"]["net_bytes"] == 1234
+    assert stages["pre-patch"]["error"] == "ValueError"
+    for field in ("wall_s", "cpu_s", "child_cpu_s", "peak_rss_mb"):
+        assert field in stages["download"]
+    assert entry["total"]["wall_s"] >= stages["download"]["wall_s"]
+
+
+def test_separate_steps_are_merged_into_one_report(tmp_path):
+    path = tmp_path / "run_report.json"
+    with run_report("demo", str(path), step="download"):
+        with stage("download"):
+            pass
+    with run_report("demo", str(path), step="patch"):
+        with stage("patch"):
+            pass
+
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert sorted(report["steps"]) == ["download", "patch"]
+
+    with stage("outside"):
+        pass
+    assert [s["stage"] for s in report["steps"]["patch"]["stages"]] == ["patch"]
@@ -0,0 +1,62 @@
+import os
+import re
+import sys
+
+sys.path.append(os.getcwd())
+
+from core import parallel_rewrite
+from core.parallel_rewrite import RewriteRule, rewrite_files
+
+
+def _tree(tmp_path, count=12):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"C{i}.smali"
+        body = "invoke-virtual {p0, v1}, Lpm;->get(I)V\n" * (i % 3) + '"@newsletter"\n'
+        path.write_text(body, encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+RULES = [
+    RewriteRule(re.compile(r"invoke-virtual (\{[^}]+\}), Lpm;->get"), r"invoke-static \1, LBypass;->get"),
+    RewriteRule('"@newsletter"', '"@block_nlr"'),
+]
+
+
+def test_rewrite_reports_counts_and_diffs_per_changed_file(tmp_path):
+    paths = _tree(tmp_path, count=3)
+
+    results = rewrite_files(paths, RULES, workers=1)
+
+    assert [(os.path.basename(r.path), r.count) for r in results] == [
+        ("C0.smali", 1), ("C1.smali", 2), ("C2.smali", 3),
+    ]
+    assert "+invoke-static {p0, v1}, LBypass;->get(I)V" in results[1].diff
+    assert results[0].diff.startswith("--- a/C0.smali\n+++ b/C0.smali")
+
+
+def test_diff_headers_are_relative_to_root_dir(tmp_path):
+    package_dir = tmp_path / "smali" / "com" / "whatsapp"
+    package_dir.mkdir(parents=True)
+    paths = _tree(package_dir, count=1)
+
+    results = rewrite_files(paths, RULES, workers=1, root_dir=str(tmp_path))
+
+    assert results[0].diff.startswith("--- a/smali/com/whatsapp/C0.smali\n+++ b/smali/com/whatsapp/C0.smali")
+    assert '"@block_nlr"' in open(paths[0], encoding="utf-8").read()
+
+
+def test_pool_matches_inline_results(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_rewrite, "MIN_PARALLEL_FILES", 1)
+    inline_dir = tmp_path / "inline"
+    pool_dir = tmp_path / "pool"
+    inline_dir.mkdir()
+    pool_dir.mkdir()
+
+    inline = rewrite_files(_tree(inline_dir), RULES, workers=1)
+    pooled = rewrite_files(_tree(pool_dir), RULES, workers=3)
+
+    assert [(os.path.basename(r.path), r.count, r.diff) for r in pooled] == [
+        (os.path.basename(r.path), r.count, r.diff) for r in inline
+    ]
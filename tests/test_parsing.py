@@ -0,0 +1,41 @@
+import os
+import sys
+
+from bs4 import SoupStrainer
+
+sys.path.append(os.getcwd())
+
+from core import parsing
+from core.parsing import first_attr, make_soup
+
+
+PAGE = """<html><head><title>App 1.2.3</title></head><body>
+<a class="nav" href="/home">Home</a>
+<div class="appRow"><h5 class="appRowTitle">App 1.2.3</h5></div>
+<a rel="nofollow noopener" data-google-interstitial="false" href="/wp-content/themes/APKMirror/download.php?id=1&amp;key=k">Go</a>
+<a class="btn downloadButton" href="/apk/app/download/">Download</a>
+</body></html>"""
+
+
+def test_first_attr_matches_tokens_and_callables_and_stops_early(monkeypatch):
+    assert first_attr(PAGE, "a", "href", {"class": "downloadButton"}) == "/apk/app/download/"
+    assert first_attr(PAGE, "a", "href", {
+        "rel": "nofollow",
+        "data-google-interstitial": "false",
+        "href": lambda href: href and "download.php" in href,
+    }) == "/wp-content/themes/APKMirror/download.php?id=1&key=k"
+    assert first_attr(PAGE, None, "class", {"class": "appRowTitle"}) == "appRowTitle"
+    assert first_attr(PAGE, "a", "href", {"class": "missing"}) is None
+
+    # The first match is in the first chunk; the (broken) rest is never fed.
+    monkeypatch.setattr(parsing, "FEED_CHUNK", 64)
+    assert first_attr('<a class="nav" href="/x">' + "<" * 10_000, "a", "href", {"class": "nav"}) == "/x"
+
+
+def test_make_soup_uses_configured_parser_and_strainer(monkeypatch):
+    monkeypatch.setenv(parsing.HTML_PARSER_ENV, "html.parser")
+    soup = make_soup(PAGE, parse_only=SoupStrainer("div", class_="appRow"))
+
+    assert soup.find("h5").get_text() == "App 1.2.3"
+    assert soup.find("a") is None
+    assert make_soup(PAGE).title.get_text() == "App 1.2.3"
@@ -0,0 +1,61 @@
+import os
+import sys
+import shutil
+
+sys.path.append(os.getcwd())
+
+from core.patch_cache import PatchCache, snapshot_tree
+
+
+def _make_decompile(root):
+    (root / "smali" / "com").mkdir(parents=True)
+    (root / "apktool.yml").write_text("versionName: 1.0\n", encoding="utf-8")
+    (root / "smali" / "com" / "A.smali").write_text(".class LA;\n", encoding="utf-8")
+    (root / "smali" / "com" / "Old.smali").write_text(".class LOld;\n", encoding="utf-8")
+
+
+def _patch(root):
+    (root / "smali" / "com" / "A.smali").write_text(".class LA;\n# patched\n", encoding="utf-8")
+    (root / "smali" / "com" / "New.smali").write_text(".class LNew;\n", encoding="utf-8")
+    os.remove(root / "smali" / "com" / "Old.smali")
+
+
+def test_record_then_replay_reproduces_patched_tree(tmp_path):
+    first = tmp_path / "first"
+    _make_decompile(first)
+    fresh = tmp_path / "fresh"
+    shutil.copytree(first, fresh)
+
+    cache = PatchCache(str(tmp_path / "cache"))
+    before = snapshot_tree(str(first))
+    _patch(first)
+    diff_artifact = tmp_path / "demo.diff.gz"
+    diff_artifact.write_bytes(b"diffs")
+    cache.record("demo", "key-1", str(first), before, artifacts=[str(diff_artifact)])
+    os.remove(diff_artifact)
+
+    replay_dir = tmp_path / "replay"
+    assert cache.replay("demo", "key-1", str(fresh), artifacts_dir=str(replay_dir)) is True
+    assert (replay_dir / "demo.diff.gz").read_bytes() == b"diffs"
+    assert (fresh / "smali" / "com" / "A.smali").read_text(encoding="utf-8").endswith("# patched\n")
+    assert (fresh / "smali" / "com" / "New.smali").exists()
+    assert not (fresh / "smali" / "com" / "Old.smali").exists()
+
+
+def test_replay_falls_back_on_key_mismatch_or_corrupt_blob(tmp_path):
+    first = tmp_path / "first"
+    _make_decompile(first)
+    fresh = tmp_path / "fresh"
+    shutil.copytree(first, fresh)
+
+    cache = PatchCache(str(tmp_path / "cache"))
+    before = snapshot_tree(str(first))
+    _patch(first)
+    cache.record("demo", "key-1", str(first), before)
+
+    assert cache.replay("demo", "other-key", str(fresh)) is False
+
+    blob = next(p for p in (tmp_path / "cache" / "blobs").rglob("*") if p.is_file())
+    blob.write_bytes(b"corrupt")
+    assert cache.replay("demo", "key-1", str(fresh)) is False
+    assert (fresh / "smali" / "com" / "Old.smali").exists()
@@ -0,0 +1,76 @@
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.getcwd())
+
+from core.patch_rules import PatchRule, compile_rules
+from core.smali_index import SmaliIndex
+
+
+SMALI = """.class public LA;
+.super Ljava/lang/Object;
+
+.method public static a(Ljava/lang/Object;)V
+    .locals 2
+    const-string v0, "INVOKE_RETURN"
+    return-void
+.end method
+
+.method public static b(Ljava/lang/Object;)V
+    .locals 1
+    const-string v0, "OTHER"
+    if-nez v0, :cond_0
+    return-void
+.end method
+"""
+
+
+def _tree(tmp_path):
+    (tmp_path / "smali" / "a").mkdir(parents=True)
+    (tmp_path / "smali" / "a" / "A.smali").write_text(SMALI, encoding="utf-8")
+    (tmp_path / "smali" / "a" / "B.smali").write_text(SMALI.replace("LA;", "LB;"), encoding="utf-8")
+    return SmaliIndex(str(tmp_path))
+
+
+def test_rules_run_in_one_pass_with_method_scope_filters_and_counts(tmp_path):
+    index = _tree(tmp_path)
+    plan = compile_rules([
+        PatchRule(
+            name="neutralize",
+            anchor='"INVOKE_RETURN"',
+            method=r"public static \w+\(Ljava/lang/Object;\)V",
+            pattern=r"\A(\.method[^\n]*)(.*?)(\.end method)\Z",
+            flags=re.DOTALL,
+            replacement=lambda m: f"{m.group(1)}\n    return-void\n{m.group(3)}",
+            limit=1,
+        ),
+        PatchRule(name="goto", anchor="if-nez", pattern=r"if-nez v0, (:cond_\w+)", replacement=r"goto \1",
+                  files="*/B.smali"),
+        PatchRule(name="literal", anchor='"OTHER"', replacement='"CHANGED"', expect=2),
+        PatchRule(name="missing", anchor="nowhere", replacement="x", expect=(1, None)),
+    ])
+
+    report = plan.apply(index)
+
+    assert report.count("neutralize") == 1 and report.ok("neutralize")
+    assert report["goto"].files == [str(tmp_path / "smali" / "a" / "B.smali")]
+    assert report.count("literal") == 2 and report.ok("literal")
+    assert not report.ok("missing") and not report.ok()
+
+    a = (tmp_path / "smali" / "a" / "A.smali").read_text(encoding="utf-8")
+    b = (tmp_path / "smali" / "a" / "B.smali").read_text(encoding="utf-8")
+    assert '"INVOKE_RETURN"' not in a and '"INVOKE_RETURN"' in b
+    assert "if-nez v0" in a and "goto :cond_0" in b
+    assert index.files_containing('"CHANGED"') == sorted([
+        str(tmp_path / "smali" / "a" / "A.smali"), str(tmp_path / "smali" / "a" / "B.smali")
+    ])
+
+
+def test_invalid_rules_are_rejected_at_compile_time():
+    with pytest.raises(ValueError):
+        compile_rules([PatchRule(name="x", anchor="a", replacement=lambda m: "")])
+    with pytest.raises(ValueError):
+        compile_rules([PatchRule(name="x", anchor="a", replacement="b"), PatchRule(name="x", anchor="c", replacement="d")])
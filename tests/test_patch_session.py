@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from core.cloner import run_clone
+from core.hotfix import apply_hotfix_if_needed
+from core.patch_session import PatchSession
+
+
+MANIFEST = (
+    '<?xml version="1.0" encoding="utf-8" standalone="no"?>'
+    '<manifest xmlns:android="http://schemas.android.com/apk/res/android" '
+    'package="com.example" android:versionName="1.0">'
+    '<application><activity android:name=".Main"/></application></manifest>'
+)
+
+
+def test_session_caches_reads_and_flushes_only_changed_files(tmp_path):
+    changed = tmp_path / "a.txt"
+    untouched = tmp_path / "b.txt"
+    changed.write_text("old", encoding="utf-8")
+    untouched.write_text("same", encoding="utf-8")
+    session = PatchSession(str(tmp_path))
+
+    assert session.read(str(changed)) == "old"
+    changed.write_text("changed behind the session", encoding="utf-8")
+    assert session.read(str(changed)) == "old"
+
+    session.write(str(changed), "new")
+    session.write(str(untouched), "same")
+    session.write(str(tmp_path / "dir" / "created.txt"), "created")
+    assert "+new" in session.diff()
+
+    written = session.flush()
+
+    assert sorted(os.path.basename(p) for p in written) == ["a.txt", "created.txt"]
+    assert changed.read_text(encoding="utf-8") == "new"
+    assert session.dirty == []
+
+
+def test_stages_share_one_parse_and_one_manifest_write(tmp_path):
+    manifest = tmp_path / "AndroidManifest.xml"
+    manifest.write_text(MANIFEST, encoding="utf-8")
+    (tmp_path / "apktool.yml").write_text("versionInfo:\n  versionName: 1.0\n", encoding="utf-8")
+    session = PatchSession(str(tmp_path))
+
+    assert run_clone(str(tmp_path), {"old_pkg": "com.example", "new_pkg": "com.example.clone"}, session=session)
+    apply_hotfix_if_needed(str(tmp_path), {"hotfixes": {"1.0": "-h1"}}, session=session)
+    assert manifest.read_text(encoding="utf-8") == MANIFEST
+
+    written = session.flush()
+
+    assert sorted(os.path.basename(p) for p in written) == ["AndroidManifest.xml", "apktool.yml"]
+    content = manifest.read_text(encoding="utf-8")
+    assert 'package="com.example.clone"' in content
+    assert 'android:versionName="1.0-h1"' in content
+    assert "com.example.Main" in content
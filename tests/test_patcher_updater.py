@@ -1,7 +1,7 @@
 import os
 import sys
 import json
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 
 sys.path.append(os.getcwd())
 
@@ -31,6 +31,7 @@ def test_run_patch_injects_updater_by_default(tmp_path, monkeypatch):
             decompiled_dir="build_output",
             app_id="demo",
             target_activity_smali=None,
+            session=ANY,
         )
 
 
@@ -74,3 +75,18 @@ def test_run_patch_applies_clone_if_configured(tmp_path, monkeypatch):
     ):
         assert run_patch("demo", "build_output") is True
         clone_mock.assert_called_once()
+
+
+def test_run_patch_passes_context_to_two_argument_patches(tmp_path, monkeypatch):
+    app_dir = tmp_path / "apps" / "demo"
+    app_dir.mkdir(parents=True)
+    (app_dir / "patch.py").write_text(
+        "SMALI_ANCHORS = ['anchor']\n"
+        "def patch(decompiled_dir, ctx):\n"
+        "    return ctx.app_id == 'demo' and ctx.index.files_containing('anchor') == []\n",
+        encoding="utf-8",
+    )
+    (app_dir / "app.json").write_text(json.dumps({"inject_updater": False}), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    assert run_patch("demo", str(tmp_path / "build_output")) is True
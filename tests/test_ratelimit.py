@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from core.ratelimit import RateLimiter
+
+
+def test_bucket_blocks_only_when_budget_is_exhausted(tmp_path):
+    limiter = RateLimiter(str(tmp_path))
+    limiter.configure("www.example.com", rate=20, burst=2)
+
+    assert limiter.acquire("www.example.com") == 0
+    assert limiter.acquire("www.example.com") == 0
+    assert limiter.acquire("www.example.com") > 0
+    assert limiter.acquire("unlimited.example.com") == 0
+
+
+def test_budget_is_shared_between_limiters_using_the_same_state(tmp_path):
+    first = RateLimiter(str(tmp_path))
+    second = RateLimiter(str(tmp_path))
+    for limiter in (first, second):
+        limiter.configure("www.example.com", rate=20, burst=1)
+
+    assert first.acquire("www.example.com") == 0
+    assert second.acquire("www.example.com") > 0
+
+
+def test_zero_rate_disables_the_limit(tmp_path):
+    limiter = RateLimiter(str(tmp_path))
+    limiter.configure("www.example.com", rate=1, burst=1)
+    limiter.configure("www.example.com", rate=0)
+
+    assert limiter.limit_for("www.example.com") is None
@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+sys.path.append(os.getcwd())
+
+import run
+from core.utils import set_github_output
+
+
+def _write_app(tmp_path, app_id: str):
+    app_dir = tmp_path / "apps" / app_id
+    app_dir.mkdir(parents=True, exist_ok=True)
+    (app_dir / "patch.py").write_text(
+        "def patch(decompiled_dir):\n"
+        "    return True\n",
+        encoding="utf-8",
+    )
+    config = {
+        "id": app_id,
+        "name": app_id,
+        "inject_updater": False,
+        "version_file": f"apps/{app_id}/version.txt",
+        "status_file": f"apps/{app_id}/status.json",
+    }
+    (app_dir / "app.json").write_text(json.dumps(config), encoding="utf-8")
+
+
+def test_isolated_worker_uses_private_dir_and_captures_outputs(tmp_path, monkeypatch):
+    monkeypatch.setenv("GITHUB_OUTPUT", str(tmp_path / "shared_output"))
+    seen = {}
+
+    def fake_process_app(app_id, step, no_mitm, work_dir):
+        seen["work_dir"] = work_dir
+        set_github_output("update_needed", "true")
+        set_github_output("new_version", "1.2.3")
+        return True
+
+    with patch("run.process_app", side_effect=fake_process_app):
+        success, outputs = run._process_app_isolated("demo", "download", True, str(tmp_path / "ws"))
+
+    assert success is True
+    assert seen["work_dir"] == str(tmp_path / "ws" / "demo")
+    assert outputs == [("update_needed", "true"), ("new_version", "1.2.3")]
+    assert not (tmp_path / "shared_output").exists()
+
+
+def test_run_parallel_returns_results_in_app_order(tmp_path, monkeypatch):
+    for app_id in ("beta", "alpha"):
+        _write_app(tmp_path, app_id)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GITHUB_OUTPUT", raising=False)
+
+    results = run.run_parallel(
+        ["beta", "alpha"], step="patch", no_mitm=True, jobs=2, work_root=str(tmp_path / "ws")
+    )
+
+    assert list(results) == ["beta", "alpha"]
+    assert all(results.values())
+    assert json.loads((tmp_path / "apps" / "alpha" / "status.json").read_text())["success"] is True
+
+
+def test_run_parallel_prefixes_outputs_per_app(tmp_path, monkeypatch):
+    replayed = []
+    monkeypatch.setattr(run, "set_github_output", lambda key, value: replayed.append((key, value)))
+    monkeypatch.setattr(run, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    def fake_isolated(app_id, step, no_mitm, work_root):
+        version = "2.0" if app_id == "alpha" else "3.1"
+        return True, [("update_needed", "true"), ("new_version", version)]
+
+    with patch("run._process_app_isolated", side_effect=fake_isolated):
+        run.run_parallel(["beta", "alpha"], step="download", no_mitm=True, jobs=2,
+                         work_root=str(tmp_path / "ws"))
+
+    outputs = dict(replayed)
+    assert [key for key, _ in replayed][:2] == ["beta_update_needed", "beta_new_version"]
+    assert outputs["alpha_new_version"] == "2.0" and outputs["beta_new_version"] == "3.1"
+    assert "new_version" not in outputs
+    assert json.loads(outputs["app_outputs"]) == {
+        "beta": {"update_needed": "true", "new_version": "3.1"},
+        "alpha": {"update_needed": "true", "new_version": "2.0"},
+    }
@@ -0,0 +1,59 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from core.smali import SmaliClass
+
+
+SMALI = """.class public Lcom/example/MainActivity;
+.super Landroid/app/Activity;
+.implements Ljava/lang/Runnable;
+.source "MainActivity.java"
+
+# instance fields
+.field private count:I
+
+.method public constructor <init>()V
+    .locals 0
+    invoke-direct {p0}, Landroid/app/Activity;-><init>()V
+    return-void
+.end method
+
+.method protected onCreate(Landroid/os/Bundle;)V
+    .registers 3
+    invoke-super {p0, p1}, Landroid/app/Activity;->onCreate(Landroid/os/Bundle;)V
+    return-void
+.end method
+"""
+
+
+def test_parses_header_fields_and_methods_by_signature():
+    cls = SmaliClass(SMALI)
+
+    assert cls.descriptor == "Lcom/example/MainActivity;"
+    assert cls.super_class == "Landroid/app/Activity;"
+    assert cls.interfaces == ["Ljava/lang/Runnable;"]
+    assert cls.fields == [".field private count:I"]
+    assert cls.header.rstrip().endswith("# instance fields")
+    assert [m.signature for m in cls.methods] == ["<init>()V", "onCreate(Landroid/os/Bundle;)V"]
+
+    on_create = cls.method("onCreate(Landroid/os/Bundle;)V")
+    assert on_create.name == "onCreate" and on_create.modifiers == ("protected",)
+    assert on_create.registers() == (".registers", 3)
+    assert on_create.text.startswith(".method protected onCreate") and on_create.text.endswith(".end method")
+    assert "invoke-super" in on_create.body and ".end method" not in on_create.body
+    assert cls.method("onResume()V") is None
+
+
+def test_edits_splice_text_and_rescan():
+    cls = SmaliClass(SMALI)
+    on_create = cls.method("onCreate(Landroid/os/Bundle;)V")
+
+    new_text = cls.insert(on_create.rfind("return-void"), "nop\n    ")
+    assert "nop\n    return-void\n.end method\n" in new_text
+    assert "nop" in cls.method("onCreate(Landroid/os/Bundle;)V").body
+
+    cls.append_method(".method public onResume()V\n    .locals 0\n    return-void\n.end method\n")
+    assert cls.method("onResume()V") is not None
+    assert len(cls.methods) == 3
@@ -0,0 +1,63 @@
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from core.smali_index import SmaliIndex
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def _tree(tmp_path):
+    main = _write(
+        tmp_path / "smali" / "com" / "example" / "Main.smali",
+        ".class public Lcom/example/Main;\n"
+        ".super Landroid/app/Activity;\n\n"
+        ".method public onCreate(Landroid/os/Bundle;)V\n"
+        "    .locals 1\n"
+        '    const-string v0, "anchor-one"\n'
+        "    return-void\n"
+        ".end method\n",
+    )
+    other = _write(
+        tmp_path / "smali_classes2" / "X" / "a.smali",
+        ".class final LX/a;\n.super Ljava/lang/Object;\n\n"
+        ".method public static b(Ljava/lang/Object;)V\n"
+        '    const-string v0, "anchor-two"\n'
+        "    return-void\n"
+        ".end method\n",
+    )
+    return main, other
+
+
+def test_index_answers_name_class_method_and_anchor_queries(tmp_path):
+    main, other = _tree(tmp_path)
+    index = SmaliIndex(str(tmp_path), anchors=["anchor-one"])
+
+    assert index.find_file("Main.smali") == main
+    assert index.find_class("LX/a;") == other
+    assert index.files_with_method("onCreate(Landroid/os/Bundle;)V") == [main]
+    assert index.files_with_method("b(Ljava/lang/Object;)V") == [other]
+    assert index.files_containing("anchor-one") == [main]
+    # Unregistered text falls back to a scan.
+    assert index.files_containing("anchor-two") == [other]
+    assert index.find_file_containing("missing") is None
+
+
+def test_update_keeps_the_index_current_after_rewrites(tmp_path):
+    main, other = _tree(tmp_path)
+    index = SmaliIndex(str(tmp_path), anchors=["anchor-one"])
+    assert index.files_containing("anchor-one") == [main]
+
+    index.update(other, '.class LX/a;\nconst-string v0, "anchor-one"\n')
+    index.update(main, ".class public Lcom/example/Main;\n")
+    created = _write(tmp_path / "smali" / "New.smali", '.class LNew;\n"anchor-one"\n')
+    index.update(created)
+
+    assert index.files_containing("anchor-one") == sorted([other, created])
+    assert index.files_with_method("onCreate(Landroid/os/Bundle;)V") == []
+    assert index.find_file("New.smali") == created
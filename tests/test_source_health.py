@@ -0,0 +1,76 @@
+import os
+import sys
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+sys.path.append(os.getcwd())
+
+from core.downloader import DownloadError, check_for_update
+from core.source_health import SOURCE_HEALTH_ENV, SourceHealth, failure_class
+from core.sources.registry import source_candidates
+
+
+def _http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} Client Error", response=response)
+
+
+def test_record_tracks_rates_latency_and_failure_class(tmp_path):
+    health = SourceHealth(str(tmp_path / "source_health.json"))
+    for latency in (0.2, 0.4, 0.6, 3.0):
+        health.record("aptoide", True, latency)
+    try:
+        raise RuntimeError("Search failed") from _http_error(403)
+    except RuntimeError as e:
+        health.record("apkmirror", False, 1.0, e)
+
+    aptoide = health.stats("aptoide")
+    assert aptoide["samples"] == 4 and aptoide["success_rate"] == 1.0
+    assert aptoide["p50_s"] == 0.6 and aptoide["p95_s"] == 3.0
+    assert health.stats("apkmirror")["last_failure"] == "HTTP 403"
+    assert failure_class(requests.ReadTimeout()) == "Timeout"
+
+    # Unknown sources count as healthy; a source that keeps failing moves back.
+    assert health.order(["apkmirror", "aptoide", "apkpure"]) == ["apkmirror", "aptoide", "apkpure"]
+    for _ in range(3):
+        health.record("apkmirror", False, error="NoResults")
+    assert health.order(["apkmirror", "aptoide", "apkpure"]) == ["aptoide", "apkpure", "apkmirror"]
+    assert source_candidates({"sources": ["APKMirror", "aptoide", "apkmirror"]}, health) == ["aptoide", "apkmirror"]
+    assert source_candidates({"source": "apkpure"}) == ["apkpure"]
+
+
+def test_check_falls_back_to_next_source_and_records_outcomes(tmp_path, monkeypatch):
+    monkeypatch.setenv(SOURCE_HEALTH_ENV, str(tmp_path / "source_health.json"))
+    app_config = {
+        "name": "Demo",
+        "package_name": "com.example",
+        "sources": ["apkmirror", "aptoide"],
+        "version_file": str(tmp_path / "version.txt"),
+    }
+    broken = Mock()
+    broken.get_latest_version.side_effect = _http_error(403)
+    working = Mock()
+    working.get_latest_version.return_value = ("2.0", "https://example.com/release", "Demo 2.0")
+    sources = {"apkmirror": broken, "aptoide": working}
+
+    with patch("core.downloader.create_source", side_effect=lambda name, _cfg: (name, sources[name], "com.example")):
+        result = check_for_update(app_config)
+        assert result["source"] == "aptoide" and result["update_needed"] is True
+
+        health = SourceHealth(str(tmp_path / "source_health.json"))
+        assert health.stats("apkmirror")["last_failure"] == "HTTP 403"
+        assert health.stats("aptoide")["success_rate"] == 1.0
+
+        # Once apkmirror is demoted, aptoide is asked first.
+        for _ in range(3):
+            health.record("apkmirror", False, error="HTTP 403")
+        broken.get_latest_version.reset_mock()
+        check_for_update(app_config)
+        broken.get_latest_version.assert_not_called()
+
+        working.get_latest_version.side_effect = _http_error(503)
+        with pytest.raises(DownloadError, match="Search failed"):
+            check_for_update(app_config)
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+import json
+import threading
+
+sys.path.append(os.getcwd())
+
+from core import tracing
+from core.instrumentation import stage
+
+
+def test_spans_from_threads_stages_and_subprocesses_merge_into_one_trace(tmp_path, monkeypatch):
+    trace_dir = tmp_path / "trace"
+    monkeypatch.setenv(tracing.TRACE_DIR_ENV, str(trace_dir))
+
+    @tracing.traced()
+    def _patch_demo():
+        return True
+
+    tracing.set_process_name("test")
+    with tracing.span("demo", "app"):
+        with stage("patch"):
+            assert _patch_demo() is True
+        def request():
+            with tracing.span("GET example.com", "http") as args:
+                args["status"] = 200
+
+        worker = threading.Thread(target=request)
+        worker.start()
+        worker.join()
+        tracing.run_subprocess([sys.executable, "-c", "pass"], check=True)
+
+    out = tmp_path / "out.json"
+    count = tracing.merge(str(trace_dir), str(out))
+
+    events = json.loads(out.read_text(encoding="utf-8"))["traceEvents"]
+    assert count == len(events)
+    assert events[0]["ph"] == "M" and events[0]["args"]["name"] == "test"
+    by_cat = {}
+    for event in events[1:]:
+        assert event["ph"] == "X" and event["pid"] == os.getpid() and event["dur"] >= 0
+        by_cat.setdefault(event["cat"], []).append(event)
+    assert [e["name"] for e in by_cat["app"]] == ["demo"]
+    assert [e["name"] for e in by_cat["stage"]] == ["patch"]
+    assert [e["name"] for e in by_cat["patch"]] == ["_patch_demo"]
+    assert by_cat["http"][0]["args"]["status"] == 200
+    assert by_cat["http"][0]["tid"] != by_cat["app"][0]["tid"]
+    assert by_cat["subprocess"][0]["args"]["returncode"] == 0
+
+
+def test_spans_are_no_ops_when_tracing_is_disabled(tmp_path, monkeypatch):
+    monkeypatch.delenv(tracing.TRACE_DIR_ENV, raising=False)
+    with tracing.span("demo") as args:
+        assert args is None
+    assert tracing.run_subprocess([sys.executable, "-c", "pass"]).returncode == 0
+    assert not any(tmp_path.iterdir())
+
+
+def test_async_spans_pair_begin_and_end_events_by_id(tmp_path, monkeypatch):
+    trace_dir = tmp_path / "trace"
+    monkeypatch.setenv(tracing.TRACE_DIR_ENV, str(trace_dir))
+    # The per-process trace file is opened once; start one in this test's directory.
+    monkeypatch.setattr(tracing, "_file", None)
+
+    async def check(app_id, delay):
+        with tracing.async_span(app_id, "app", step="check") as args:
+            await asyncio.sleep(delay)
+            args["remote_version"] = "1.0"
+
+    async def check_all():
+        await asyncio.gather(check("first", 0.02), check("second", 0))
+
+    asyncio.run(check_all())
+    out = tmp_path / "out.json"
+    tracing.merge(str(trace_dir), str(out))
+
+    events = json.loads(out.read_text(encoding="utf-8"))["traceEvents"]
+    assert [(e["name"], e["ph"]) for e in events] == [
+        ("first", "b"), ("second", "b"), ("second", "e"), ("first", "e"),
+    ]
+    first_begin, second_begin, second_end, first_end = events
+    assert first_begin["id"] == first_end["id"] != second_begin["id"] == second_end["id"]
+    assert first_end["cat"] == "app" and first_end["args"]["remote_version"] == "1.0"
@@ -0,0 +1,31 @@
+import os
+import sys
+from unittest.mock import Mock, patch
+
+sys.path.append(os.getcwd())
+
+from core import transport
+
+
+def test_sessions_are_pooled_per_profile_with_default_timeout():
+    session = transport.get_session("test-pooled", timeout=7)
+    assert transport.get_session("test-pooled") is session
+    assert transport.get_session("test-other") is not session
+
+    with patch.object(session, "send", return_value=Mock()) as send:
+        session.get("https://example.invalid/")
+        session.get("https://example.invalid/", timeout=2)
+
+    assert send.call_args_list[0].kwargs["timeout"] == 7
+    assert send.call_args_list[1].kwargs["timeout"] == 2
+    adapter = session.get_adapter("https://example.invalid/")
+    assert adapter.max_retries.total == transport.RETRIES
+
+
+def test_scraper_sessions_keep_their_tls_adapter():
+    session = transport.get_session("test-scraper", scraper=True)
+    adapter = session.get_adapter("https://example.invalid/")
+
+    assert type(adapter).__name__ == "CipherSuiteAdapter"
+    assert adapter.max_retries.total == transport.RETRIES
+    assert adapter._pool_maxsize == transport.POOL_SIZE